@@ -1,11 +1,26 @@
+import argparse
+import math
 import tkinter as tk
-import re
-from cartesian_plan import CartesianPlan
-from utils import generate_random_color
+from tkinter import filedialog
+import grammar
+import graphs
+import ingest
+import instrumentation
+import journal
+import race
+import scene_io
+import vector_algebra
+from cartesian_plan import CartesianPlan, AUTO, VECTOR_MODE, RASTER_MODE
+from item_list import ItemList
+from scene import Scene, POINT, VECTOR, POINT_VECTOR
+
+# Maximum number of error messages displayed at once for a batch of statements
+MAX_ERRORS_SHOWN = 5
 
 
 class App(tk.Tk):
-    def __init__(self):
+    def __init__(self, session_directory=journal.DEFAULT_DIRECTORY):
+        """Creates the app; every change is journaled in session_directory and restored on the next start (None disables it)."""
         super().__init__()
         self.title("Vectors Race")
 
@@ -13,161 +28,529 @@ class App(tk.Tk):
         self.input_frame = tk.Frame(self)
         self.input_frame.place(relx=0.8, rely=0, relwidth=0.2, relheight=1)
 
-        self.label = tk.Label(self.input_frame, text="Enter Item:")
+        self.label = tk.Label(self.input_frame, text="Enter Items (one per line or separated by ';'):")
         self.label.pack(pady=10)
 
-        # Entry box for input (where the user enters the point or vector)
-        self.input_entry = tk.Entry(self.input_frame)
+        # Input box (where the user enters or pastes points, vectors and commands, separated by ';' or newlines)
+        self.input_entry = tk.Text(self.input_frame, height=4, width=24)
         self.input_entry.pack(pady=10)
 
-        # Button to draw the item based on the input above
-        self.draw_button = tk.Button(self.input_frame, text="Draw Item", command=self.draw_point_from_input)
+        # Button to draw the item based on the input above (the method is looked up on each click, so that it is timed
+        # while instrumentation shadows it on the instance)
+        self.draw_button = tk.Button(self.input_frame, text="Draw Items", command=lambda: self.draw_point_from_input())
         self.draw_button.pack(pady=10)
 
         # Bind the Enter key to trigger draw_point_from_input, which means pressing Enter will draw the item as if the button was clicked
-        self.input_entry.bind("<Return>", lambda event: self.draw_point_from_input())
+        # (Shift+Enter still inserts a new line)
+        self.input_entry.bind("<Return>", lambda event: self.draw_point_from_input() or "break")
+        self.input_entry.bind("<Shift-Return>", lambda event: None)
 
-        # Listbox to display points
+        # List to display points
         self.point_list_label = tk.Label(self.input_frame, text="Items List:")
         self.point_list_label.pack(pady=10)
 
-        # Where the items are being displayed
-        self.point_listbox = tk.Listbox(self.input_frame)
-        self.point_listbox.pack(pady=10)
+        # Where the items are being displayed - only the visible rows of the scene are materialized
+        self.item_list = ItemList(self.input_frame, Scene())
+        self.item_list.pack(pady=10)
 
-        self.delete_button = tk.Button(self.input_frame, text="Delete Selected Item", command=self.delete_item)
+        self.delete_button = tk.Button(self.input_frame, text="Delete Selected Items", command=lambda: self.delete_item())
         self.delete_button.pack(pady=10)
 
+        # Buttons to load a scene file into the plane and to save the current scene
+        self.load_button = tk.Button(self.input_frame, text="Load Scene", command=self.load_scene)
+        self.load_button.pack(pady=10)
+        self.save_button = tk.Button(self.input_frame, text="Save Scene", command=self.save_scene)
+        self.save_button.pack(pady=10)
+        # Pending chunk of the scene file being loaded, if any
+        self._load_job = None
+
+        # Button to start and stop the race of the points of the scene (see race)
+        self.race_button = tk.Button(self.input_frame, text="Start Race", command=self.toggle_race)
+        self.race_button.pack(pady=10)
+        # Loop running the race on the canvas, while there is one
+        self.race_loop = None
+
+        # Buttons to undo and redo the last changes (also Ctrl+Z and Ctrl+Y or Ctrl+Shift+Z)
+        self.undo_button = tk.Button(self.input_frame, text="Undo", command=self.undo)
+        self.undo_button.pack(pady=10)
+        self.redo_button = tk.Button(self.input_frame, text="Redo", command=self.redo)
+        self.redo_button.pack(pady=10)
+        self.bind("<Control-z>", lambda event: self.undo())
+        self.bind("<Control-y>", lambda event: self.redo())
+        self.bind("<Control-Z>", lambda event: self.redo())
+
+        # Buttons to generate vectors between the selected points (or all points): every pair, the k nearest neighbours,
+        # the convex hull and the minimum spanning tree, computed in the background - and to cancel the generation
+        self.generate_frame = tk.Frame(self.input_frame)
+        self.generate_frame.pack(pady=10)
+        for text, kind in (("All", graphs.COMPLETE), ("k-NN", graphs.NEAREST), ("Hull", graphs.HULL),
+                           ("MST", graphs.SPANNING_TREE)):
+            tk.Button(self.generate_frame, text=text, command=lambda kind=kind: self.generate_vectors(kind)).pack(side=tk.LEFT)
+        tk.Button(self.generate_frame, text="Cancel", command=self.cancel_generation).pack(side=tk.LEFT)
+        # Generation running in the background, if any
+        self.generation = None
+
+        # Buttons to go back to the default view after panning and zooming, and to pick the renderer (see set_render_mode)
+        self.view_frame = tk.Frame(self.input_frame)
+        self.view_frame.pack(pady=10)
+        tk.Button(self.view_frame, text="Reset View", command=lambda: self.cartesian_plane.reset_view()).pack(side=tk.LEFT)
+        self.render_button = tk.Button(self.view_frame, text="Render: auto", command=self.cycle_render_mode)
+        self.render_button.pack(side=tk.LEFT)
+
+        # Button to highlight the points where vectors cross each other
+        self.crossings_button = tk.Button(self.input_frame, text="Show Crossings", command=self.toggle_crossings)
+        self.crossings_button.pack(pady=10)
+
         # Create the canvas for the Cartesian plane
-        self.cartesian_plane = CartesianPlan(self, self.point_listbox)
+        self.cartesian_plane = CartesianPlan(self, self.item_list)
         self.cartesian_plane.place(relx=0, rely=0, relwidth=0.8, relheight=1)
 
         # Label to display error messages
-        self.error_label = tk.Label(self.input_frame, text="", fg="red")
+        self.error_label = tk.Label(self.input_frame, text="", fg="red", wraplength=180, justify=tk.LEFT)
         self.error_label.pack(pady=10)
 
+        # Label to display the results of scalar commands (dot, cross, norm), computed by the vector algebra engine
+        self.result_label = tk.Label(self.input_frame, text="")
+        self.result_label.pack(pady=10)
+        self.algebra = vector_algebra.VectorAlgebra(self.cartesian_plane.scene)
+
+        # Journal of the changes made to the scene, restored from the previous session
+        self.journal = None
+        if session_directory is not None:
+            self.restore_session(session_directory)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        # Performance measurements and their overlay on the plane: F3 shows and hides them, F4 dumps a trace file
+        self.instrumentation = instrumentation.Instrumentation()
+        self.hud = instrumentation.Hud(self.cartesian_plane, self.instrumentation)
+        self.bind("<F3>", lambda event: self.toggle_instrumentation())
+        self.bind("<F4>", lambda event: self.dump_trace())
+
+        # Live updates streamed by an external producer (see start_ingest), and the server receiving them, if any
+        self.ingest_queue = None
+        self.ingest_server = None
+        self._ingest_job = None
+
     def draw_point_from_input(self):
         """
-        Handles drawing the point or vector based on the input from the entry box.
-        The formats are:
-            - Point: Letter in uppercase followed by '(' and the x and y coordinates separated by a comma and closed with ')'. Example: A(0,1)
-            - Vector from origin: Letter in lowercase followed by the x and y coordinates separated by a comma. Example: u(1,3)
-            - Vector between two points: Two uppercase letters representing the points. The vector will be from the first point to the second point. Example: AB
-        """
-        input_text = self.input_entry.get()
-
-        # Check if the input is for two existing points (e.g., "AB")
-        if re.match(r"^[A-Z]{2}$", input_text):
-            start_label = input_text[0]
-            end_label = input_text[1]
-
-            # Ensure both points exist
-            if start_label in self.cartesian_plane.items and end_label in self.cartesian_plane.items:
-                # Get the coordinates of both points
-                start_coords = self.cartesian_plane.items[start_label]["coords"]
-                end_coords = self.cartesian_plane.items[end_label]["coords"]
-
-                # Draw the vector from start to end
-                self.cartesian_plane.draw_vector_between_points(start_coords, end_coords, start_label, end_label,
-                                                                input_text)
-                self.point_listbox.insert(tk.END, f"{input_text} vector from {start_label} to {end_label}")
-                self.error_label.config(text="")  # Clear any previous error
-            else:
-                self.error_label.config(text=f"Error: Points {start_label} and/or {end_label} do not exist.")
+        Handles drawing the points and vectors based on the input from the input box.
+        The input can have many statements, separated by ';' or newlines. The formats are (see grammar):
+            - Point: Label starting with an uppercase letter followed by '(' and the x and y coordinates separated by a comma and closed with ')'. Example: A(0,1)
+            - Vector from origin: Label starting with a lowercase letter followed by the x and y coordinates. Example: u(1,3)
+            - Vector between two points: Two uppercase letters representing the points, or label(START,END). The vector will be from the first point to the second point. Example: AB
+            - Vector algebra (see vector_algebra): w=u+v, w=u-v, w=2*u, w=proj(u,v), s=sum(), dot(u,v), cross(u,v) or norm(u)
+        Every statement is validated before anything is drawn; if any is invalid, all the errors are reported and nothing is drawn.
+        """
+        input_text = self.input_entry.get("1.0", "end-1c")
+
+        statements, errors = grammar.parse_batch(input_text)
+        errors += grammar.check(statements, self.cartesian_plane.scene)
+        if errors:
+            shown = [f"Error: {error}" for error in errors[:MAX_ERRORS_SHOWN]]
+            if len(errors) > MAX_ERRORS_SHOWN:
+                shown.append(f"... and {len(errors) - MAX_ERRORS_SHOWN} more errors.")
+            self.error_label.config(text="\n".join(shown))
+            return
+        if not statements:
+            self.error_label.config(text="Invalid input format. Please enter in the format A(0,1), u(1,3), or AB.")
             return
 
-        # Check if the input is for a vector from the origin (e.g., "u(1,3)") or a point (e.g., "A(0,1)")
-        match = re.match(r"([A-Za-z])\((-?\d+),\s*(-?\d+)\)", input_text)
-        if match:
-            label = match.group(1)
-            x = int(match.group(2))
-            y = int(match.group(3))
+        try:
+            self.commit_statements(statements)
+        except ValueError as error:
+            self.error_label.config(text=f"Error: {error}")
+            return
 
-            # Check if the label already exists for both points and vectors
-            if label in self.cartesian_plane.items:
-                self.error_label.config(text=f"Error: Label {label} already exists.")
-                return
+        # Clear any previous error
+        self.error_label.config(text="")
 
-            # Ensure that the coordinates are within the predefined range
-            if -10 <= x <= 10 and -10 <= y <= 10:
-                # Checks if it is a point or a vector to be drawn
-                if label.isupper():
-                    self.cartesian_plane.draw_point(x, y, label)
-                    # Add point's notation to the listbox
-                    self.point_listbox.insert(tk.END, f"{label}({x},{y})")
+    def commit_statements(self, statements):
+        """
+        Applies validated statements to the scene, then draws all the new items in one render pass and adds them to the list in one update.
+        Vector algebra results are added as vectors from the origin, and scalar results are displayed.
+        Results are only known once the statements before them are applied: if one cannot be computed (see
+        VectorAlgebra.evaluate), the items already added are removed and ValueError is raised, so nothing is committed.
+        """
+        scene = self.cartesian_plane.scene
+        labels, results = [], []
+        try:
+            for statement in statements:
+                kind, label = statement[0], statement[1]
+                if kind == POINT:
+                    scene.add_point(label, statement[2], statement[3])
+                elif kind == VECTOR:
+                    scene.add_vector(label, statement[2], statement[3])
+                elif kind == POINT_VECTOR:
+                    scene.add_vector_between(label, statement[2], statement[3])
                 else:
-                    self.cartesian_plane.draw_vector(x, y, label)
-                    # Add vector's notation to the listbox
-                    self.point_listbox.insert(tk.END, f"{label} vector (0,0) to ({x},{y})")
+                    _, label, operation, operands, factor = statement
+                    result = self.algebra.evaluate(operation, operands, factor)
+                    if label is None:
+                        results.append(f"{operation}({', '.join(operands)}) = {result:g}")
+                        continue
+                    scene.add_vector(label, *result)
+                labels.append(label)
+        except ValueError:
+            scene.remove_many(labels)
+            raise
 
-                # Clear the input box after drawing the point or vector in case of any errors present
-                self.error_label.config(text="")
-            else:
-                self.error_label.config(text="Coordinates out of range (-10 to 10).")
-        else:
-            self.error_label.config(text="Invalid input format. Please enter in the format A(0,1), u(1,3), or AB.")
+        if self.journal is not None:
+            self.journal.added(scene, labels)
+        self.cartesian_plane.draw_items(labels)
+        self.item_list.extend(labels)
+        if results:
+            self.result_label.config(text="\n".join(results[-MAX_ERRORS_SHOWN:]))
 
     def delete_item(self):
         """
-        Deletes the selected point or vector from the canvas and the list.
-        The item deleted can be a point or a vector, and to delete just select the item from the listbox and click on the delete button.
-        If the item is:
+        Deletes the selected points and vectors from the canvas and the list.
+        The items deleted can be points or vectors, and to delete just select the items from the listbox and click on the delete button.
+        If an item is:
             - A vector (of any kind): only the item will be deleted
             - A point: if the point is deleted, all vectors that involve this point will also be deleted
         """
-        selected_index = self.point_listbox.curselection()
-        if selected_index:
-            item_info = self.point_listbox.get(selected_index)
+        labels = self.item_list.selected_labels()
+        if labels:
+            # The selection maps directly to the labels of the items, and all selected items are deleted in a single batch
+            self.cartesian_plane.delete_items(labels)
 
-            # Extract the label from the item_info and check if it's a point or a vector
-            if 'vector' in item_info:
-                label = item_info.split(' ')[0]
-                self.cartesian_plane.delete_vector(label)
-            else:
-                label = item_info.split('(')[0]
+            self.error_label.config(text="")
+
+    def load_scene(self, path=None):
+        """
+        Loads a scene file (text or binary, see scene_io) on top of the current scene.
+        The file is streamed in chunks, and each chunk is added and drawn in its own after() callback so the UI stays responsive.
+        """
+        if self._load_job is not None:
+            self.error_label.config(text="Error: A scene is already being loaded.")
+            return
+        path = path or filedialog.askopenfilename(filetypes=[("Scene files", f"*.txt *{scene_io.BINARY_SUFFIX}"),
+                                                             ("All files", "*")])
+        if not path:
+            return
 
-                # Create a list of vectors to delete that involve this point
-                vectors_to_delete = [
-                    vec_label for vec_label, vec_data in list(self.cartesian_plane.items.items())
-                    if vec_data["type"] == "vector" and
-                       (
-                               "points" in vec_data and label in vec_data["points"]  # Vectors between points
-                               or "points" not in vec_data and vec_data["coords"] == (0, 0)  # Vector from origin
-                       )
-                ]
+        chunks = scene_io.iter_records(path)
+        # The whole load is a single step to undo
+        step = None
 
-                # Delete the vectors that involve this point
-                for vec_label in vectors_to_delete:
-                    self.cartesian_plane.delete_vector(vec_label)
+        def load_next_chunk():
+            nonlocal step
+            self._load_job = None
+            try:
+                records = next(chunks, None)
+                if records is None:
+                    return
+                labels = scene_io.add_records(self.cartesian_plane.scene, records)
+                if self.journal is not None:
+                    step = self.journal.added(self.cartesian_plane.scene, labels, step)
+            except (OSError, ValueError) as error:
+                chunks.close()
+                self.error_label.config(text=f"Error loading {path}: {error}")
+                return
 
-                self.cartesian_plane.delete_point(label)
+            self.cartesian_plane.draw_items(labels)
+            self.item_list.extend(labels)
+            self._load_job = self.after(1, load_next_chunk)
 
-            # Update the listbox after deleting the item(s)
-            self.update_listbox()
+        self.error_label.config(text="")
+        load_next_chunk()
 
+    def save_scene(self, path=None):
+        """Saves the current scene to a file; files ending with scene_io.BINARY_SUFFIX use the binary format."""
+        path = path or filedialog.asksaveasfilename(defaultextension=".txt",
+                                                    filetypes=[("Text scene", "*.txt"),
+                                                               ("Binary scene", f"*{scene_io.BINARY_SUFFIX}")])
+        if not path:
+            return
+        try:
+            scene_io.save(self.cartesian_plane.scene, path)
             self.error_label.config(text="")
+        except OSError as error:
+            self.error_label.config(text=f"Error saving {path}: {error}")
+
+    def toggle_race(self):
+        """
+        Starts a race of every point of the scene, or stops the running one.
+        Each point races with the first vector starting at it as its velocity and the second one as its acceleration.
+        The race is drawn on top of the scene, which is left unchanged.
+        """
+        if self.race_loop is not None:
+            self.race_loop.stop()
+            self.race_loop = None
+            self.race_button.config(text="Start Race")
+            return
+
+        racers = race.Race.from_scene(self.cartesian_plane.scene)
+        if not len(racers):
+            self.error_label.config(text="Error: Add points to race first.")
+            return
+        self.race_loop = race.RaceLoop(self.cartesian_plane, racers)
+        self.race_loop.start()
+        self.race_button.config(text="Stop Race")
+        self.error_label.config(text="")
+
+    def cycle_render_mode(self):
+        """Switches the renderer of the plane to the next mode: automatic, one canvas object per item, or rasterized."""
+        modes = (AUTO, VECTOR_MODE, RASTER_MODE)
+        mode = modes[(modes.index(self.cartesian_plane.render_mode) + 1) % len(modes)]
+        self.cartesian_plane.set_render_mode(mode)
+        self.render_button.config(text=f"Render: {mode}")
+
+    def toggle_crossings(self):
+        """Shows or hides the crossings between vectors, and displays how many there are."""
+        plane = self.cartesian_plane
+        plane.show_crossings(plane.intersections is None)
+        if plane.intersections is None:
+            self.crossings_button.config(text="Show Crossings")
+            self.result_label.config(text="")
+        else:
+            self.crossings_button.config(text="Hide Crossings")
+            self.result_label.config(text=f"{len(plane.intersections)} crossings")
+
+    def restore_session(self, directory):
+        """Restores the scene of the previous session from its journal, and renders it once, on the next frame."""
+        self.journal = journal.Journal(directory)
+        scene = self.cartesian_plane.scene
+        try:
+            labels = self.journal.restore(scene)
+        except ValueError as error:
+            # The damaged file was kept aside, and the journal started over from what could be restored
+            labels = list(scene)
+            self.error_label.config(text=f"Error restoring the session: {error}")
+        except OSError as error:
+            # Leave the session files untouched, and keep what could be restored without journaling anything
+            self.journal.close()
+            self.journal = None
+            labels = list(scene)
+            self.error_label.config(text=f"Error restoring the session: {error}")
+        self.cartesian_plane.journal = self.journal
+        # The canvas may not have its size yet: only index the items, and let the next relayout draw the ones in view
+        self.cartesian_plane.index_items(labels)
+        self.item_list.extend(labels)
+
+    def undo(self):
+        """Undoes the last change made to the scene."""
+        if self.journal is not None:
+            self._show_change(self.journal.undo(self.cartesian_plane.scene))
+
+    def redo(self):
+        """Redoes the last change undone."""
+        if self.journal is not None:
+            self._show_change(self.journal.redo(self.cartesian_plane.scene))
+
+    def _show_change(self, change):
+        """Updates the canvas and the list after an undo or a redo, given the (labels added, labels removed) by it."""
+        if change is None:
+            return
+        added, removed = change
+        self.cartesian_plane.forget_items(removed)
+        self.cartesian_plane.draw_items(added)
+        self.item_list.extend(added)
+        self.error_label.config(text="")
+
+    def generate_vectors(self, kind, k=graphs.K_NEIGHBOURS):
+        """
+        Generates vectors between the selected points, or every point if fewer than two are selected (see graphs).
+        The vectors are computed by worker processes and added in chunks, so the app stays responsive meanwhile.
+        Each vector is labeled after its points (e.g. AB), and vectors already in the scene are not added twice.
+        """
+        if self.generation is not None:
+            self.error_label.config(text="Error: Vectors are already being generated.")
+            return
+        scene = self.cartesian_plane.scene
+        selected = [label for label in self.item_list.selected_labels() if scene.kind(label) == POINT]
+        labels = selected if len(selected) >= 2 else [label for label in scene if scene.kind(label) == POINT]
+        points = [(label,) + tuple(scene.coords(label)) for label in labels]
+
+        self._generated_step = None
+        self._generated = 0
+        self.generation = graphs.GenerationJob(self, points, kind, self._add_generated, self._generation_done, k)
+        self.error_label.config(text="")
+        self.result_label.config(text="Generating vectors...")
+        self.generation.start()
+
+    def _add_generated(self, edges):
+        """Adds a chunk of generated vectors (start_label, end_label) to the scene, and draws them."""
+        scene = self.cartesian_plane.scene
+        labels = []
+        for start_label, end_label in edges:
+            # Points deleted since the generation started are skipped
+            if start_label not in scene or end_label not in scene:
+                continue
+            label = start_label + end_label
+            suffix = 1
+            while label in scene:
+                if scene.points_of(label) == (start_label, end_label):
+                    break
+                suffix += 1
+                label = f"{start_label}{end_label}_{suffix}"
+            else:
+                scene.add_vector_between(label, start_label, end_label)
+                labels.append(label)
+
+        if self.journal is not None:
+            # The whole generation is a single step to undo
+            self._generated_step = self.journal.added(scene, labels, self._generated_step)
+        self._generated += len(labels)
+        self.cartesian_plane.draw_items(labels)
+        self.item_list.extend(labels)
+        job = self.generation
+        self.result_label.config(text=f"Generating vectors... {self._generated} ({job.done_tasks}/{job.tasks} tasks)")
+
+    def _generation_done(self, cancelled):
+        """Reports the end of a generation."""
+        if self.generation.error is not None:
+            self.error_label.config(text=f"Error generating vectors: {self.generation.error}")
+        self.generation = None
+        self.result_label.config(text=f"{self._generated} vectors generated" + (" (cancelled)" if cancelled else ""))
+
+    def cancel_generation(self):
+        """Cancels the generation running in the background; the vectors already added are kept."""
+        if self.generation is not None:
+            self.generation.cancel()
+
+    def start_ingest(self, address, policy=ingest.BLOCK, capacity=ingest.MAX_PENDING):
+        """
+        Starts accepting live updates on a local socket or stdin (see ingest.parse_address), in the grammar of the input
+        box or in binary frames. New labels are added to the scene, and known points and vectors from the origin are
+        moved; the updates are applied once per frame, coalesced to the latest state of each label.
+        """
+        self.stop_ingest()
+        self.ingest_queue = ingest.UpdateQueue(capacity, policy)
+        self.ingest_server = ingest.IngestServer(self.ingest_queue, address)
+        self.ingest_server.start()
+        self._ingest_job = self.after(ingest.FRAME_MS, self._drain_ingest)
+
+    def stop_ingest(self):
+        """Stops accepting live updates; the updates still pending are dropped."""
+        if self._ingest_job is not None:
+            self.after_cancel(self._ingest_job)
+            self._ingest_job = None
+        if self.ingest_server is not None:
+            self.ingest_server.stop()
+            self.ingest_server = None
+
+    def _drain_ingest(self):
+        """Applies the updates received since the last frame, and schedules the next drain."""
+        self._ingest_job = None
+        try:
+            statements = self.ingest_queue.drain()
+            if statements:
+                self.apply_updates(statements)
+                counters = self.ingest_queue.snapshot()
+                self.result_label.config(text=f"Streaming: {counters['received']} received, {counters['coalesced']} "
+                                              f"coalesced, {counters['dropped']} dropped, {counters['errors']} errors")
+        finally:
+            # Keep draining even if applying a batch failed, unless the updates were stopped meanwhile
+            if self.ingest_server is not None:
+                self._ingest_job = self.after(ingest.FRAME_MS, self._drain_ingest)
+
+    def apply_updates(self, statements):
+        """
+        Applies a batch of streamed statements: new labels are added as by the input box, and points and vectors
+        from the origin already in the scene are moved to their new coordinates (vector algebra results are
+        computed again). Everything is then drawn in one pass, and the invalid statements are counted as errors.
+        """
+        scene = self.cartesian_plane.scene
+        added, moved = [], []
+        errors = 0
+        for statement in statements:
+            kind, label = statement[0], statement[1]
+            try:
+                if kind == grammar.ALGEBRA:
+                    _, label, operation, operands, factor = statement
+                    kind, (x, y) = VECTOR, self.algebra.evaluate(operation, operands, factor)
+                elif kind != POINT_VECTOR:
+                    x, y = statement[2], statement[3]
+                # Algebra results can overflow to infinities, which cannot be drawn
+                if kind != POINT_VECTOR and not (math.isfinite(x) and math.isfinite(y)):
+                    raise ValueError(f"Coordinates of {label} are too large.")
+
+                if label not in scene:
+                    if kind == POINT:
+                        scene.add_point(label, x, y)
+                    elif kind == VECTOR:
+                        scene.add_vector(label, x, y)
+                    else:
+                        scene.add_vector_between(label, statement[2], statement[3])
+                    added.append(label)
+                elif scene.kind(label) != kind:
+                    raise ValueError(f"Label {label} already exists.")
+                elif kind != POINT_VECTOR:
+                    moved += scene.move(label, x, y)
+                elif scene.points_of(label) != (statement[2], statement[3]):
+                    raise ValueError(f"Label {label} already exists.")
+            except (ValueError, KeyError, ZeroDivisionError):
+                errors += 1
+
+        if self.journal is not None:
+            if added:
+                self.journal.added(scene, added)
+            if moved:
+                self.journal.moved(scene, moved)
+        if added:
+            self.cartesian_plane.draw_items(added)
+        if moved:
+            self.cartesian_plane.move_items(moved)
+        if added:
+            self.item_list.extend(added)
+        elif moved:
+            # The rows show the coordinates of the items
+            self.item_list.refresh()
+        self.ingest_queue.count("applied", len(statements) - errors)
+        if errors:
+            self.ingest_queue.count("errors", errors)
+
+    def toggle_instrumentation(self):
+        """Starts measuring the app and shows the HUD, or stops measuring and hides it."""
+        if self.instrumentation.enabled:
+            self.instrumentation.disable()
+            self.hud.hide()
+        else:
+            self.instrumentation.reset()
+            self.instrumentation.enable(self, self.cartesian_plane, self.item_list)
+            self.hud.show()
+
+    def dump_trace(self, path=None):
+        """Writes the calls timed by the instrumentation to a trace file (Chrome trace event format)."""
+        path = path or filedialog.asksaveasfilename(defaultextension=".json", initialfile="trace.json",
+                                                    filetypes=[("Trace", "*.json")])
+        if not path:
+            return
+        try:
+            events = self.instrumentation.dump_trace(path)
+            self.result_label.config(text=f"{events} trace events written to {path}")
+        except OSError as error:
+            self.error_label.config(text=f"Error writing {path}: {error}")
+
+    def close(self):
+        """Stops the background work, closes the journal and the app."""
+        self.cancel_generation()
+        self.stop_ingest()
+        if self.journal is not None:
+            self.journal.close()
+        self.destroy()
 
     def update_listbox(self):
-        """Updates the listbox to show the current points and vectors."""
-        self.point_listbox.delete(0, tk.END)
-
-        # Insert all points and vectors into the listbox again
-        for label, item in self.cartesian_plane.items.items():
-            if item["type"] == "point":
-                x, y = item["coords"]
-                self.point_listbox.insert(tk.END, f"{label}({x},{y})")
-            elif item["type"] == "vector":
-                if "points" in item:
-                    # Vectors between two points
-                    start_label, end_label = item["points"]
-                    self.point_listbox.insert(tk.END, f"{label} vector from {start_label} to {end_label}")
-                else:
-                    # Vector from the origin (0,0)
-                    x, y = item["coords"]
-                    self.point_listbox.insert(tk.END, f"{label} vector (0,0) to ({x},{y})")
+        """Updates the list to show the current points and vectors; only the visible rows are materialized."""
+        self.item_list.reset(self.cartesian_plane.scene)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vectors Race")
+    parser.add_argument("--listen", metavar="ADDRESS",
+                        help="accept live updates on tcp:HOST:PORT (or just PORT), unix:PATH or - for stdin")
+    parser.add_argument("--policy", choices=ingest.POLICIES, default=ingest.BLOCK,
+                        help="what to do with updates once too many are pending (default: block the producer)")
+    parser.add_argument("--capacity", type=int, default=ingest.MAX_PENDING,
+                        help="maximum number of distinct labels pending between two frames")
+    args = parser.parse_args()
+
     app = App()
     app.geometry("1000x600")
+    if args.listen:
+        try:
+            app.start_ingest(args.listen, args.policy, args.capacity)
+        except (OSError, ValueError) as error:
+            parser.error(f"cannot listen on {args.listen}: {error}")
     app.mainloop()
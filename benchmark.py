@@ -0,0 +1,369 @@
+import argparse
+import collections
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+import types
+
+# Sizes of the synthetic scenes the operations are measured on
+SIZES = (1000, 10000, 100000)
+
+# Relative slowdown (or growth of the number of Tk calls) beyond which a result counts as a regression against the baseline
+THRESHOLD = 0.25
+
+# File the baselines are read from and saved to by default
+BASELINE_PATH = "benchmark_baseline.json"
+
+# Size of the canvas during the benchmarks, and the size it is resized to back and forth by the resize benchmark
+CANVAS_SIZE = (800, 600)
+RESIZED_SIZE = (1000, 700)
+RESIZES = 20
+
+# Number of points deleted, one at a time, by the cascade benchmark
+DELETES = 100
+
+# Number of Tk calls of each kind (e.g. "create_line" or "coords") since the counters were last reset
+CALLS = collections.Counter()
+
+
+class StubWidget:
+    """
+    Stand-in for every Tk widget, which does nothing but count the calls made to it.
+    Unknown methods are accepted and return None; the methods whose results the app uses return plausible values.
+    """
+
+    def __init__(self, master=None, **kwargs):
+        self.master = master
+        self._size = CANVAS_SIZE
+        self._next_id = 0
+        self._text = ""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            CALLS[name] += 1
+        return call
+
+    def winfo_width(self):
+        CALLS["winfo_width"] += 1
+        return self._size[0]
+
+    def winfo_height(self):
+        CALLS["winfo_height"] += 1
+        return self._size[1]
+
+    def _create(self, kind):
+        CALLS["create_" + kind] += 1
+        self._next_id += 1
+        return self._next_id
+
+    def create_line(self, *args, **kwargs):
+        return self._create("line")
+
+    def create_oval(self, *args, **kwargs):
+        return self._create("oval")
+
+    def create_text(self, *args, **kwargs):
+        return self._create("text")
+
+    def create_rectangle(self, *args, **kwargs):
+        return self._create("rectangle")
+
+    def create_image(self, *args, **kwargs):
+        return self._create("image")
+
+    def coords(self, *args):
+        CALLS["coords"] += 1
+        return []
+
+    def bbox(self, *args):
+        CALLS["bbox"] += 1
+        return 0, 0, 0, 0
+
+    def after(self, ms, function=None, *args):
+        CALLS["after"] += 1
+        self._next_id += 1
+        return f"after#{self._next_id}"
+
+    def curselection(self):
+        CALLS["curselection"] += 1
+        return ()
+
+    def get(self, *args):
+        CALLS["get"] += 1
+        return self._text
+
+
+class StubPhotoImage:
+    """Stand-in for tk.PhotoImage."""
+
+    def __init__(self, master=None, **kwargs):
+        CALLS["photoimage"] += 1
+
+
+class StubFont:
+    """Stand-in for tkinter.font.Font."""
+
+    def __init__(self, root=None, **kwargs):
+        CALLS["font"] += 1
+
+    def __str__(self):
+        return "font1"
+
+
+def install_stub():
+    """Installs a stub tkinter module, so the app can be created and driven without a display."""
+    module = types.ModuleType("tkinter")
+    for name in ("Tk", "Toplevel", "Frame", "Label", "Button", "Entry", "Text", "Listbox", "Scrollbar", "Canvas"):
+        setattr(module, name, type(name, (StubWidget,), {}))
+    module.PhotoImage = StubPhotoImage
+    module.TkVersion = 8.6
+    # Constants such as tk.END or tk.HIDDEN are the lowercase version of their name, as in tkinter
+    module.__getattr__ = lambda name: name.lower() if name.isupper() else _missing(name)
+    dialogs = types.ModuleType("tkinter.filedialog")
+    dialogs.askopenfilename = dialogs.asksaveasfilename = lambda **kwargs: ""
+    module.filedialog = dialogs
+    fonts = types.ModuleType("tkinter.font")
+    fonts.Font = StubFont
+    module.font = fonts
+    sys.modules["tkinter"] = module
+    sys.modules["tkinter.filedialog"] = dialogs
+    sys.modules["tkinter.font"] = fonts
+
+
+def _missing(name):
+    """Raises the AttributeError of a missing module attribute."""
+    raise AttributeError(f"module 'tkinter' has no attribute '{name}'")
+
+
+class CountingInterpreter:
+    """Wraps the Tcl interpreter of a real Tk, counting the Tk commands called through it by their name."""
+
+    def __init__(self, interpreter):
+        self._interpreter = interpreter
+
+    def call(self, *args):
+        if args:
+            # Widget commands are called as (path, command, ...), other commands as (command, ...)
+            name = args[1] if str(args[0]).startswith(".") and len(args) > 1 else args[0]
+            CALLS[str(name)] += 1
+        return self._interpreter.call(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._interpreter, name)
+
+
+def install_counter():
+    """Makes the Tk interpreters created from now on count their calls."""
+    import _tkinter
+    create = _tkinter.create
+    _tkinter.create = lambda *args, **kwargs: CountingInterpreter(create(*args, **kwargs))
+
+
+def start_xvfb():
+    """Starts a virtual X server if there is no display, and returns its process (or None if a display is available)."""
+    if os.environ.get("DISPLAY"):
+        return None
+    if shutil.which("Xvfb") is None:
+        raise RuntimeError("There is no display and Xvfb is not installed; use --display stub.")
+    display = ":{}".format(90 + os.getpid() % 10)
+    process = subprocess.Popen(["Xvfb", display, "-screen", "0", "1280x1024x24"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = display
+    # Leave the server a moment to accept connections
+    time.sleep(1)
+    return process
+
+
+def synthetic_records(size, seed=0):
+    """
+    Returns the records (kind, label, a, b) of a synthetic scene of size items: half points, a quarter of vectors from
+    the origin and a quarter of vectors between random points.
+    """
+    from scene import POINT, VECTOR, POINT_VECTOR
+    rng = random.Random(seed)
+    points = size // 2
+    records = [(POINT, f"P{i}", rng.uniform(-10, 10), rng.uniform(-10, 10)) for i in range(points)]
+    records += [(VECTOR, f"v{i}", rng.uniform(-10, 10), rng.uniform(-10, 10)) for i in range(size // 4)]
+    records += [(POINT_VECTOR, f"e{i}", f"P{rng.randrange(points)}", f"P{rng.randrange(points)}")
+                for i in range(size - len(records))]
+    return records
+
+
+class Bench:
+    """Drives the entry points of a fresh app on a synthetic scene, and measures them."""
+
+    def __init__(self, size, real_tk):
+        import app
+        self.size = size
+        self.real_tk = real_tk
+        self.app = app.App(None)
+        self.plane = self.app.cartesian_plane
+        self.resize(*CANVAS_SIZE)
+        self.records = synthetic_records(size)
+
+    def resize(self, width, height):
+        """Resizes the canvas and lets the app handle it, as the window manager would."""
+        if self.real_tk:
+            self.app.geometry(f"{int(width / 0.8)}x{height}")
+            self.app.update()
+        else:
+            self.plane._size = (width, height)
+            self.plane._on_resize(None)
+        self.flush()
+
+    def flush(self):
+        """Runs the relayout scheduled for the next frame right away, and lets Tk draw if it is real."""
+        plane = self.plane
+        if plane._relayout_job is not None:
+            plane.after_cancel(plane._relayout_job)
+            plane._relayout()
+        if self.real_tk:
+            self.app.update_idletasks()
+
+    def draw(self):
+        """draw_point, draw_vector and draw_vector_between_points, once per item of the scene."""
+        from scene import POINT, VECTOR
+        plane = self.plane
+        for kind, label, a, b in self.records:
+            if kind == POINT:
+                plane.draw_point(a, b, label)
+            elif kind == VECTOR:
+                plane.draw_vector(a, b, label)
+            else:
+                plane.draw_vector_between_points(a, b, label)
+        self.app.item_list.extend(label for _, label, _, _ in self.records)
+        self.flush()
+        return len(self.records)
+
+    def redraw_items(self):
+        """redraw_items, which draws every visible item from scratch."""
+        self.plane.redraw_items()
+        self.flush()
+        return 1
+
+    def on_resize(self):
+        """_on_resize and the relayout it schedules, back and forth between two sizes."""
+        for i in range(RESIZES):
+            self.resize(*(RESIZED_SIZE if i % 2 == 0 else CANVAS_SIZE))
+        return RESIZES
+
+    def update_listbox(self):
+        """App.update_listbox, which rebuilds the list of items."""
+        self.app.update_listbox()
+        self.flush()
+        return 1
+
+    def delete_point(self):
+        """delete_point on the points with the most vectors, one at a time, so each deletion cascades."""
+        scene = self.plane.scene
+        hubs = sorted((label for _, label, _, _ in self.records if label.startswith("P")),
+                      key=lambda label: len(scene.incident.get(label, ())), reverse=True)[:DELETES]
+        for label in hubs:
+            self.plane.delete_point(label)
+        self.flush()
+        return len(hubs)
+
+
+# Benchmarked operations, run in this order on the same app since each one needs the scene the previous ones left
+OPERATIONS = ("draw", "redraw_items", "on_resize", "update_listbox", "delete_point")
+
+
+def run(sizes, real_tk, repeat=3):
+    """Runs every operation on every size and returns {"operation@size": {"seconds", "calls", "top"}}, per operation."""
+    results = {}
+    for size in sizes:
+        best = {}
+        for _ in range(repeat):
+            bench = Bench(size, real_tk)
+            for operation in OPERATIONS:
+                CALLS.clear()
+                start = time.perf_counter()
+                count = getattr(bench, operation)()
+                elapsed = time.perf_counter() - start
+                key = f"{operation}@{size}"
+                calls = sum(CALLS.values())
+                if key not in best or elapsed / count < best[key]["seconds"]:
+                    best[key] = {"seconds": elapsed / count, "calls": calls / count, "count": count,
+                                 "top": CALLS.most_common(3)}
+            if real_tk:
+                bench.app.destroy()
+        results.update(best)
+    return results
+
+
+def report(results, baseline=None, threshold=THRESHOLD):
+    """Prints the results, compared with the baseline if any, and returns the keys of the regressions."""
+    regressions = []
+    print(f"{'operation':<24}{'per op':>12}{'Tk calls/op':>14}  {'vs baseline':<14}most frequent Tk calls")
+    for key, result in results.items():
+        comparison = ""
+        if baseline is not None and key in baseline:
+            reference = baseline[key]
+            ratio = result["seconds"] / reference["seconds"] if reference["seconds"] else 1.0
+            comparison = f"{ratio:.2f}x"
+            if ratio > 1 + threshold or result["calls"] > reference["calls"] * (1 + threshold):
+                regressions.append(key)
+                comparison += " SLOWER" if ratio > 1 + threshold else " CALLS"
+        top = ", ".join(f"{name} {count}" for name, count in result["top"])
+        print(f"{key:<24}{result['seconds'] * 1e6:>10.1f}us{result['calls']:>14.1f}  {comparison:<14}{top}")
+    return regressions
+
+
+def main(argv=None):
+    """Command-line entry point of the benchmarks."""
+    parser = argparse.ArgumentParser(description="Benchmarks of the drawing, redrawing, resizing and deleting hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="numbers of items of the scenes")
+    parser.add_argument("--display", choices=("stub", "xvfb"), default="stub",
+                        help="stub Tk widgets counting their calls (default), or real Tk, on Xvfb if there is no display")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each size, keeping the fastest")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file to compare with (if it exists)")
+    parser.add_argument("--save-baseline", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="relative slowdown counted as a regression")
+    args = parser.parse_args(argv)
+
+    real_tk = args.display == "xvfb"
+    xvfb = None
+    if real_tk:
+        try:
+            xvfb = start_xvfb()
+        except RuntimeError as error:
+            print(f"Error: {error}", file=sys.stderr)
+            return 2
+        install_counter()
+    else:
+        install_stub()
+
+    try:
+        results = run(args.sizes, real_tk, args.repeat)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            stored = json.load(file)
+        if stored.get("display") != args.display:
+            print(f"Warning: the baseline was measured with --display {stored.get('display')}", file=sys.stderr)
+        baseline = stored["results"]
+
+    regressions = report(results, baseline, args.threshold)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump({"display": args.display, "results": results}, file, indent=1)
+        print(f"Baseline saved to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
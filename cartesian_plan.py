@@ -1,300 +1,847 @@
+import math
+import time
 import tkinter as tk
-from utils import generate_random_color
+import tkinter.font as tkfont
+import raster
+from intersections import IntersectionIndex
+from scene import POINT, VECTOR, REMOVED
+from spatial_index import GridIndex, OriginIndex, segment_distance
+from viewport import Viewport, nice_step
 
-class CartesianPlan(tk.Canvas):
-    def __init__(self, master, listbox, **kwargs):
-        super().__init__(master, **kwargs)
-        self.config(bg="white", highlightthickness=0)
-        self.bind("<Configure>", self._on_resize)
+# Minimum interval, in milliseconds, between two relayouts of the canvas (about one frame at 60 FPS)
+FRAME_MS = 16
 
-        self.origin = None
-        # Dictionary to store items (points and vectors) with their labels as keys
-        self.items = {}
+# Zoom factor applied by each notch of the mouse wheel
+ZOOM_STEP = 1.1
 
-        # Store reference to the listbox
-        self.listbox = listbox
+# Margin, in pixels, kept around the viewport when culling items, so labels next to the border are still drawn
+CULL_MARGIN = 30
 
-    def _on_resize(self, event):
-        self.update()
-        self.origin = (self.winfo_width() / 2, self.winfo_height() / 2)
-        self.draw_axes()
-        self.redraw_items()
+# Level of detail: above LABEL_THRESHOLD visible items the labels are hidden, and above RASTER_THRESHOLD
+# the visible items are rasterized into a single image instead of one canvas object each
+LABEL_THRESHOLD = 300
+RASTER_THRESHOLD = 5000
 
-    def draw_axes(self):
-        """Draws the x and y axes on the canvas."""
-        self.delete("axes")
-        width = self.winfo_width()
-        height = self.winfo_height()
+# Render modes: pick by the number of visible items, or force one of the renderers
+AUTO = "auto"
+VECTOR_MODE = "vector"
+RASTER_MODE = "raster"
 
-        # Draw x and y axes, respectively
-        self.create_line(0, self.origin[1], width, self.origin[1], fill="black", tags="axes")
-        self.create_line(self.origin[0], 0, self.origin[0], height, fill="black", tags="axes")
+# Distance, in pixels, within which the mouse hits an item, and that a press may move and still count as a click
+HIT_RADIUS = 6
+CLICK_TOLERANCE = 3
 
-        # Draw grid points, lines, and labels with values ranging from -10 to 10 - It means 21 parts, because 0 is also included
-        self.draw_grid_points(21)
+# Maximum number of selected items highlighted at once
+MAX_SELECTION_MARKERS = 500
 
-    def draw_grid_points(self, divisions):
-        """Draw points, lines, and coordinate values from -10 to 10 on the Cartesian plane."""
-        width = self.winfo_width()
-        height = self.winfo_height()
+# Maximum number of crossings highlighted at once, and the radius in pixels of their markers
+MAX_CROSSING_MARKERS = 2000
+CROSSING_RADIUS = 4
 
-        # Calculate the step size for x and y axes based on 21 parts - which means "how many pixels each coordinate will take"
-        x_step = width // (divisions - 1)
-        y_step = height // (divisions - 1)
-
-        # Draw points, lines, and labels on the x-axis (-10 to 10)
-        for i in range(-10, 11):  # Range from -10 to 10
-            x = self.origin[0] + i * x_step
-            # Draw vertical grid line
-            self.create_line(x, 0, x, height, fill="lightgray", dash=(2, 2), tags="axes")
-            # Draw a small point at the intersection with the x-axis
-            self.create_oval(x - 2, self.origin[1] - 2, x + 2, self.origin[1] + 2, fill="black", tags="axes")
-            # Add the label for the x coordinate, besides the (0, 0) coordinate
-            if i != 0:
-                self.create_text(x, self.origin[1] + 15, text=f"{i}", tags="axes")
-
-        # Draw points, lines, and labels on the y-axis (-10 to 10)
-        for i in range(-10, 11):  # Range from -10 to 10
-            y = self.origin[1] - i * y_step
-            # Draw horizontal grid line
-            self.create_line(0, y, width, y, fill="lightgray", dash=(2, 2), tags="axes")
-            # Draw a small point at the intersection with the y-axis
-            self.create_oval(self.origin[0] - 2, y - 2, self.origin[0] + 2, y + 2, fill="black", tags="axes")
-            # Add the label for the y coordinate, besides the (0, 0) coordinate
-            if i != 0:
-                self.create_text(self.origin[0] + 15, y, text=f"{i}", tags="axes")
 
-    def draw_point(self, x, y, label):
-        """Draws a point on the Cartesian plane given the Cartesian coordinates and a label."""
-        width = self.winfo_width()
-        height = self.winfo_height()
-
-        # Calculate the pixel coordinates based on the canvas size and origin (20 steps are considered for the range -10 to 10)
-        x_pixel = self.origin[0] + (x * (width // 20))
-        y_pixel = self.origin[1] - (y * (height // 20))  # Invert y-axis for Cartesian plane
+class CartesianPlan(tk.Canvas):
+    def __init__(self, master, item_list, **kwargs):
+        super().__init__(master, **kwargs)
+        self.config(bg="white", highlightthickness=0)
+        self.bind("<Configure>", self._on_resize)
 
-        color = generate_random_color()
+        # Dragging with the left button pans the plane, and the mouse wheel zooms around the cursor
+        self.bind("<ButtonPress-1>", self._on_drag_start)
+        self.bind("<B1-Motion>", self._on_drag)
+        # Clicking (without dragging) selects the item under the cursor, hovering inspects it, and Delete deletes the selection
+        self.bind("<ButtonRelease-1>", self._on_click)
+        self.bind("<Motion>", self._on_hover)
+        self.bind("<Leave>", self._on_leave)
+        self.bind("<Delete>", lambda event: self.delete_items(self.item_list.selected_labels()))
+        self.bind("<MouseWheel>", lambda event: self._on_zoom(event, event.delta > 0))
+        self.bind("<Button-4>", lambda event: self._on_zoom(event, True))
+        self.bind("<Button-5>", lambda event: self._on_zoom(event, False))
+
+        # World-to-pixel mapping of the plane, and pixel position of the world origin (0,0)
+        self.viewport = Viewport()
+        self.origin = self.viewport.to_pixel(0, 0)
+        # Canvas ids of the x and y axes and the ticks of the grid layer, created once and then moved in place
+        self.axes_ids = None
+        self.grid = {"x": [], "y": []}
+        self.divisions = 21
+        # Headless model holding every point and vector; the canvas only renders from it
+        self.scene = item_list.scene
+        # Spatial index over the items of the scene, keyed by slot, used to only draw the items that intersect the
+        # viewport, with the vectors from the origin kept apart by angle, and the compactions of the scene they were
+        # built after (see _slots_in)
+        self.spatial = GridIndex()
+        self.origin_vectors = OriginIndex()
+        self._compactions = self.scene.compactions
+        # Canvas ids (shape, text) of every drawn item, with their labels as keys - off-screen items have none
+        self.graphics = {}
+        # Font of the labels of the vectors, created once and shared by name by every label, instead of a font
+        # description parsed for each of them; reconfiguring it restyles all the labels at once
+        self.label_font = tkfont.Font(self, family="Arial", size=12, weight="bold")
+
+        # Level of detail of the rendering, see set_render_mode
+        self.render_mode = AUTO
+        self.labels_hidden = False
+        # Canvas image of the rasterized scene and the PhotoImage it shows, while the raster renderer is in use,
+        # how long, in milliseconds, the last rasterization took, and how far the image was dragged since then
+        self.raster_id = None
+        self.raster_image = None
+        self.raster_ms = 0
+        self.raster_shift = (0, 0)
+
+        # Crossings between the vectors of the scene, kept up to date while they are highlighted (see show_crossings)
+        self.intersections = None
+
+        # Journal the deletions go through, if any (see journal)
+        self.journal = None
+
+        # Store reference to the list of items
+        self.item_list = item_list
+
+        # Pending relayout, if any, and whether it must move the items already drawn (and not only cull them)
+        self._relayout_job = None
+        self._relayout_moves = False
+        self._drag_position = None
+        self._press_position = None
+
+        # Label of the item under the mouse and the canvas ids (background, text) of its inspector, once created
+        self.hovered = None
+        self.inspector_ids = None
+        # Last position of the mouse and pending inspection of the item under it, if any
+        self._hover_position = None
+        self._hover_job = None
 
-        # Store the point in a dictionary with logical coordinates and color
-        # The -5 and +5 are to ensure the point is centered on the pixel coordinates (there's a circle with a radius of 5)
-        point_id = self.create_oval(x_pixel - 5, y_pixel - 5, x_pixel + 5, y_pixel + 5, fill=color, tags="items")
-        text_id = self.create_text(x_pixel + 10, y_pixel - 10, text=label, tags="items")
-        self.items[label] = {"type": "point", "coords": (x, y), "graphic": (point_id, text_id), "color": color}
+    def _on_resize(self, event):
+        """Coalesces resize events so that the canvas is laid out at most once per frame."""
+        self.schedule_relayout()
+
+    def _on_drag_start(self, event):
+        """Remembers where a drag starts."""
+        self._drag_position = (event.x, event.y)
+        self._press_position = (event.x, event.y)
+
+    def _on_drag(self, event):
+        """Pans the plane: the items already drawn are shifted at once, and the culling is done on the next frame."""
+        if self._drag_position is None:
+            return
+        dx = event.x - self._drag_position[0]
+        dy = event.y - self._drag_position[1]
+        self._drag_position = (event.x, event.y)
+
+        self.viewport.pan(dx, dy)
+        self.origin = self.viewport.to_pixel(0, 0)
+        self.move("items", dx, dy)
+        self.move("raster", dx, dy)
+        self.move("overlays", dx, dy)
+        if self.raster_id is not None:
+            self.raster_shift = (self.raster_shift[0] + dx, self.raster_shift[1] + dy)
+        self.schedule_relayout(moves=False)
+
+    def _on_click(self, event):
+        """Selects the item under the cursor, both on the canvas and in the list of items, unless the plane was dragged."""
+        if self._press_position is None:
+            return
+        press_x, press_y = self._press_position
+        self._press_position = None
+        if abs(event.x - press_x) > CLICK_TOLERANCE or abs(event.y - press_y) > CLICK_TOLERANCE:
+            # The rasterized image was only shifted while dragging, render what came into view
+            if self.raster_shift != (0, 0):
+                self.schedule_relayout()
+            return
+
+        self.focus_set()
+        label = self.item_at(event.x, event.y)
+        self.item_list.select([label] if label is not None else [])
+        self.draw_selection()
+
+    def _on_leave(self, event):
+        """Hides the inspector, including the one a pending hover would show."""
+        self._hover_position = None
+        if self._hover_job is not None:
+            self.after_cancel(self._hover_job)
+            self._hover_job = None
+        self.inspect(None)
+
+    def _on_hover(self, event):
+        """Inspects the item under the cursor, at most once per frame however fast the mouse moves."""
+        self._hover_position = (event.x, event.y)
+        if self._hover_job is None:
+            self._hover_job = self.after(FRAME_MS, self._hover)
+
+    def _hover(self):
+        """Inspects the item under the last position of the mouse."""
+        self._hover_job = None
+        x_pixel, y_pixel = self._hover_position
+        self.inspect(self.item_at(x_pixel, y_pixel), x_pixel, y_pixel)
+
+    def _on_zoom(self, event, zoom_in):
+        """Zooms in or out around the mouse cursor."""
+        self.viewport.zoom_at(ZOOM_STEP if zoom_in else 1 / ZOOM_STEP, event.x, event.y)
+        self.schedule_relayout()
+
+    def reset_view(self):
+        """Goes back to the default view, from -10 to 10 on both axes."""
+        self.viewport.reset()
+        self.schedule_relayout()
+
+    def set_render_mode(self, mode):
+        """
+        Chooses the renderer: VECTOR_MODE (one canvas object per item), RASTER_MODE (a single rasterized image),
+        or AUTO, which switches to the raster renderer above RASTER_THRESHOLD visible items.
+        """
+        self.render_mode = mode
+        self.schedule_relayout()
+
+    def schedule_relayout(self, moves=True):
+        """
+        Schedules a relayout on the next frame, coalescing all the requests made until then.
+        With moves=False the items already drawn are assumed to be in place, and only the culling is updated.
+        """
+        self._relayout_moves = self._relayout_moves or moves
+        if self._relayout_job is None:
+            # While rasterizing, leave the main loop at least twice the time of a rasterization to handle events
+            delay = max(FRAME_MS, int(2 * self.raster_ms)) if self.raster_id is not None else FRAME_MS
+            # Looked up when it runs, so a relayout scheduled before instrumentation is enabled or disabled follows it
+            self._relayout_job = self.after(delay, lambda: self._relayout())
+
+    def _relayout(self):
+        """Updates the viewport for the current canvas size and moves the axes and items accordingly."""
+        self._relayout_job = None
+        moves, self._relayout_moves = self._relayout_moves, False
+        self.viewport.resize(self.winfo_width(), self.winfo_height())
+        self.origin = self.viewport.to_pixel(0, 0)
+        self.draw_axes()
+        self.relayout_items(moves)
+        self.draw_crossings()
+        self.draw_selection()
 
-    def draw_vector(self, x, y, label):
-        """Draws a vector from the origin (0,0) to the specified coordinates with an arrow and a label."""
+    def draw_axes(self):
+        """Draws the x and y axes on the canvas, creating them the first time and moving them on later calls."""
         width = self.winfo_width()
         height = self.winfo_height()
 
-        # Pixel coordinates for (0,0) and (x,y) - 20 steps are considered for the range -10 to 10
-        x_pixel = self.origin[0] + (x * (width // 20))
-        y_pixel = self.origin[1] - (y * (height // 20))  # Invert y-axis for Cartesian plane
-
-        color = generate_random_color()
-
-        line_id = self.create_line(self.origin[0], self.origin[1], x_pixel, y_pixel, fill=color, arrow=tk.LAST, width=2,
-                                   tags="vector")
+        # Draw x and y axes, respectively
+        x_axis_coords = (0, self.origin[1], width, self.origin[1])
+        y_axis_coords = (self.origin[0], 0, self.origin[0], height)
+        if self.axes_ids is None:
+            self.axes_ids = (self.create_line(*x_axis_coords, fill="black", tags="axes"),
+                             self.create_line(*y_axis_coords, fill="black", tags="axes"))
+        else:
+            self.coords(self.axes_ids[0], *x_axis_coords)
+            self.coords(self.axes_ids[1], *y_axis_coords)
 
-        # Add the label at the end of the vector
-        text_id = self.create_text(x_pixel + 10, y_pixel - 10, text=label, fill=color, font=("Arial", 12, "bold"),
-                                   tags="vector")
+        # Draw grid points, lines, and labels over the visible range - By default 21 ticks per axis (-10 to 10), because 0 is also included
+        self.draw_grid_points(self.divisions)
 
-        # Store the vector (line and label) in the items dictionary with logical coordinates and color
-        self.items[label] = {"type": "vector", "coords": (x, y), "graphic": (line_id, text_id), "color": color}
+    def _grid_tick(self):
+        """Creates the canvas objects (grid line, small point, coordinate value) of a new grid tick."""
+        line_id = self.create_line(0, 0, 0, 0, fill="lightgray", dash=(2, 2), tags=("axes", "grid"))
+        oval_id = self.create_oval(0, 0, 0, 0, fill="black", tags=("axes", "grid"))
+        text_id = self.create_text(0, 0, text="", tags=("axes", "grid"))
+        # The value of the tick is only known once it is laid out
+        return [None, line_id, oval_id, text_id]
 
-    def draw_vector_between_points(self, start_coords, end_coords, start_label, end_label, label):
-        """Draws a vector from one point to another based on their coordinates, with the label dislocated based on orientation."""
+    def draw_grid_points(self, divisions):
+        """
+        Lays out the grid points, lines, and coordinate values over the visible part of the Cartesian plane.
+        About divisions ticks are shown on each axis, with the step rounded to 1, 2 or 5 times a power of ten.
+        The grid is a persistent layer: its objects are only created when more ticks are needed and are otherwise moved in place.
+        """
         width = self.winfo_width()
         height = self.winfo_height()
+        x_min, y_min, x_max, y_max = self.viewport.world_bounds()
+
+        # The ticks follow the axes, but stay on the canvas when an axis is panned out of view
+        axis_x = min(max(self.origin[0], 0), width - 25)
+        axis_y = min(max(self.origin[1], 0), height - 25)
+
+        grew = False
+        for axis, low, high in (("x", x_min, x_max), ("y", y_min, y_max)):
+            step = nice_step((high - low) / (divisions - 1))
+            values = [round(i * step, 10) for i in range(math.ceil(low / step), math.floor(high / step) + 1)]
+            ticks = self.grid[axis]
+
+            # Create the missing ticks and delete the surplus ones, if the number of visible ticks changed
+            while len(ticks) < len(values):
+                ticks.append(self._grid_tick())
+                grew = True
+            while len(ticks) > len(values):
+                self.delete(*ticks.pop()[1:])
+
+            for tick, value in zip(ticks, values):
+                _, line_id, oval_id, text_id = tick
+                if axis == "x":
+                    # Vertical grid line, small point at the intersection with the x-axis and the value below it
+                    x = self.viewport.to_pixel(value, 0)[0]
+                    self.coords(line_id, x, 0, x, height)
+                    self.coords(oval_id, x - 2, axis_y - 2, x + 2, axis_y + 2)
+                    self.coords(text_id, x, axis_y + 15)
+                else:
+                    # Horizontal grid line, small point at the intersection with the y-axis and the value besides it
+                    y = self.viewport.to_pixel(0, value)[1]
+                    self.coords(line_id, 0, y, width, y)
+                    self.coords(oval_id, axis_x - 2, y - 2, axis_x + 2, y + 2)
+                    self.coords(text_id, axis_x + 15, y)
+
+                # Only relabel the tick if its value changed - the (0, 0) coordinate has no label
+                if tick[0] != value:
+                    tick[0] = value
+                    self.itemconfig(text_id, text=f"{value:g}" if value != 0 else "")
+
+        # New grid objects are created on top of everything, so send the whole layer back below the items
+        # (but still above the rasterized image, if any)
+        if grew:
+            self.tag_lower("axes")
+            if self.raster_id is not None:
+                self.tag_lower(self.raster_id)
+
+    def to_pixel(self, x, y):
+        """Converts logical coordinates into pixel coordinates for the current viewport."""
+        return self.viewport.to_pixel(x, y)
+
+    @staticmethod
+    def _point_layout(x_pixel, y_pixel):
+        """Returns the canvas coordinates of a point's circle and label for its pixel position."""
+        # The -5 and +5 are to ensure the point is centered on the pixel coordinates (there's a circle with a radius of 5)
+        return (x_pixel - 5, y_pixel - 5, x_pixel + 5, y_pixel + 5), (x_pixel + 10, y_pixel - 10)
 
-        # Get pixel coordinates for the start and end points
-        start_x_pixel = self.origin[0] + (start_coords[0] * (width // 20))
-        start_y_pixel = self.origin[1] - (start_coords[1] * (height // 20))
-        end_x_pixel = self.origin[0] + (end_coords[0] * (width // 20))
-        end_y_pixel = self.origin[1] - (end_coords[1] * (height // 20))
-
+    @staticmethod
+    def _vector_layout(start_x_pixel, start_y_pixel, end_x_pixel, end_y_pixel):
+        """Returns the canvas coordinates of a vector between points and of its label, dislocated based on orientation."""
         # Calculate the midpoint for the label - the label is placed slightly dislocated from the middle of the vector, so it does not mix with the vector
         mid_x_pixel = (start_x_pixel + end_x_pixel) / 2
         mid_y_pixel = (start_y_pixel + end_y_pixel) / 2
 
-        color = generate_random_color()
-
-        # Draw the vector (line from start to end)
-        line_id = self.create_line(start_x_pixel, start_y_pixel, end_x_pixel, end_y_pixel, fill=color, arrow=tk.LAST,
-                                   width=2,
-                                   tags="vector")
-
         # Determine the dislocation based on the orientation of the vector
         if abs(start_x_pixel - end_x_pixel) > abs(start_y_pixel - end_y_pixel):
-            text_id = self.create_text(mid_x_pixel, mid_y_pixel - 10, text=label, fill=color,
-                                       font=("Arial", 12, "bold"),
-                                       tags="vector")
+            text_coords = (mid_x_pixel, mid_y_pixel - 10)
         elif abs(start_y_pixel - end_y_pixel) > abs(start_x_pixel - end_x_pixel):
-            text_id = self.create_text(mid_x_pixel + 10, mid_y_pixel, text=label, fill=color,
-                                       font=("Arial", 12, "bold"),
-                                       tags="vector")
+            text_coords = (mid_x_pixel + 10, mid_y_pixel)
         else:
-            text_id = self.create_text(mid_x_pixel + 10, mid_y_pixel - 10, text=label, fill=color,
-                                       font=("Arial", 12, "bold"),
-                                       tags="vector")
-
-        # Store the vector (line and label) in the items dictionary, along with its start and end points
-        self.items[label] = {
-            "type": "vector",
-            "coords": (start_coords, end_coords),
-            "points": (start_label, end_label),  # Used to identify the points involved in the vector
-            "graphic": (line_id, text_id),
-            "color": color
-        }
+            text_coords = (mid_x_pixel + 10, mid_y_pixel - 10)
+        return (start_x_pixel, start_y_pixel, end_x_pixel, end_y_pixel), text_coords
 
-    def redraw_items(self):
-        """Redraw all items (points and vectors) based on the new canvas size."""
-        self.delete("items")  # Clear all existing items (points, vectors) from the canvas
+    def draw_point(self, x, y, label):
+        """Adds a point to the scene given the Cartesian coordinates and a label, and draws it if it is in view."""
+        self.scene.add_point(label, x, y)
+        self.draw_items([label])
 
-        for label, item in self.items.items():
-            x, y = item["coords"]
-            color = item["color"]
-
-            # Check if it's a point or a vector and redraw accordingly
-            if item["type"] == "point":
-                self.redraw_point(x, y, label, color)
-            elif item["type"] == "vector":
-                if "points" in item:
-                    start_coords, end_coords = item["coords"]
-                    start_label, end_label = item["points"]
-                    self.redraw_vector_between_points(start_coords, end_coords, label, color)
+    def draw_vector(self, x, y, label):
+        """Adds a vector from the origin (0,0) to the specified coordinates to the scene, and draws it if it is in view."""
+        self.scene.add_vector(label, x, y)
+        self.draw_items([label])
+
+    def draw_vector_between_points(self, start_label, end_label, label):
+        """Adds a vector from one existing point to another to the scene, and draws it if it is in view."""
+        self.scene.add_vector_between(label, start_label, end_label)
+        self.draw_items([label])
+
+    def _index_item(self, label):
+        """Registers an item of the scene in the spatial index with its bounding box."""
+        scene = self.scene
+        slot = scene.index[label]
+        kind = scene.kinds[slot]
+        if kind == POINT:
+            self.spatial.insert_point(slot, scene.xs[slot], scene.ys[slot])
+        elif kind == VECTOR:
+            self.origin_vectors.insert(slot, scene.xs[slot], scene.ys[slot])
+        else:
+            start, end = scene.starts[slot], scene.ends[slot]
+            self.spatial.insert_segment(slot, scene.xs[start], scene.ys[start], scene.xs[end], scene.ys[end])
+
+    def _sync_spatial(self):
+        """
+        Rebuilds the spatial index if the scene renumbered its slots since it was built.
+        Removed items are left in the index until then, under slots the scene marks REMOVED.
+        """
+        if self._compactions != self.scene.compactions:
+            self._compactions = self.scene.compactions
+            self.spatial.clear()
+            self.origin_vectors.clear()
+            for label in self.scene:
+                self._index_item(label)
+
+    def _slots_in(self, x_min, y_min, x_max, y_max):
+        """Returns the slots of the items whose bounding box intersects a rectangle, including removed ones."""
+        self._sync_spatial()
+        found = self.spatial.query(x_min, y_min, x_max, y_max)
+        found |= self.origin_vectors.query(x_min, y_min, x_max, y_max)
+        return found
+
+    def _box_intersects(self, label, x_min, y_min, x_max, y_max):
+        """Tells whether the bounding box of an item of the scene intersects a rectangle."""
+        scene = self.scene
+        slot = scene.index[label]
+        if scene.kinds[slot] == VECTOR:
+            x, y = scene.xs[slot], scene.ys[slot]
+            return min(0, x) <= x_max and max(0, x) >= x_min and min(0, y) <= y_max and max(0, y) >= y_min
+        return self.spatial.intersects(slot, x_min, y_min, x_max, y_max)
+
+    def index_items(self, labels):
+        """
+        Indexes a batch of items that were already added to the scene, and leaves drawing them to the next relayout, so
+        that a whole scene (e.g. a restored session) is rendered once, for the viewport it is finally shown in.
+        """
+        self._sync_spatial()
+        for label in labels:
+            self._index_item(label)
+        if self.intersections is not None:
+            self.intersections.add_many(labels)
+            self.draw_crossings()
+        self.schedule_relayout()
+
+    def draw_items(self, labels):
+        """Indexes a batch of items that were already added to the scene, and draws those that intersect the viewport."""
+        labels = list(labels)
+        # Once the scene is too big for one canvas object per item, let the next relayout pick the renderer
+        if self.raster_id is not None or (self.render_mode == AUTO
+                                          and len(self.graphics) + len(labels) >= RASTER_THRESHOLD):
+            self.index_items(labels)
+            return
+
+        self._sync_spatial()
+        for label in labels:
+            self._index_item(label)
+        if self.intersections is not None:
+            self.intersections.add_many(labels)
+            self.draw_crossings()
+
+        bounds = self.viewport.world_bounds(CULL_MARGIN)
+        for label in labels:
+            if self._box_intersects(label, *bounds):
+                self.redraw_item(label)
+
+    def move_items(self, labels):
+        """
+        Updates the indexes and the drawing of items whose coordinates changed in the scene (see Scene.move).
+        Drawn items that stay in view are moved in place rather than created again, and the others are drawn or deleted.
+        """
+        labels = list(dict.fromkeys(labels))
+        self._sync_spatial()
+        for label in labels:
+            self._index_item(label)
+        if self.intersections is not None:
+            # Adding a vector that is already indexed indexes it again at its new position
+            self.intersections.add_many(labels)
+            self.draw_crossings()
+        if self.hovered in labels:
+            self.inspect(None)
+        if not self.item_list.selected.isdisjoint(labels):
+            self.draw_selection()
+
+        if self.raster_id is not None:
+            self.schedule_relayout()
+            return
+
+        bounds = self.viewport.world_bounds(CULL_MARGIN)
+        for label in labels:
+            if self._box_intersects(label, *bounds):
+                graphic = self.graphics.get(label)
+                if graphic is None:
+                    self.redraw_item(label)
                 else:
-                    self.redraw_vector(x, y, label, color)
-
-    def redraw_point(self, x, y, label, color):
-        """Redraws a point at the given coordinates using the stored color."""
-        width = self.winfo_width()
-        height = self.winfo_height()
-
-        # Calculate the pixel coordinates based on the canvas size and origin
-        x_pixel = self.origin[0] + (x * (width // 20))
-        y_pixel = self.origin[1] - (y * (height // 20))
-
-        # Redraw the point and label using the stored color
-        point_id = self.create_oval(x_pixel - 5, y_pixel - 5, x_pixel + 5, y_pixel + 5, fill=color, tags="items")
-        text_id = self.create_text(x_pixel + 10, y_pixel - 10, text=label, tags="items")
-        self.items[label]["graphic"] = (point_id, text_id)
-
-    def redraw_vector(self, x, y, label, color):
-        """Redraws a vector from the origin (0,0) to the specified coordinates using the stored color."""
-        width = self.winfo_width()
-        height = self.winfo_height()
+                    shape_coords, text_coords = self._item_layout(label)
+                    self.coords(graphic[0], *shape_coords)
+                    self.coords(graphic[1], *text_coords)
+            else:
+                self._delete_graphic(label)
+
+    def _item_layout(self, label):
+        """Returns the canvas coordinates of the shape and the label of an item, for the current viewport."""
+        scene = self.scene
+        kind = scene.kind(label)
+        if kind == POINT:
+            return self._point_layout(*self.to_pixel(*scene.coords(label)))
+        if kind == VECTOR:
+            x_pixel, y_pixel = self.to_pixel(*scene.coords(label))
+            return (self.origin[0], self.origin[1], x_pixel, y_pixel), (x_pixel + 10, y_pixel - 10)
+        start_coords, end_coords = scene.coords(label)
+        return self._vector_layout(*self.to_pixel(*start_coords), *self.to_pixel(*end_coords))
+
+    def visible_items(self, candidates=None, limit=None):
+        """
+        Returns the labels of the items that intersect the viewport, among the candidate slots the spatial index found
+        in it (queried if not given), or only the first ones found once there are more than limit.
+        The spatial index only knows grid cells and bounding boxes, so the vectors it finds are also clipped against the viewport.
+        """
+        bounds = self.viewport.world_bounds(CULL_MARGIN)
+        if candidates is None:
+            candidates = self._slots_in(*bounds)
+        scene = self.scene
+        xs, ys, kinds, starts, ends, labels = scene.xs, scene.ys, scene.kinds, scene.starts, scene.ends, scene.labels
+        visible = set()
+        for slot in candidates:
+            kind = kinds[slot]
+            if kind == REMOVED:
+                continue
+            if kind != POINT:
+                if kind == VECTOR:
+                    start_x, start_y, end_x, end_y = 0, 0, xs[slot], ys[slot]
+                else:
+                    start, end = starts[slot], ends[slot]
+                    start_x, start_y, end_x, end_y = xs[start], ys[start], xs[end], ys[end]
+                if raster.clip_segment(start_x, start_y, end_x, end_y, *bounds) is None:
+                    continue
+            visible.add(labels[slot])
+            if limit is not None and len(visible) > limit:
+                break
+        return visible
+
+    def redraw_item(self, label):
+        """Draws an item of the scene, whatever its kind."""
+        kind = self.scene.kind(label)
+        if kind == POINT:
+            self.redraw_point(label)
+        elif kind == VECTOR:
+            self.redraw_vector(label)
+        else:
+            self.redraw_vector_between_points(label)
 
-        # Pixel coordinates for (0,0) and (x,y)
-        x_pixel = self.origin[0] + (x * (width // 20))
-        y_pixel = self.origin[1] - (y * (height // 20))  # Invert y-axis for Cartesian plane
+    def redraw_items(self):
+        """Redraw all items (points and vectors) of the scene that intersect the viewport."""
+        self.delete("items")  # Clear all existing items (points, vectors) from the canvas
+        self.graphics.clear()
+        for label in self.visible_items():
+            self.redraw_item(label)
+
+    def relayout_items(self, moves=True):
+        """
+        Updates the drawn items for the current viewport, without recreating the ones that stay in view:
+            - Items leaving the viewport have their canvas objects deleted, in a single call
+            - Items entering the viewport, found through the spatial index (see visible_items), are created
+            - Items staying in view are moved to their new positions, unless moves is False (they were already shifted)
+        While rasterizing, a pan (moves is False) only shifts the image, which is rendered again once the pan leaves its
+        margin or ends.
+        """
+        shift_x, shift_y = self.raster_shift
+        if not moves and self.raster_id is not None and abs(shift_x) <= CULL_MARGIN and abs(shift_y) <= CULL_MARGIN:
+            return
+
+        # The rasterizer clips the candidates of the spatial index itself, so in automatic mode they are only clipped
+        # here until more than RASTER_THRESHOLD of them are found visible
+        candidates = self._slots_in(*self.viewport.world_bounds(CULL_MARGIN))
+        if self.render_mode != RASTER_MODE:
+            visible = self.visible_items(candidates, RASTER_THRESHOLD if self.render_mode == AUTO else None)
+        if self.render_mode == RASTER_MODE or (self.render_mode == AUTO and len(visible) > RASTER_THRESHOLD):
+            self.draw_raster(candidates)
+            return
+        self._delete_raster()
+        self._hide_labels(len(visible) > LABEL_THRESHOLD)
+
+        leaving = [label for label in self.graphics if label not in visible]
+        leaving_ids = [item_id for label in leaving for item_id in self.graphics.pop(label)]
+        if leaving_ids:
+            self.delete(*leaving_ids)
+
+        if moves:
+            scene = self.scene
+            origin_x, origin_y = self.origin
+            scale_x, scale_y = self.viewport.scale_x, self.viewport.scale_y
+            xs, ys, kinds, starts, ends, index = scene.xs, scene.ys, scene.kinds, scene.starts, scene.ends, scene.index
+
+            # World-to-pixel transform inlined over the columns of the scene
+            for label, (shape_id, text_id) in self.graphics.items():
+                slot = index[label]
+                kind = kinds[slot]
+                if kind == POINT:
+                    shape_coords, text_coords = self._point_layout(origin_x + xs[slot] * scale_x,
+                                                                   origin_y - ys[slot] * scale_y)
+                elif kind == VECTOR:
+                    x_pixel, y_pixel = origin_x + xs[slot] * scale_x, origin_y - ys[slot] * scale_y
+                    shape_coords = (origin_x, origin_y, x_pixel, y_pixel)
+                    text_coords = (x_pixel + 10, y_pixel - 10)
+                else:
+                    start, end = starts[slot], ends[slot]
+                    shape_coords, text_coords = self._vector_layout(
+                        origin_x + xs[start] * scale_x, origin_y - ys[start] * scale_y,
+                        origin_x + xs[end] * scale_x, origin_y - ys[end] * scale_y)
+                self.coords(shape_id, *shape_coords)
+                self.coords(text_id, *text_coords)
+
+        for label in visible:
+            if label not in self.graphics:
+                self.redraw_item(label)
+
+    def draw_raster(self, slots=None):
+        """
+        Replaces the canvas objects of the items by a single image of the items in the given slots, by default the ones
+        the spatial index finds in view (see raster).
+        The image overflows the viewport by CULL_MARGIN pixels on each side, so that it can be shifted while panning.
+        """
+        if self.graphics:
+            self.delete("items")
+            self.graphics.clear()
+        if slots is None:
+            slots = self._slots_in(*self.viewport.world_bounds(CULL_MARGIN))
+
+        start = time.perf_counter()
+        data = raster.rasterize(self.scene, self.viewport, slots, CULL_MARGIN)
+        self.raster_image = tk.PhotoImage(master=self, data=data, format="PPM")
+        self.raster_ms = (time.perf_counter() - start) * 1000
+        self.raster_shift = (0, 0)
+        if self.raster_id is None:
+            self.raster_id = self.create_image(-CULL_MARGIN, -CULL_MARGIN, image=self.raster_image, anchor=tk.NW,
+                                               tags="raster")
+            # The image is opaque, so it goes below the grid and axes
+            self.tag_lower("raster")
+        else:
+            self.coords(self.raster_id, -CULL_MARGIN, -CULL_MARGIN)
+            self.itemconfig(self.raster_id, image=self.raster_image)
+
+    def _delete_raster(self):
+        """Removes the rasterized image, when going back to one canvas object per item."""
+        if self.raster_id is not None:
+            self.delete(self.raster_id)
+            self.raster_id = None
+            self.raster_image = None
+            self.raster_shift = (0, 0)
+
+    def _hide_labels(self, hidden):
+        """Hides or shows the labels of all drawn items at once, through their shared tag."""
+        if hidden != self.labels_hidden:
+            self.labels_hidden = hidden
+            self.itemconfig("labels", state=tk.HIDDEN if hidden else tk.NORMAL)
+
+    def _delete_graphic(self, label):
+        """Deletes the canvas objects of an item, if it has been drawn."""
+        graphic = self.graphics.pop(label, None)
+        if graphic:
+            self.delete(*graphic)
+
+    def redraw_point(self, label):
+        """Draws a point of the scene using its stored coordinates and color."""
+        x, y = self.scene.coords(label)
+        color = self.scene.color(label)
+        x_pixel, y_pixel = self.to_pixel(x, y)
+
+        # Delete the old point if it exists
+        self._delete_graphic(label)
+
+        shape_coords, text_coords = self._point_layout(x_pixel, y_pixel)
+        point_id = self.create_oval(*shape_coords, fill=color, tags="items")
+        text_id = self.create_text(*text_coords, text=label, tags=("items", "labels"),
+                                   state=tk.HIDDEN if self.labels_hidden else tk.NORMAL)
+        self.graphics[label] = (point_id, text_id)
+
+    def redraw_vector(self, label):
+        """Draws a vector of the scene from the origin (0,0) using its stored coordinates and color."""
+        x, y = self.scene.coords(label)
+        color = self.scene.color(label)
+        x_pixel, y_pixel = self.to_pixel(x, y)
 
         # Delete the old vector if it exists
-        if label in self.items:
-            line_id, text_id = self.items[label]["graphic"]
-            self.delete(line_id)
-            self.delete(text_id)
+        self._delete_graphic(label)
 
         # Draw the vector (line from origin to (x, y))
         line_id = self.create_line(self.origin[0], self.origin[1], x_pixel, y_pixel, fill=color, arrow=tk.LAST, width=2,
                                    tags="items")
 
         # Add the label at the end of the vector
-        text_id = self.create_text(x_pixel + 10, y_pixel - 10, text=label, fill=color, font=("Arial", 12, "bold"),
-                                   tags="items")
-
-        # Store the vector (line and label) in the items dictionary with logical coordinates and color
-        self.items[label] = {"type": "vector", "coords": (x, y), "graphic": (line_id, text_id), "color": color}
+        text_id = self.create_text(x_pixel + 10, y_pixel - 10, text=label, fill=color, font=self.label_font,
+                                   tags=("items", "labels"), state=tk.HIDDEN if self.labels_hidden else tk.NORMAL)
+        self.graphics[label] = (line_id, text_id)
 
-    def redraw_vector_between_points(self, start_coords, end_coords, label, color):
-        """Redraws a vector from one point to another based on their coordinates."""
-        width = self.winfo_width()
-        height = self.winfo_height()
+    def redraw_vector_between_points(self, label):
+        """Draws a vector of the scene between two points, with the label dislocated based on orientation."""
+        start_coords, end_coords = self.scene.coords(label)
+        color = self.scene.color(label)
 
         # Get pixel coordinates for the start and end points
-        start_x_pixel = self.origin[0] + (start_coords[0] * (width // 20))
-        start_y_pixel = self.origin[1] - (start_coords[1] * (height // 20))
-        end_x_pixel = self.origin[0] + (end_coords[0] * (width // 20))
-        end_y_pixel = self.origin[1] - (end_coords[1] * (height // 20))
+        start_x_pixel, start_y_pixel = self.to_pixel(*start_coords)
+        end_x_pixel, end_y_pixel = self.to_pixel(*end_coords)
 
         # Delete the old vector if it exists
-        if label in self.items:
-            line_id, text_id = self.items[label]["graphic"]
-            self.delete(line_id)
-            self.delete(text_id)
-
-        # Calculate the midpoint for the label
-        mid_x_pixel = (start_x_pixel + end_x_pixel) / 2
-        mid_y_pixel = (start_y_pixel + end_y_pixel) / 2
-
-        # Draw the vector (line from start to end)
-        line_id = self.create_line(start_x_pixel, start_y_pixel, end_x_pixel, end_y_pixel, fill=color, arrow=tk.LAST,
-                                   width=2, tags="items")
-
-        # Determine the dislocation based on the orientation of the vector
-        if abs(start_x_pixel - end_x_pixel) > abs(start_y_pixel - end_y_pixel):
-            text_id = self.create_text(mid_x_pixel, mid_y_pixel - 10, text=label, fill=color,
-                                       font=("Arial", 12, "bold"), tags="items")
-        elif abs(start_y_pixel - end_y_pixel) > abs(start_x_pixel - end_x_pixel):
-            text_id = self.create_text(mid_x_pixel + 10, mid_y_pixel, text=label, fill=color,
-                                       font=("Arial", 12, "bold"), tags="items")
+        self._delete_graphic(label)
+
+        # Draw the vector (line from start to end) and its label
+        line_coords, text_coords = self._vector_layout(start_x_pixel, start_y_pixel, end_x_pixel, end_y_pixel)
+        line_id = self.create_line(*line_coords, fill=color, arrow=tk.LAST, width=2, tags="items")
+        text_id = self.create_text(*text_coords, text=label, fill=color, font=self.label_font,
+                                   tags=("items", "labels"), state=tk.HIDDEN if self.labels_hidden else tk.NORMAL)
+        self.graphics[label] = (line_id, text_id)
+
+    def show_crossings(self, shown):
+        """
+        Starts or stops highlighting the points where vectors cross each other.
+        While shown, the crossings are updated incrementally as items are drawn and deleted.
+        """
+        if shown:
+            if self.intersections is None:
+                self.intersections = IntersectionIndex(self.scene)
+                self.intersections.rebuild()
         else:
-            text_id = self.create_text(mid_x_pixel + 10, mid_y_pixel - 10, text=label, fill=color,
-                                       font=("Arial", 12, "bold"), tags="items")
-
-        # Store the vector (line and label) in the items dictionary, along with its start and end points
-        self.items[label]["graphic"] = (line_id, text_id)
+            self.intersections = None
+        self.draw_crossings()
+
+    def draw_crossings(self):
+        """Draws a marker on the crossings inside the viewport, up to MAX_CROSSING_MARKERS of them."""
+        self.delete("crossings")
+        if self.intersections is None:
+            return
+
+        to_pixel = self.viewport.to_pixel
+        r = CROSSING_RADIUS
+        markers = 0
+        # Only the crossings inside the viewport are looked up, through the grid of crossing points
+        for _, _, x, y in self.intersections.pairs_in(*self.viewport.world_bounds()):
+            x_pixel, y_pixel = to_pixel(x, y)
+            self.create_oval(x_pixel - r, y_pixel - r, x_pixel + r, y_pixel + r, outline="red", width=2,
+                             tags=("overlays", "crossings"))
+            markers += 1
+            if markers >= MAX_CROSSING_MARKERS:
+                break
+
+    def item_at(self, x_pixel, y_pixel, radius=HIT_RADIUS):
+        """
+        Returns the label of the item nearest to a pixel, within radius pixels, or None.
+        Only the items found by the spatial index around the pixel are measured, and points within reach win over vectors.
+        """
+        x_min, y_max = self.viewport.to_world(x_pixel - radius, y_pixel - radius)
+        x_max, y_min = self.viewport.to_world(x_pixel + radius, y_pixel + radius)
+        scene = self.scene
+        origin_x, origin_y = self.viewport.to_pixel(0, 0)
+        scale_x, scale_y = self.viewport.scale_x, self.viewport.scale_y
+
+        xs, ys, kinds, starts, ends = scene.xs, scene.ys, scene.kinds, scene.starts, scene.ends
+        points, vectors = [], []
+        for slot in self._slots_in(x_min, y_min, x_max, y_max):
+            kind = kinds[slot]
+            if kind == POINT:
+                points.append(slot)
+            elif kind != REMOVED:
+                vectors.append(slot)
+
+        # Points within reach win over vectors, which are then not measured at all
+        nearest, nearest_distance = None, radius
+        for slot in points:
+            distance = math.hypot(origin_x + xs[slot] * scale_x - x_pixel, origin_y - ys[slot] * scale_y - y_pixel)
+            if distance <= nearest_distance and (nearest is None or distance < nearest_distance or slot < nearest):
+                nearest, nearest_distance = slot, distance
+        if nearest is None:
+            for slot in vectors:
+                if kinds[slot] == VECTOR:
+                    start_x, start_y, end_x, end_y = 0, 0, xs[slot], ys[slot]
+                else:
+                    start, end = starts[slot], ends[slot]
+                    start_x, start_y, end_x, end_y = xs[start], ys[start], xs[end], ys[end]
+                distance = segment_distance(x_pixel, y_pixel,
+                                            origin_x + start_x * scale_x, origin_y - start_y * scale_y,
+                                            origin_x + end_x * scale_x, origin_y - end_y * scale_y)
+                if distance <= nearest_distance and (nearest is None or distance < nearest_distance or slot < nearest):
+                    nearest, nearest_distance = slot, distance
+        return scene.labels[nearest] if nearest is not None else None
+
+    def describe(self, label):
+        """Returns the inspection text of an item: its coordinates, its length for vectors, and its dependent vectors for points."""
+        scene = self.scene
+        kind = scene.kind(label)
+        if kind == POINT:
+            x, y = scene.coords(label)
+            lines = [f"Point {label} ({x:g}, {y:g})"]
+            dependents = scene.dependents(label)
+            if dependents:
+                shown = ", ".join(dependents[:10]) + (", ..." if len(dependents) > 10 else "")
+                lines.append(f"Vectors: {shown}")
+            return "\n".join(lines)
+
+        if kind == VECTOR:
+            (start_x, start_y), (end_x, end_y) = (0, 0), scene.coords(label)
+            title = f"Vector {label} from the origin"
+        else:
+            (start_x, start_y), (end_x, end_y) = scene.coords(label)
+            title = "Vector {} from {} to {}".format(label, *scene.points_of(label))
+        dx, dy = end_x - start_x, end_y - start_y
+        return f"{title}\n({start_x:g}, {start_y:g}) to ({end_x:g}, {end_y:g})\nComponents ({dx:g}, {dy:g}), length {math.hypot(dx, dy):g}"
+
+    def inspect(self, label, x_pixel=0, y_pixel=0):
+        """Shows the description of an item next to the given pixel, or hides the inspector when label is None."""
+        if label is None:
+            if self.inspector_ids is not None:
+                self.itemconfig("inspector", state=tk.HIDDEN)
+            self.hovered = None
+            return
+
+        if self.inspector_ids is None:
+            self.inspector_ids = (self.create_rectangle(0, 0, 0, 0, fill="lightyellow", outline="gray", tags="inspector"),
+                                  self.create_text(0, 0, anchor=tk.NW, tags="inspector"))
+        background_id, text_id = self.inspector_ids
+        if label != self.hovered:
+            self.itemconfig(text_id, text=self.describe(label))
+            self.hovered = label
+        self.coords(text_id, x_pixel + 12, y_pixel + 12)
+        # Hidden items have no bounding box, so show the inspector before fitting its background to the text
+        self.itemconfig("inspector", state=tk.NORMAL)
+        x0, y0, x1, y1 = self.bbox(text_id)
+        self.coords(background_id, x0 - 3, y0 - 3, x1 + 3, y1 + 3)
+        self.tag_raise("inspector")
+
+    def draw_selection(self):
+        """Highlights the selected items of the list that are in view, up to MAX_SELECTION_MARKERS of them."""
+        self.delete("selection")
+        scene = self.scene
+        x_min, y_min, x_max, y_max = self.viewport.world_bounds(CULL_MARGIN)
+        markers = 0
+        for label in self.item_list.selected:
+            if markers >= MAX_SELECTION_MARKERS:
+                break
+            kind = scene.kind(label)
+            if kind == POINT:
+                x, y = scene.coords(label)
+                if not (x_min <= x <= x_max and y_min <= y <= y_max):
+                    continue
+                x_pixel, y_pixel = self.to_pixel(x, y)
+                r = HIT_RADIUS + 2
+                self.create_oval(x_pixel - r, y_pixel - r, x_pixel + r, y_pixel + r, outline="orange", width=2,
+                                 tags=("overlays", "selection"))
+            else:
+                if kind == VECTOR:
+                    (start_x, start_y), (end_x, end_y) = (0, 0), scene.coords(label)
+                else:
+                    (start_x, start_y), (end_x, end_y) = scene.coords(label)
+                clipped = raster.clip_segment(start_x, start_y, end_x, end_y, x_min, y_min, x_max, y_max)
+                if clipped is None:
+                    continue
+                self.create_line(*self.to_pixel(*clipped[:2]), *self.to_pixel(*clipped[2:]), fill="orange", width=5,
+                                 dash=(6, 3), tags=("overlays", "selection"))
+            markers += 1
+
+    def delete_items(self, labels):
+        """
+        Deletes several items at once from the scene, the canvas and the list of items, and returns the labels of all deleted items.
+        Deleting a point also deletes every vector that uses it. The deletion is journaled if the plane has a journal.
+        """
+        if self.journal is not None:
+            removed = self.journal.remove(self.scene, labels)
+        else:
+            removed = self.scene.remove_many(labels)
+        self.forget_items(removed)
+        return removed
+
+    def forget_items(self, removed):
+        """Removes items that were already removed from the scene from the canvas, the indexes and the list of items."""
+        # The spatial index keeps the slots of removed items until the scene is compacted
+        self._sync_spatial()
+        if self.intersections is not None:
+            self.intersections.remove_many(removed)
+            self.draw_crossings()
+
+        # Delete every canvas object of the removed items in a single call
+        graphics = [item_id for label in removed for item_id in self.graphics.pop(label, ())]
+        if graphics:
+            self.delete(*graphics)
+
+        self.item_list.remove(removed)
+        self.draw_selection()
+        if self.hovered in removed:
+            self.inspect(None)
+
+        # The rasterized image still shows the removed items until it is rendered again
+        if self.raster_id is not None:
+            self.schedule_relayout()
 
     def delete_point(self, label):
-        """Deletes a point from the canvas and also deletes any vectors that are using this point."""
-        if label in self.items:
-            # First, delete the point itself
-            point_id, text_id = self.items[label]["graphic"]
-            self.delete(point_id)
-            self.delete(text_id)
-            del self.items[label]
-
-            # Now check for any vectors that involve this point
-            vectors_to_delete = [
-                vec_label for vec_label, vec_data in self.items.items()
-                if vec_data["type"] == "vector" and (
-                        ("points" in vec_data and (label == vec_data["points"][0] or label == vec_data["points"][
-                            1]))  # Vectors between points
-                        or ("points" not in vec_data and vec_data["coords"] == (0, 0))  # Vector from origin
-                )
-            ]
-
-            # Delete all vectors associated with this point
-            for vec_label in vectors_to_delete:
-                self.delete_vector(vec_label)
-
-            # Collect indices of items to delete in the listbox related to the point (exact match only)
-            items_to_delete = []
-            for i in range(self.listbox.size()):
-                item_info = self.listbox.get(i)
-                # Match the point and ensure it's not a vector
-                if f"{label}(" in item_info and 'vector' not in item_info:
-                    items_to_delete.append(i)
-
-            # Perform deletion in reverse order to avoid shifting issues
-            for index in sorted(items_to_delete, reverse=True):
-                self.listbox.delete(index)
+        """Deletes a point from the scene, the canvas and the list of items, and also deletes any vectors that are using this point."""
+        return self.delete_items([label])
 
     def delete_vector(self, label):
-        """Deletes a vector from the canvas and removes it from the listbox."""
-        if label in self.items:
-            vector_id, text_id = self.items[label]["graphic"]
-            self.delete(vector_id)
-            self.delete(text_id)
-            del self.items[label]
-
-            # Now delete the vector from the listbox
-            items_to_delete = []
-            for i in range(self.listbox.size()):
-                item_info = self.listbox.get(i)
-                if label in item_info and 'vector' in item_info:
-                    items_to_delete.append(i)
-
-            # Perform deletion after iteration
-            for index in reversed(items_to_delete):
-                self.listbox.delete(index)
\ No newline at end of file
+        """Deletes a vector from the scene, the canvas and the list of items."""
+        return self.delete_items([label])
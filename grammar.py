@@ -0,0 +1,217 @@
+import math
+import re
+from scene import POINT, VECTOR, POINT_VECTOR
+from vector_algebra import VECTOR_FUNCTIONS, SCALAR_FUNCTIONS
+
+# Input grammar shared by the input box and the text scene files. Statements are separated by ';' or newlines:
+#   - Point: A(0,1) - a label starting with an uppercase letter and two coordinates
+#   - Vector from origin: u(1,3) - a label starting with a lowercase letter and two coordinates
+#   - Vector between two points: AB (two one-letter points), or label(START,END)
+#   - Vector algebra (see vector_algebra): w=u+v, w=u-v, w=2*u, w=u*2, w=proj(u,v), s=sum(), dot(u,v), cross(u,v), norm(u)
+# Labels are made of letters, digits and '_' and start with a letter; coordinates are integers or decimals.
+# Statements are parsed into tuples:
+#   (POINT, label, x, y), (VECTOR, label, x, y), (POINT_VECTOR, label, start_label, end_label),
+#   (ALGEBRA, target, operation, operands, factor) - target is None for scalar results
+ALGEBRA = 3
+
+NUMBER = r"-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?"
+SEPARATORS_RE = re.compile(r"[;\n]")
+
+# Compiled fast paths for the most common statements, which make up the bulk of pasted input and scene files
+COORDS_RE = re.compile(rf"([A-Za-z]\w*)\(\s*({NUMBER})\s*,\s*({NUMBER})\s*\)")
+BETWEEN_RE = re.compile(r"([A-Za-z]\w*)\(\s*([A-Z]\w*)\s*,\s*([A-Z]\w*)\s*\)")
+SHORT_BETWEEN_RE = re.compile(r"([A-Z])([A-Z])")
+
+# A whole label, as accepted by every statement; points start with an uppercase letter, and vectors from the origin with a
+# lowercase one
+LABEL_RE = re.compile(r"[A-Za-z]\w*")
+
+# Tokenizer for everything else, a single compiled scanner
+TOKEN_RE = re.compile(r"\s*(?:(?P<number>\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)|(?P<name>[A-Za-z]\w*)|(?P<op>[()=,+*-]))")
+
+
+class ParseError(ValueError):
+    """Raised for a statement that does not follow the grammar."""
+
+
+def tokenize(text):
+    """Splits a statement into (kind, value) tokens, where kind is 'number', 'name' or 'op'."""
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_RE.match(text, position)
+        if match is None or match.end() == position:
+            raise ParseError(f"Unexpected character '{text[position:].lstrip()[:1]}'")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+
+def parse_statement(text):
+    """Parses one statement and returns its tuple, or None for blank statements. Raises ParseError if it is invalid."""
+    text = text.strip()
+    if not text:
+        return None
+
+    match = COORDS_RE.fullmatch(text)
+    if match:
+        label = match.group(1)
+        return POINT if label[0].isupper() else VECTOR, label, _finite(match.group(2)), _finite(match.group(3))
+    match = BETWEEN_RE.fullmatch(text)
+    if match:
+        return POINT_VECTOR, match.group(1), match.group(2), match.group(3)
+    match = SHORT_BETWEEN_RE.fullmatch(text)
+    if match:
+        return POINT_VECTOR, text, match.group(1), match.group(2)
+
+    return _Parser(tokenize(text)).statement()
+
+
+def _finite(text):
+    """Converts a number of the grammar to a float, rejecting numbers too large to be represented (e.g. 1e999)."""
+    value = float(text)
+    if not math.isfinite(value):
+        raise ParseError(f"Number {text} is too large")
+    return value
+
+
+class _Parser:
+    """Recursive descent parser for the statements not handled by the fast paths (vector algebra, and errors)."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self, offset=0):
+        """Returns the token at the given offset from the current one, or (None, None) past the end."""
+        position = self.position + offset
+        return self.tokens[position] if position < len(self.tokens) else (None, None)
+
+    def take(self, kind, value=None):
+        """Consumes the current token, checking its kind (and value), and returns its value."""
+        token_kind, token_value = self.peek()
+        if token_kind != kind or (value is not None and token_value != value):
+            expected = f"'{value}'" if value else f"a {kind}"
+            found = f"'{token_value}'" if token_value is not None else "the end"
+            raise ParseError(f"Expected {expected} but found {found}")
+        self.position += 1
+        return token_value
+
+    def accept(self, value):
+        """Consumes the current token if it is the given operator, and tells whether it did."""
+        if self.peek() == ("op", value):
+            self.position += 1
+            return True
+        return False
+
+    def end(self):
+        """Checks that every token was consumed."""
+        if self.position < len(self.tokens):
+            raise ParseError(f"Unexpected '{self.peek()[1]}'")
+
+    def number(self):
+        """number := ['-'] NUMBER"""
+        sign = -1.0 if self.accept("-") else 1.0
+        return sign * _finite(self.take("number"))
+
+    def statement(self):
+        """statement := NAME '=' expression | FUNCTION '(' arguments ')'"""
+        name = self.take("name")
+        if self.accept("="):
+            if not name[0].islower():
+                raise ParseError(f"Vector {name} must start with a lowercase letter")
+            operation, operands, factor = self.expression()
+            self.end()
+            return ALGEBRA, name, operation, operands, factor
+
+        if name in SCALAR_FUNCTIONS:
+            operands = self.call(name, SCALAR_FUNCTIONS[name])
+            self.end()
+            return ALGEBRA, None, name, operands, None
+        raise ParseError("Invalid format. Please enter in the format A(0,1), u(1,3), AB or w=u+v")
+
+    def expression(self):
+        """expression := NAME ('+' | '-') NAME | number '*' NAME | NAME '*' number | FUNCTION '(' arguments ')'"""
+        kind, value = self.peek()
+        if kind == "number" or (kind, value) == ("op", "-"):
+            factor = self.number()
+            self.take("op", "*")
+            return "scale", (self.take("name"),), factor
+
+        name = self.take("name")
+        if name in VECTOR_FUNCTIONS and self.peek() == ("op", "("):
+            return name, self.call(name, VECTOR_FUNCTIONS[name]), None
+        if self.accept("+"):
+            return "add", (name, self.take("name")), None
+        if self.accept("-"):
+            return "subtract", (name, self.take("name")), None
+        if self.accept("*"):
+            return "scale", (name,), self.number()
+        raise ParseError(f"Invalid expression after '{name}'")
+
+    def call(self, function, arity):
+        """arguments := [NAME {',' NAME}], with exactly arity names"""
+        self.take("op", "(")
+        operands = []
+        if not self.accept(")"):
+            operands.append(self.take("name"))
+            while self.accept(","):
+                operands.append(self.take("name"))
+            self.take("op", ")")
+        if len(operands) != arity:
+            raise ParseError(f"{function}() takes {arity} vector(s)")
+        return tuple(operands)
+
+
+def parse_batch(text):
+    """
+    Parses every statement of a text, separated by ';' or newlines, in a single pass.
+    Returns (statements, errors): the statements that parsed, and one message per invalid statement.
+    """
+    statements, errors = [], []
+    for number, part in enumerate(SEPARATORS_RE.split(text), 1):
+        try:
+            statement = parse_statement(part)
+        except ParseError as error:
+            errors.append(f"Statement {number} ({part.strip()}): {error}.")
+            continue
+        if statement is not None:
+            statements.append(statement)
+    return statements, errors
+
+
+def check(statements, scene):
+    """
+    Checks the statements of a batch against the scene, and the statements before them in the batch, without changing anything.
+    Returns one message per problem: labels already in use and references to missing points or vectors.
+    """
+    errors = []
+    # Kinds of the labels defined by the batch so far
+    defined = {}
+
+    def kind_of(label):
+        """Returns the kind of a label, defined either by the batch or by the scene, or None if it is free."""
+        if label in defined:
+            return defined[label]
+        return scene.kind(label) if label in scene else None
+
+    for statement in statements:
+        kind, label = statement[0], statement[1]
+        if kind == ALGEBRA:
+            for operand in statement[3]:
+                if kind_of(operand) not in (VECTOR, POINT_VECTOR):
+                    errors.append(f"Vector {operand} does not exist.")
+            if label is None:
+                continue
+            result_kind = VECTOR
+        else:
+            if kind == POINT_VECTOR and (kind_of(statement[2]) != POINT or kind_of(statement[3]) != POINT):
+                errors.append(f"Points {statement[2]} and/or {statement[3]} do not exist.")
+            result_kind = kind
+
+        if kind_of(label) is not None:
+            errors.append(f"Label {label} already exists.")
+        defined[label] = result_kind
+    return errors
@@ -0,0 +1,285 @@
+import collections
+import heapq
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Kinds of vector sets that can be generated between points
+COMPLETE = "complete"  # Every pair of points
+NEAREST = "nearest"  # Every point to its k nearest neighbours
+HULL = "hull"  # The edges of the convex hull, counterclockwise
+SPANNING_TREE = "mst"  # The edges of the Euclidean minimum spanning tree
+
+# Default number of neighbours of the k nearest neighbours
+K_NEIGHBOURS = 3
+
+# Approximate number of edges computed by one task of the worker pool
+EDGES_PER_TASK = 20000
+
+# Maximum number of edges handed over to the main thread at once, and interval in milliseconds between two handovers
+CHUNK_SIZE = 2000
+POLL_MS = 16
+
+# Points of the current job in a worker process, as a list of (label, x, y), and the grid built over them
+_points = None
+_grid = None
+
+
+def _set_points(points):
+    """Initializer of the worker processes: receives the points once, instead of with every task."""
+    global _points, _grid
+    _points = points
+    _grid = None
+
+
+def complete_rows(first, last):
+    """Returns the edges from each point of rows [first, last) to every point after it."""
+    points = _points
+    edges = []
+    for i in range(first, last):
+        label = points[i][0]
+        edges += [(label, points[j][0]) for j in range(i + 1, len(points))]
+    return edges
+
+
+def nearest_rows(first, last, k):
+    """Returns the edges from each point of rows [first, last) to its k nearest neighbours, nearest first."""
+    global _grid
+    if _grid is None:
+        _grid = _build_grid(_points)
+    edges = []
+    for i in range(first, last):
+        label = _points[i][0]
+        edges += [(label, _points[j][0]) for j in _nearest(_grid, _points, i, k)]
+    return edges
+
+
+def _build_grid(points):
+    """Buckets the points into a uniform grid of about one point per cell, and returns (cell size, x_min, y_min, cells)."""
+    xs = [x for _, x, _ in points]
+    ys = [y for _, _, y in points]
+    x_min, y_min = min(xs), min(ys)
+    span = max(max(xs) - x_min, max(ys) - y_min) or 1.0
+    size = span / max(1.0, math.sqrt(len(points)))
+    cells = collections.defaultdict(list)
+    for i, (_, x, y) in enumerate(points):
+        cells[(int((x - x_min) / size), int((y - y_min) / size))].append(i)
+    return size, x_min, y_min, cells
+
+
+def _nearest(grid, points, i, k):
+    """
+    Returns the indices of the k points nearest to point i, nearest first, visiting the grid in growing rings
+    of cells until no unvisited cell can hold a nearer point.
+    """
+    size, x_min, y_min, cells = grid
+    _, x, y = points[i]
+    column, row = int((x - x_min) / size), int((y - y_min) / size)
+    # Max-heap of the best candidates so far, as (-distance, index)
+    best = []
+    radius = 0
+    limit = int(max(len(points), 1) ** 0.5) + 2
+    while radius <= limit:
+        for cell_column in range(column - radius, column + radius + 1):
+            for cell_row in range(row - radius, row + radius + 1):
+                if max(abs(cell_column - column), abs(cell_row - row)) != radius:
+                    continue
+                for j in cells.get((cell_column, cell_row), ()):
+                    if j == i:
+                        continue
+                    distance = math.hypot(points[j][1] - x, points[j][2] - y)
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, j))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, j))
+        # Cells of the next ring are at least radius cells away from the point
+        if len(best) == k and -best[0][0] <= radius * size:
+            break
+        radius += 1
+    return [j for _, j in sorted(best, reverse=True)]
+
+
+def hull_edges():
+    """Returns the edges of the convex hull of the points, counterclockwise (Andrew's monotone chain)."""
+    points = sorted(set((x, y, label) for label, x, y in _points))
+    if len(points) < 3:
+        return [(points[0][2], points[1][2])] if len(points) == 2 else []
+
+    def half(ordered):
+        chain = []
+        for point in ordered:
+            while len(chain) >= 2 and _turn(chain[-2], chain[-1], point) <= 0:
+                chain.pop()
+            chain.append(point)
+        return chain[:-1]
+
+    hull = half(points) + half(reversed(points))
+    return [(hull[i][2], hull[(i + 1) % len(hull)][2]) for i in range(len(hull))]
+
+
+def _turn(a, b, c):
+    """Returns the z component of (b - a) x (c - a): positive for a counterclockwise turn."""
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+
+def spanning_tree_edges():
+    """Returns the edges of the Euclidean minimum spanning tree of the points (Prim's algorithm on the complete graph)."""
+    points = _points
+    count = len(points)
+    if count < 2:
+        return []
+    xs = [x for _, x, _ in points]
+    ys = [y for _, _, y in points]
+    # Distance of each point outside the tree to the tree, and the tree point it is nearest to
+    distances = [math.inf] * count
+    parents = [0] * count
+    outside = list(range(1, count))
+    edges = []
+    last = 0
+    while outside:
+        x, y = xs[last], ys[last]
+        nearest, nearest_distance = None, math.inf
+        for j in outside:
+            distance = (xs[j] - x) ** 2 + (ys[j] - y) ** 2
+            if distance < distances[j]:
+                distances[j] = distance
+                parents[j] = last
+            if distances[j] < nearest_distance:
+                nearest, nearest_distance = j, distances[j]
+        outside.remove(nearest)
+        edges.append((points[parents[nearest]][0], points[nearest][0]))
+        last = nearest
+    return edges
+
+
+class GenerationJob:
+    """
+    Generates a set of vectors between points in a pool of worker processes, without blocking the Tk main loop.
+    The work is split in tasks, and their edges (start_label, end_label) are handed over to on_chunk in chunks of at
+    most CHUNK_SIZE, from after() callbacks of the given widget. on_done(cancelled) is called once the job is over.
+    A task that fails, or a worker process that dies, stops the job as if it was cancelled, with the exception kept in error.
+    Workers are started with the "spawn" method, so they never inherit the state of the Tk process (threads, locks and
+    the Tcl interpreter).
+    """
+
+    def __init__(self, widget, points, kind, on_chunk, on_done=None, k=K_NEIGHBOURS, workers=None):
+        self.widget = widget
+        self.points = list(points)
+        self.kind = kind
+        self.on_chunk = on_chunk
+        self.on_done = on_done
+        self.k = k
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = None
+        self.futures = collections.deque()
+        self.pending = collections.deque()
+        # Undirected pairs already handed over, for the kinds that can find a pair twice
+        self.seen = set() if kind == NEAREST else None
+        self.tasks = 0
+        self.done_tasks = 0
+        self.edges = 0
+        self.error = None
+        self._job = None
+
+    @property
+    def running(self):
+        """Tells whether the job has started and is not over."""
+        return self._job is not None
+
+    def start(self):
+        """Submits the tasks to the worker pool and starts handing over their results."""
+        if len(self.points) < 2:
+            self._finish(False)
+            return
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_set_points, initargs=(self.points,))
+        for task in self._tasks():
+            self.futures.append(self.executor.submit(*task))
+        self.tasks = len(self.futures)
+        self._job = self.widget.after(POLL_MS, self._poll)
+
+    def _tasks(self):
+        """Yields the tasks of the job as (function, arguments...)."""
+        count = len(self.points)
+        if self.kind == COMPLETE:
+            # Rows get shorter towards the end, so the tasks are cut to hold about EDGES_PER_TASK edges each
+            first = 0
+            while first < count:
+                last, edges = first, 0
+                while last < count and edges < EDGES_PER_TASK:
+                    edges += count - last - 1
+                    last += 1
+                yield complete_rows, first, last
+                first = last
+        elif self.kind == NEAREST:
+            rows = max(1, EDGES_PER_TASK // max(1, self.k))
+            for first in range(0, count, rows):
+                yield nearest_rows, first, min(first + rows, count), self.k
+        elif self.kind == HULL:
+            yield (hull_edges,)
+        elif self.kind == SPANNING_TREE:
+            yield (spanning_tree_edges,)
+        else:
+            raise ValueError(f"Unknown kind of vectors: {self.kind}")
+
+    def _poll(self):
+        """Collects the results of the tasks done, in order, and hands over one chunk of edges."""
+        self._job = None
+        while self.futures and self.futures[0].done():
+            try:
+                self.pending.extend(self.futures.popleft().result())
+            except Exception as error:
+                # Any exception of a task, or BrokenProcessPool if a worker died: keep the edges already handed over
+                self.error = error
+                self.futures.clear()
+                self.pending.clear()
+                self._finish(True)
+                return
+            self.done_tasks += 1
+
+        chunk = []
+        while self.pending and len(chunk) < CHUNK_SIZE:
+            start, end = self.pending.popleft()
+            if self.seen is not None:
+                pair = (start, end) if start < end else (end, start)
+                if pair in self.seen:
+                    continue
+                self.seen.add(pair)
+            chunk.append((start, end))
+        if chunk:
+            self.edges += len(chunk)
+            self.on_chunk(chunk)
+
+        if self.futures or self.pending:
+            self._job = self.widget.after(POLL_MS, self._poll)
+        else:
+            self._finish(False)
+
+    def cancel(self):
+        """Stops the job: the tasks not started are dropped, and the edges not handed over yet are discarded."""
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+        self.futures.clear()
+        self.pending.clear()
+        self._finish(True)
+
+    def _finish(self, cancelled):
+        """
+        Shuts the worker pool down and reports the end of the job. When cancelled, the workers still running a task are
+        terminated: a single task (such as a hull or a spanning tree) could otherwise keep running for minutes, and keep
+        the app from exiting, since the pool waits for its workers at exit.
+        """
+        if self.executor is not None:
+            if cancelled and hasattr(self.executor, "terminate_workers"):
+                # Python 3.14 and later
+                self.executor.terminate_workers()
+            else:
+                workers = list((self.executor._processes or {}).values()) if cancelled else []
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                for worker in workers:
+                    worker.terminate()
+            self.executor = None
+        if self.on_done is not None:
+            self.on_done(cancelled)
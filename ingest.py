@@ -0,0 +1,308 @@
+import asyncio
+import collections
+import math
+import struct
+import sys
+import threading
+import grammar
+from scene import POINT, VECTOR, POINT_VECTOR
+
+# Interval, in milliseconds, between two drains of the pending updates by the Tk thread (once per frame)
+FRAME_MS = 16
+
+# Default maximum number of distinct labels waiting for the Tk thread, and what happens to new ones beyond it
+MAX_PENDING = 50000
+BLOCK = "block"  # Stop reading until the Tk thread catches up, which pushes back on the producer
+DROP_NEWEST = "drop-newest"  # Drop the incoming update
+DROP_OLDEST = "drop-oldest"  # Drop the update that has waited the longest
+POLICIES = (BLOCK, DROP_NEWEST, DROP_OLDEST)
+
+# Interval, in seconds, at which a blocked connection checks whether there is room again
+BLOCKED_POLL = 0.005
+
+# Default TCP port, on the local interface only
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Sources accept either the text grammar of the input box (see grammar), one or more statements per line, or binary
+# frames when the stream starts with FRAME_MAGIC. Each frame is a header followed by its labels, all little-endian:
+#   number of bytes of the labels (u16), kind (u8), x (f64), y (f64)
+#   labels (utf-8): the label of a point or a vector from the origin, or label, start label and end label separated
+#   by '\0' for a vector between points (whose x and y are ignored)
+FRAME_MAGIC = b"VRSF"
+FRAME_HEADER = struct.Struct("<HBdd")
+
+# Labels of the binary frames follow the grammar: points start with an uppercase letter, vectors with a lowercase one
+LABEL_RE = grammar.LABEL_RE
+
+
+def encode_frame(kind, label, a, b):
+    """Encodes a record (kind, label, a, b), as read and written by scene_io, as one binary frame."""
+    if kind == POINT_VECTOR:
+        labels = "\0".join((label, a, b)).encode("utf-8")
+        return FRAME_HEADER.pack(len(labels), kind, 0.0, 0.0) + labels
+    labels = label.encode("utf-8")
+    return FRAME_HEADER.pack(len(labels), kind, a, b) + labels
+
+
+def decode_frame(header, labels):
+    """Decodes a binary frame into a statement of the grammar. Raises ValueError if it is invalid."""
+    _, kind, x, y = FRAME_HEADER.unpack(header)
+    labels = labels.decode("utf-8").split("\0")
+    if not all(LABEL_RE.fullmatch(label) for label in labels):
+        raise ValueError("Invalid label in frame")
+    if kind == POINT_VECTOR and len(labels) == 3 and labels[1][0].isupper() and labels[2][0].isupper():
+        return POINT_VECTOR, labels[0], labels[1], labels[2]
+    if kind in (POINT, VECTOR) and len(labels) == 1 and labels[0][0].isupper() == (kind == POINT):
+        # NaN and infinities cannot be drawn, nor indexed
+        if not (math.isfinite(x) and math.isfinite(y)):
+            raise ValueError(f"Invalid coordinates in frame: ({x}, {y})")
+        return kind, labels[0], x, y
+    raise ValueError(f"Invalid frame of kind {kind}")
+
+
+def parse_address(address):
+    """
+    Parses the address a server listens on, and returns (transport, location):
+        - "-" or "stdin": ("stdin", None)
+        - "unix:PATH": ("unix", PATH)
+        - "tcp:HOST:PORT", "HOST:PORT" or "PORT": ("tcp", (HOST, PORT)), on DEFAULT_HOST if no host is given
+        - "tcp": ("tcp", (DEFAULT_HOST, DEFAULT_PORT))
+    """
+    if address in ("-", "stdin"):
+        return "stdin", None
+    if address == "tcp":
+        return "tcp", (DEFAULT_HOST, DEFAULT_PORT)
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    if address.startswith("tcp:"):
+        address = address[len("tcp:"):]
+    host, _, port = address.rpartition(":")
+    if not port.isdigit():
+        raise ValueError(f"Invalid address: {address}")
+    return "tcp", (host or DEFAULT_HOST, int(port))
+
+
+class UpdateQueue:
+    """
+    Thread-safe queue of the updates waiting for the Tk thread, coalesced by label: an update to a label that is
+    already pending replaces it in place, so only the latest state of each item is applied, in the order the labels
+    first arrived. The Tk thread takes every pending update at once with drain, once per frame.
+    Counters (all under the same lock): received, coalesced, dropped, blocked (times a source had to wait for room),
+    errors (invalid input) and applied (updates applied by the Tk thread).
+    """
+
+    def __init__(self, capacity=MAX_PENDING, policy=BLOCK):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy: {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        self.lock = threading.Lock()
+        # Label -> latest statement, in the order the labels arrived
+        self.pending = {}
+        self.counters = collections.Counter()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def put(self, statement):
+        """
+        Queues an update, and tells whether it was taken: it is not, without any side effect, only when the queue is
+        full with the BLOCK policy, and the caller should then wait and try again.
+        """
+        label = statement[1]
+        with self.lock:
+            pending = self.pending
+            if label in pending:
+                pending[label] = statement
+                self.counters["coalesced"] += 1
+                return True
+            if len(pending) >= self.capacity:
+                if self.policy == BLOCK:
+                    return False
+                self.counters["dropped"] += 1
+                if self.policy == DROP_NEWEST:
+                    return True
+                del pending[next(iter(pending))]
+            pending[label] = statement
+            return True
+
+    def drain(self):
+        """Takes every pending update, in order."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        return list(pending.values())
+
+    def count(self, name, amount=1):
+        """Increments a counter."""
+        with self.lock:
+            self.counters[name] += amount
+
+    def snapshot(self):
+        """Returns a copy of the counters (missing ones are 0), with the number of pending updates as "pending"."""
+        with self.lock:
+            counters = collections.Counter(self.counters)
+            counters["pending"] = len(self.pending)
+        return counters
+
+
+class IngestServer:
+    """
+    Asyncio server, run by a background thread, that reads updates from a local TCP or Unix socket (any number of
+    connections) or from stdin, and queues them into an UpdateQueue for the Tk thread.
+    With the BLOCK policy, a full queue stops the reading of a source until there is room again, so the operating
+    system buffers fill up and the producer is slowed down instead of the app.
+    """
+
+    def __init__(self, queue, address):
+        self.queue = queue
+        self.transport, self.location = parse_address(address)
+        # Address actually listened on once started (e.g. the port picked by the system for port 0)
+        self.address = None
+        self.loop = None
+        self.thread = None
+        self.error = None
+        self._ready = threading.Event()
+        self._stopping = None
+        self._stdin_task = None
+        # Streams and tasks of the open connections, closed and waited for when stopping
+        self._writers = set()
+        self._handlers = set()
+
+    def start(self):
+        """Starts serving in a background thread, once listening. Raises OSError if the address cannot be used."""
+        self.thread = threading.Thread(target=self._run, name="ingest", daemon=True)
+        self.thread.start()
+        self._ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    def stop(self):
+        """Stops serving and closes every connection."""
+        if self.loop is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self._stopping.set)
+            self.thread.join(timeout=1)
+
+    def _run(self):
+        """Body of the background thread."""
+        try:
+            asyncio.run(self._serve())
+        except OSError as error:
+            self.error = error
+        finally:
+            self._ready.set()
+
+    async def _serve(self):
+        """Listens until stopped."""
+        self.loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        server = None
+        if self.transport == "tcp":
+            server = await asyncio.start_server(self._handle, *self.location)
+            self.address = server.sockets[0].getsockname()[:2]
+        elif self.transport == "unix":
+            server = await asyncio.start_unix_server(self._handle, self.location)
+            self.address = self.location
+        else:
+            self._stdin_task = self.loop.create_task(self._read(await self._open_stdin()))
+        self._ready.set()
+        try:
+            await self._stopping.wait()
+        finally:
+            if server is not None:
+                server.close()
+            # Closing the connections ends their reading, which lets their tasks finish instead of being cancelled
+            for writer in self._writers:
+                writer.close()
+            if self._handlers:
+                await asyncio.wait(self._handlers)
+
+    async def _open_stdin(self):
+        """Returns a stream reader over stdin."""
+        reader = asyncio.StreamReader()
+        try:
+            await self.loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+        except ValueError:
+            # Regular files are not pipes: read them from a thread instead
+            def pump():
+                for chunk in iter(lambda: sys.stdin.buffer.read1(65536), b""):
+                    self.loop.call_soon_threadsafe(reader.feed_data, chunk)
+                self.loop.call_soon_threadsafe(reader.feed_eof)
+            threading.Thread(target=pump, name="ingest-stdin", daemon=True).start()
+        return reader
+
+    async def _handle(self, reader, writer):
+        """Serves one connection."""
+        self.queue.count("connections")
+        self._writers.add(writer)
+        self._handlers.add(asyncio.current_task())
+        try:
+            await self._read(reader)
+        finally:
+            self._writers.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    async def _read(self, reader):
+        """Reads a source until its end, in the text or binary format according to its first bytes."""
+        prefix = b""
+        while len(prefix) < len(FRAME_MAGIC):
+            chunk = await reader.read(len(FRAME_MAGIC) - len(prefix))
+            if not chunk:
+                break
+            prefix += chunk
+        try:
+            if prefix == FRAME_MAGIC:
+                await self._read_frames(reader)
+            else:
+                await self._read_lines(reader, prefix)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            # Lost connection, or a line too long to be buffered: the source is closed
+            self.queue.count("errors")
+
+    async def _read_lines(self, reader, prefix):
+        """Reads statements of the grammar, one or more per line."""
+        while not self._stopping.is_set():
+            line = prefix + await reader.readline()
+            prefix = b""
+            if not line:
+                return
+            text = line.decode("utf-8", "replace")
+            if text.lstrip().startswith("#"):
+                continue
+            statements, errors = grammar.parse_batch(text)
+            if errors:
+                self.queue.count("errors", len(errors))
+            for statement in statements:
+                # Scalar results have no item to show them on
+                if statement[1] is None:
+                    self.queue.count("errors")
+                    continue
+                await self._put(statement)
+
+    async def _read_frames(self, reader):
+        """Reads binary frames."""
+        while not self._stopping.is_set():
+            try:
+                header = await reader.readexactly(FRAME_HEADER.size)
+                labels = await reader.readexactly(FRAME_HEADER.unpack_from(header)[0])
+            except asyncio.IncompleteReadError as error:
+                # A frame cut by the end of the stream
+                if error.partial:
+                    self.queue.count("errors")
+                return
+            try:
+                statement = decode_frame(header, labels)
+            except ValueError:
+                self.queue.count("errors")
+                continue
+            await self._put(statement)
+
+    async def _put(self, statement):
+        """Queues an update, waiting for room as long as the queue is full with the BLOCK policy (or until stopping)."""
+        queue = self.queue
+        queue.count("received")
+        if not queue.put(statement):
+            queue.count("blocked")
+            while not queue.put(statement) and not self._stopping.is_set():
+                await asyncio.sleep(BLOCKED_POLL)
@@ -0,0 +1,184 @@
+import collections
+import json
+import os
+import threading
+import time
+
+# Upper bounds, in milliseconds, of the buckets of the frame time histogram (the last bucket has no bound)
+HISTOGRAM_BOUNDS_MS = (2, 4, 8, 16, 33, 66, 133)
+
+# Maximum number of timed calls kept for the trace; the oldest are dropped first
+MAX_EVENTS = 200000
+
+# Interval, in milliseconds, between two updates of the HUD
+HUD_MS = 250
+
+# Methods timed when instrumenting an object: any method starting with one of the prefixes, and the names listed
+HOOK_PREFIXES = ("draw_", "redraw_", "delete_")
+HOOK_NAMES = ("update_listbox", "relayout_items", "visible_items", "refresh", "extend", "remove")
+
+# Method run once per frame by the canvas, whose durations make the frame time histogram
+FRAME_METHOD = "_relayout"
+
+# Canvas methods creating objects, counted while instrumenting a canvas
+CREATE_METHODS = ("create_line", "create_oval", "create_text", "create_rectangle", "create_image", "create_polygon")
+
+
+class Instrumentation:
+    """
+    Timing hooks, counters and a frame time histogram for the app, recorded only while enabled.
+    Enabling wraps the hooked methods of the given objects with timed versions, set on the instances, and disabling
+    removes them, so the methods run untouched, without any overhead, the rest of the time.
+    Every timed call is also kept as a trace event, which dump_trace writes in the Chrome trace event format
+    (loadable in chrome://tracing, Perfetto or speedscope).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+        # (object, method name) of every method wrapped while enabled
+        self._wrapped = []
+
+    def reset(self):
+        """Clears every measurement."""
+        self.events = collections.deque(maxlen=MAX_EVENTS)
+        # Method name -> total time in seconds, and number of calls
+        self.totals = collections.Counter()
+        self.calls = collections.Counter()
+        self.created = 0
+        self.deleted = 0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.frames = 0
+        self.last_frame_ms = 0.0
+        self.origin = time.perf_counter()
+
+    def enable(self, *objects):
+        """Starts timing the hooked methods of the objects, and counting the objects created and deleted by canvases."""
+        if self.enabled:
+            return
+        self.enabled = True
+        for target in objects:
+            for name in dir(type(target)):
+                if name.startswith(HOOK_PREFIXES) or name in HOOK_NAMES or name == FRAME_METHOD:
+                    if callable(getattr(target, name, None)):
+                        self._wrap(target, name, self._timed)
+            if hasattr(target, "create_line"):
+                for name in CREATE_METHODS:
+                    self._wrap(target, name, self._counted_create)
+                self._wrap(target, "delete", self._counted_delete)
+
+    def disable(self):
+        """Stops measuring and restores the original methods; the measurements are kept."""
+        for target, name in self._wrapped:
+            del target.__dict__[name]
+        self._wrapped = []
+        self.enabled = False
+
+    def _wrap(self, target, name, wrapper):
+        """Shadows a method of an object by a wrapped version of it, set on the instance."""
+        setattr(target, name, wrapper(name, getattr(target, name)))
+        self._wrapped.append((target, name))
+
+    def _timed(self, name, method):
+        """Returns a version of a method that records its duration."""
+        frame = name == FRAME_METHOD
+        category = type(method.__self__).__name__
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                self.totals[name] += end - start
+                self.calls[name] += 1
+                self.events.append((name, category, start, end, threading.get_ident()))
+                if frame:
+                    self.add_frame((end - start) * 1000)
+        return timed
+
+    def _counted_create(self, name, method):
+        """Returns a version of a canvas create method that counts the objects created."""
+        def create(*args, **kwargs):
+            self.created += 1
+            return method(*args, **kwargs)
+        return create
+
+    def _counted_delete(self, name, method):
+        """Returns a version of the canvas delete method that counts the objects deleted, by id or by tag."""
+        canvas = method.__self__
+
+        def delete(*tags_or_ids):
+            for tag_or_id in tags_or_ids:
+                self.deleted += 1 if isinstance(tag_or_id, int) else len(canvas.find_withtag(tag_or_id))
+            return method(*tags_or_ids)
+        return delete
+
+    def add_frame(self, milliseconds):
+        """Counts a frame of the given duration in the histogram."""
+        self.frames += 1
+        self.last_frame_ms = milliseconds
+        for bucket, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if milliseconds <= bound:
+                break
+        else:
+            bucket = len(HISTOGRAM_BOUNDS_MS)
+        self.histogram[bucket] += 1
+
+    def summary(self, top=6):
+        """Returns a few lines of text describing the measurements, as shown by the HUD."""
+        lines = [f"frames {self.frames}  last {self.last_frame_ms:.1f} ms",
+                 f"canvas objects +{self.created} -{self.deleted}"]
+        labels = [f"<={bound}" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}"]
+        lines.append("frame ms " + " ".join(f"{label}:{count}" for label, count in zip(labels, self.histogram) if count))
+        for name, seconds in self.totals.most_common(top):
+            lines.append(f"{name} x{self.calls[name]} {seconds * 1000:.1f} ms")
+        return "\n".join(lines)
+
+    def dump_trace(self, path):
+        """Writes the timed calls recorded so far to a file in the Chrome trace event format."""
+        pid = os.getpid()
+        events = [{"name": name, "cat": category, "ph": "X", "pid": pid, "tid": thread,
+                   "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6}
+                  for name, category, start, end, thread in self.events]
+        events.append({"name": "canvas objects", "ph": "C", "pid": pid, "ts": (time.perf_counter() - self.origin) * 1e6,
+                       "args": {"created": self.created, "deleted": self.deleted}})
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+        return len(events)
+
+
+class Hud:
+    """Overlay of the measurements of an Instrumentation in the top left corner of a canvas, updated every HUD_MS."""
+
+    def __init__(self, canvas, instrumentation):
+        self.canvas = canvas
+        self.instrumentation = instrumentation
+        self.ids = None
+        self._job = None
+
+    def show(self):
+        """Creates the overlay and starts updating it."""
+        if self._job is None:
+            self.update()
+
+    def hide(self):
+        """Stops updating the overlay and deletes it."""
+        if self._job is not None:
+            self.canvas.after_cancel(self._job)
+            self._job = None
+        self.canvas.delete("hud")
+        self.ids = None
+
+    def update(self):
+        """Updates the text of the overlay, and schedules the next update."""
+        canvas = self.canvas
+        if self.ids is None:
+            self.ids = (canvas.create_rectangle(0, 0, 0, 0, fill="black", stipple="gray50", outline="", tags="hud"),
+                        canvas.create_text(8, 8, anchor="nw", fill="lime", font=("Courier", 9), tags="hud"))
+        background_id, text_id = self.ids
+        canvas.itemconfig(text_id, text=self.instrumentation.summary())
+        x0, y0, x1, y1 = canvas.bbox(text_id)
+        canvas.coords(background_id, x0 - 4, y0 - 4, x1 + 4, y1 + 4)
+        canvas.tag_raise("hud")
+        self._job = canvas.after(HUD_MS, self.update)
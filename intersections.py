@@ -0,0 +1,173 @@
+from scene import VECTOR, POINT_VECTOR
+from spatial_index import KeyedGridIndex
+
+# Side, in world units, of the cells of the broad phase; segments are only tested against the segments sharing a cell
+CELL_SIZE = 2.0
+
+# Tolerance on the parameters along the segments, to tell an intersection at an endpoint from one inside a segment
+EPSILON = 1e-9
+
+
+def segment_intersection(x0, y0, x1, y1, x2, y2, x3, y3):
+    """
+    Returns the point (x, y) where the segment (x0,y0)-(x1,y1) crosses the segment (x2,y2)-(x3,y3), or None.
+    Segments that only touch at an endpoint of both (such as AB and BC, or two vectors from the origin) do not cross.
+    For overlapping collinear segments, the first point of the overlap is returned.
+    """
+    dx0, dy0 = x1 - x0, y1 - y0
+    dx1, dy1 = x3 - x2, y3 - y2
+    if (dx0 == 0 and dy0 == 0) or (dx1 == 0 and dy1 == 0):
+        return None
+    ex, ey = x2 - x0, y2 - y0
+    denominator = dx0 * dy1 - dy0 * dx1
+
+    if denominator == 0:
+        # Parallel segments only meet if they are on the same line
+        if ex * dy0 - ey * dx0 != 0:
+            return None
+        # Parameters of the second segment along the first one, and their overlap with [0, 1]
+        length = dx0 * dx0 + dy0 * dy0
+        t2 = (ex * dx0 + ey * dy0) / length
+        t3 = ((x3 - x0) * dx0 + (y3 - y0) * dy0) / length
+        start, end = max(0.0, min(t2, t3)), min(1.0, max(t2, t3))
+        # No overlap, or segments that only touch end to end
+        if end - start <= EPSILON:
+            return None
+        return x0 + start * dx0, y0 + start * dy0
+
+    t = (ex * dy1 - ey * dx1) / denominator
+    u = (ex * dy0 - ey * dx0) / denominator
+    if t < -EPSILON or t > 1 + EPSILON or u < -EPSILON or u > 1 + EPSILON:
+        return None
+    if _at_end(t) and _at_end(u):
+        return None
+    return x0 + t * dx0, y0 + t * dy0
+
+
+def _at_end(t):
+    """Tells whether a parameter along a segment is at one of its endpoints."""
+    return abs(t) <= EPSILON or abs(t - 1) <= EPSILON
+
+
+class IntersectionIndex:
+    """
+    Crossings between the vectors of a scene, kept up to date incrementally.
+    A uniform grid (see KeyedGridIndex) is the broad phase: a vector added to the index is only tested against the vectors
+    passing through the same cells, and removing a vector only forgets its own crossings.
+    The crossing points are kept in a second grid, keyed by (label, other), so those inside a rectangle such as the
+    viewport are found without walking every crossing.
+    """
+
+    def __init__(self, scene, cell_size=CELL_SIZE):
+        self.scene = scene
+        self.grid = KeyedGridIndex(cell_size)
+        # Label -> (x0, y0, x1, y1) of every indexed vector
+        self.segments = {}
+        # Label -> {label of a crossed vector: intersection point (x, y)}, for the vectors crossing at least one other
+        self.crossings = {}
+        self.points = KeyedGridIndex(cell_size)
+        self.count = 0
+
+    def __len__(self):
+        """Returns the number of crossing pairs."""
+        return self.count
+
+    def _segment(self, label):
+        """Returns the (x0, y0, x1, y1) of a vector of the scene, or None for points."""
+        kind = self.scene.kind(label)
+        if kind == VECTOR:
+            return (0.0, 0.0) + tuple(self.scene.coords(label))
+        if kind == POINT_VECTOR:
+            start, end = self.scene.coords(label)
+            return start + end
+        return None
+
+    def add(self, label, segment=None):
+        """
+        Indexes a vector of the scene (points are ignored), and returns its new crossings as (label, other, x, y).
+        The segment can be given directly to avoid looking it up in the scene.
+        """
+        if label in self.segments:
+            self.remove(label)
+        segment = segment or self._segment(label)
+        if segment is None:
+            return []
+
+        x0, y0, x1, y1 = segment
+        segments, crossings = self.segments, self.crossings
+        found = []
+        for other in self.grid.query_segment(x0, y0, x1, y1):
+            point = segment_intersection(x0, y0, x1, y1, *segments[other])
+            if point is not None:
+                crossings.setdefault(label, {})[other] = point
+                crossings.setdefault(other, {})[label] = point
+                self.points.insert_point((label, other), *point)
+                found.append((label, other) + point)
+        self.count += len(found)
+
+        self.grid.insert_segment(label, x0, y0, x1, y1)
+        segments[label] = segment
+        return found
+
+    def add_many(self, labels):
+        """Indexes several vectors and returns all their new crossings."""
+        found = []
+        for label in labels:
+            found += self.add(label)
+        return found
+
+    def remove(self, label):
+        """Forgets a vector and returns the crossings it had, as (label, other, x, y)."""
+        if self.segments.pop(label, None) is None:
+            return []
+        self.grid.remove(label)
+
+        removed = []
+        crossings = self.crossings
+        for other, point in crossings.pop(label, {}).items():
+            others = crossings[other]
+            del others[label]
+            if not others:
+                del crossings[other]
+            # The point is keyed by whichever of the two vectors was indexed last
+            self.points.remove((label, other))
+            self.points.remove((other, label))
+            removed.append((label, other) + point)
+        self.count -= len(removed)
+        return removed
+
+    def remove_many(self, labels):
+        """Forgets several vectors and returns all the crossings they had."""
+        removed = []
+        for label in labels:
+            removed += self.remove(label)
+        return removed
+
+    def rebuild(self):
+        """Indexes every vector of the scene from scratch, for example after the scene was transformed."""
+        self.grid.clear()
+        self.segments.clear()
+        self.crossings.clear()
+        self.points.clear()
+        self.count = 0
+        labels, x0, y0, x1, y1 = self.scene.segments()
+        for i, label in enumerate(labels):
+            self.add(label, (x0[i], y0[i], x1[i], y1[i]))
+
+    def pairs(self):
+        """Yields every crossing once, as (label, other, x, y), in the order the vectors were indexed."""
+        order = {label: i for i, label in enumerate(self.segments)}
+        for label, others in self.crossings.items():
+            for other, point in others.items():
+                if order[label] < order[other]:
+                    yield (label, other) + point
+
+    def pairs_in(self, x_min, y_min, x_max, y_max):
+        """Yields the crossings inside a rectangle, as (label, other, x, y), in no particular order."""
+        crossings = self.crossings
+        for label, other in self.points.query(x_min, y_min, x_max, y_max):
+            yield (label, other) + crossings[label][other]
+
+    def crossed(self, label):
+        """Returns {label of a crossed vector: intersection point} for a vector."""
+        return dict(self.crossings.get(label, {}))
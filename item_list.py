@@ -0,0 +1,145 @@
+import tkinter as tk
+from scene import POINT, POINT_VECTOR
+
+# Modifier bits of a Tk event state that extend the selection instead of replacing it (Shift and Control)
+EXTEND_SELECTION_STATE = 0x0001 | 0x0004
+
+
+class ItemList(tk.Frame):
+    """
+    Virtualized list of the items in the scene.
+    The list of labels is the source of truth, and only the rows visible in the listbox are materialized as Tk rows,
+    so adding or removing items costs at most a screenful of Tk calls regardless of the size of the scene.
+    """
+
+    def __init__(self, master, scene, visible_rows=10, **kwargs):
+        super().__init__(master, **kwargs)
+        self.scene = scene
+        self.visible_rows = visible_rows
+
+        # Labels of all the items in the list, in display order, and the index of the first visible one
+        self.labels = []
+        self.top = 0
+        # Labels of the selected items, which survive scrolling them out of view
+        self.selected = set()
+        self._extend_selection = False
+
+        self.listbox = tk.Listbox(self, height=visible_rows, selectmode=tk.EXTENDED, exportselection=False)
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+        self.listbox.bind("<Button-1>", self._on_click)
+        # Scrolling with the mouse wheel (Windows/macOS and X11, respectively)
+        self.listbox.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1) or "break")
+        self.listbox.bind("<Button-4>", lambda event: self.scroll(-1) or "break")
+        self.listbox.bind("<Button-5>", lambda event: self.scroll(1) or "break")
+
+    def describe(self, label):
+        """Returns the text displayed for an item of the scene."""
+        scene = self.scene
+        kind = scene.kind(label)
+        if kind == POINT:
+            x, y = scene.coords(label)
+            return f"{label}({x:g},{y:g})"
+        if kind == POINT_VECTOR:
+            # Vectors between two points
+            start_label, end_label = scene.points_of(label)
+            return f"{label} vector from {start_label} to {end_label}"
+        # Vector from the origin (0,0)
+        x, y = scene.coords(label)
+        return f"{label} vector (0,0) to ({x:g},{y:g})"
+
+    def extend(self, labels):
+        """Adds several items at the end of the list, materializing only the rows that are visible."""
+        first = len(self.labels)
+        self.labels.extend(labels)
+        visible = self.labels[first:self.top + self.visible_rows]
+        if visible:
+            self.listbox.insert(tk.END, *[self.describe(label) for label in visible])
+        self._update_scrollbar()
+
+    def remove(self, labels):
+        """Removes several items from the list at once, then refreshes the visible rows."""
+        removed = set(labels)
+        self.labels = [label for label in self.labels if label not in removed]
+        self.selected -= removed
+        self.refresh()
+
+    def reset(self, labels):
+        """Replaces all the items of the list."""
+        self.labels = list(labels)
+        self.selected.clear()
+        self.top = 0
+        self.refresh()
+
+    def refresh(self):
+        """Materializes the rows of the visible window, and restores their selection."""
+        self.top = max(0, min(self.top, len(self.labels) - self.visible_rows))
+        visible = self.labels[self.top:self.top + self.visible_rows]
+
+        self.listbox.delete(0, tk.END)
+        if visible:
+            self.listbox.insert(tk.END, *[self.describe(label) for label in visible])
+        for row, label in enumerate(visible):
+            if label in self.selected:
+                self.listbox.selection_set(row)
+        self._update_scrollbar()
+
+    def scroll(self, rows):
+        """Scrolls the visible window by the given number of rows."""
+        top = self.top
+        self.top = max(0, min(self.top + rows, len(self.labels) - self.visible_rows))
+        if self.top != top:
+            self.refresh()
+
+    def select(self, labels):
+        """Replaces the selection with the given items, and scrolls the list to show the first of them."""
+        self.selected = set(labels)
+        if labels:
+            row = self.labels.index(labels[0])
+            if not self.top <= row < self.top + self.visible_rows:
+                self.top = row
+        self.refresh()
+
+    def selected_labels(self):
+        """Returns the labels of the selected items, in display order."""
+        return [label for label in self.labels if label in self.selected]
+
+    def _visible_labels(self):
+        """Returns the labels of the rows currently materialized in the listbox."""
+        return self.labels[self.top:self.top + self.visible_rows]
+
+    def _on_click(self, event):
+        """Remembers whether the click extends the selection (Shift or Control held) or replaces it."""
+        self._extend_selection = bool(event.state & EXTEND_SELECTION_STATE)
+
+    def _on_select(self, event):
+        """Maps the rows selected in the listbox to the labels of their items."""
+        visible = self._visible_labels()
+        selected_rows = set(self.listbox.curselection())
+        if self._extend_selection:
+            # Only the visible rows change, the selection of the rows out of view is kept
+            self.selected.difference_update(visible)
+        else:
+            self.selected.clear()
+        self.selected.update(label for row, label in enumerate(visible) if row in selected_rows)
+        self._extend_selection = False
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        """Handles the scrollbar commands ("moveto" a fraction or "scroll" by units or pages)."""
+        if action == "moveto":
+            self.top = int(float(amount) * len(self.labels))
+            self.refresh()
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll(int(amount) * step)
+
+    def _update_scrollbar(self):
+        """Sizes the scrollbar slider after the visible window within the whole list."""
+        total = len(self.labels)
+        if total <= self.visible_rows:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.top / total, (self.top + self.visible_rows) / total)
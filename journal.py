@@ -0,0 +1,243 @@
+import os
+import re
+import scene_io
+from scene import POINT, POINT_VECTOR
+
+# Directory where the app keeps its session (the latest snapshot and the journal of the changes made since)
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".vectors_race")
+
+# Number of journal entries after which the scene is written to a new snapshot and the journal starts over
+COMPACT_EVERY = 50000
+
+# Session files: the snapshot of generation n (binary format, see scene_io) and the journal of the changes made on top of it
+SNAPSHOT_NAME = "snapshot-{}" + scene_io.BINARY_SUFFIX
+JOURNAL_NAME = "journal-{}.txt"
+SNAPSHOT_RE = re.compile(r"snapshot-(\d+)" + re.escape(scene_io.BINARY_SUFFIX))
+
+# Suffix added to a snapshot or a journal that could not be restored, which is kept aside instead of deleted
+BAD_SUFFIX = ".bad"
+
+# Journal format, one entry per line, appended as the scene changes:
+#   - Item added: '+' followed by its color in hexadecimal and its statement in the text format, e.g. +ff0000 A(1,2)
+#   - Item removed: '-' followed by its label, e.g. -A (items removed by a cascade are listed too)
+#   - Item moved: '=' followed by its statement at its new position, e.g. =A(3,4) (points and vectors from the origin)
+# Every change made by a single action (including undo and redo) is written at once.
+
+
+class Journal:
+    """
+    Append-only journal of the changes made to a scene, with unbounded undo and redo.
+    Every change goes through added (for items already added to the scene) and remove, which append it to the journal
+    and record it as one undoable step. The journal starts over from a new snapshot every COMPACT_EVERY entries, and restore rebuilds
+    the scene from the latest snapshot and the journal written since.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, compact_every=COMPACT_EVERY):
+        self.directory = directory
+        self.compact_every = compact_every
+        self.generation = 0
+        self.entries = 0
+        self.file = None
+        # Steps that can be undone and redone, as (added records, removed records)
+        self.undo_steps = []
+        self.redo_steps = []
+
+    def _path(self, name, generation):
+        """Returns the path of a session file of the given generation."""
+        return os.path.join(self.directory, name.format(generation))
+
+    def restore(self, scene):
+        """
+        Rebuilds the scene from the latest snapshot and the journal written on top of it, then opens the journal to
+        append the next changes. Returns the labels of the items of the restored scene, in order.
+        A torn last entry, left by a crash in the middle of a write, is ignored.
+        If the snapshot or the journal is damaged, it is renamed with a '.bad' suffix, and the session starts over from
+        a new snapshot of what could be restored, with an empty journal, before a ValueError is raised.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        generations = [int(match.group(1)) for match in map(SNAPSHOT_RE.fullmatch, os.listdir(self.directory)) if match]
+        self.generation = max(generations, default=0)
+        self.undo_steps.clear()
+        self.redo_steps.clear()
+
+        snapshot = self._path(SNAPSHOT_NAME, self.generation)
+        journal = self._path(JOURNAL_NAME, self.generation)
+        damaged = snapshot
+        try:
+            if self.generation:
+                try:
+                    scene_io.load(scene, snapshot)
+                except ValueError as error:
+                    raise ValueError(f"{snapshot}: {error}") from None
+            damaged = journal
+            self.entries = 0
+            if os.path.exists(journal):
+                self._replay_journal(scene, journal)
+        except ValueError:
+            # Keep the damaged file aside, and make what could be restored the start of a new session
+            os.replace(damaged, damaged + BAD_SUFFIX)
+            self.compact(scene)
+            raise
+
+        self.file = open(journal, "a", encoding="utf-8")
+        return list(scene)
+
+    def _replay_journal(self, scene, journal):
+        """Applies every entry of a journal to the scene, and drops its torn last entry if any."""
+        with open(journal, encoding="utf-8") as file:
+            lines = file.read().split("\n")
+        # The text after the last newline is either empty or a torn entry
+        for line_number, line in enumerate(lines[:-1], 1):
+            try:
+                self._replay(scene, line)
+            except ValueError as error:
+                raise ValueError(f"{journal}, line {line_number}: {error}") from None
+        self.entries = len(lines) - 1
+        if lines[-1]:
+            # Drop the torn entry so the next entries start on a line of their own
+            with open(journal, "rb+") as file:
+                file.truncate(os.path.getsize(journal) - len(lines[-1].encode("utf-8")))
+
+    def _replay(self, scene, line):
+        """Applies one journal entry to the scene."""
+        if line.startswith("+"):
+            color, _, statement = line[1:].partition(" ")
+            record = scene_io.parse_line(statement)
+            if record is None:
+                raise ValueError(f"Invalid entry: {line}")
+            scene_io.add_records(scene, [record + (int(color, 16),)])
+        elif line.startswith("-"):
+            scene.remove_many([line[1:]])
+        elif line.startswith("="):
+            record = scene_io.parse_line(line[1:])
+            if record is None or record[0] == POINT_VECTOR:
+                raise ValueError(f"Invalid entry: {line}")
+            scene.move(record[1], record[2], record[3])
+        elif line:
+            raise ValueError(f"Invalid entry: {line}")
+
+    def close(self):
+        """Closes the journal file."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def added(self, scene, labels, step=None):
+        """
+        Journals items that were already added to the scene as one undoable step, and returns the step.
+        Passing the step returned by a previous call adds the items to it instead, as long as it is still the last step
+        that can be undone, so that an action made in several parts (such as a chunked load) is undone at once.
+        """
+        records = scene.records(labels)
+        self._write(records, ())
+        if step is not None and self.undo_steps and self.undo_steps[-1] is step:
+            step[0].extend(records)
+            self.redo_steps.clear()
+        else:
+            step = (records, [])
+            self._push(step)
+        self.maybe_compact(scene)
+        return step
+
+    def moved(self, scene, labels):
+        """
+        Journals the new position of items already moved in the scene (see Scene.move), so a restore puts them back there.
+        Moves are not undoable steps: they come from live updates, which would otherwise flood the undo history.
+        """
+        lines = []
+        for kind, label, a, b, _ in scene.records(labels):
+            if kind != POINT_VECTOR:
+                lines.append("=" + scene_io.format_record(kind, label, a, b) + "\n")
+        if lines and self.file is not None:
+            self.file.write("".join(lines))
+            self.file.flush()
+            self.entries += len(lines)
+        self.maybe_compact(scene)
+
+    def remove(self, scene, labels):
+        """Removes items from the scene, with the vectors of removed points, journals them and returns the labels removed."""
+        cascade = {}
+        for label in labels:
+            if label in scene:
+                if scene.kind(label) == POINT:
+                    cascade.update(dict.fromkeys(scene.dependents(label)))
+                cascade[label] = None
+        # Keep the insertion order, so that undoing re-adds points before the vectors that use them
+        ordered = sorted(cascade, key=scene.index.__getitem__)
+        records = scene.records(ordered)
+        removed = scene.remove_many(ordered)
+        self._write((), records)
+        self._push(([], records))
+        self.maybe_compact(scene)
+        return removed
+
+    def _push(self, step):
+        """Records a new undoable step, which makes the undone steps impossible to redo."""
+        self.undo_steps.append(step)
+        self.redo_steps.clear()
+
+    def undo(self, scene):
+        """
+        Reverts the last step and returns (labels added, labels removed) by reverting it, or None if there is nothing to undo.
+        """
+        if not self.undo_steps:
+            return None
+        added, removed = self.undo_steps.pop()
+        self.redo_steps.append((added, removed))
+        return self._apply(scene, removed, added)
+
+    def redo(self, scene):
+        """Applies the last undone step again and returns (labels added, labels removed), or None if there is nothing to redo."""
+        if not self.redo_steps:
+            return None
+        added, removed = self.redo_steps.pop()
+        self.undo_steps.append((added, removed))
+        return self._apply(scene, added, removed)
+
+    def _apply(self, scene, to_add, to_remove):
+        """Removes then adds records to the scene, journals the change and returns (labels added, labels removed)."""
+        # Remove the vectors before the points they use
+        removed = scene.remove_many([record[1] for record in reversed(to_remove)])
+        added = scene_io.add_records(scene, to_add)
+        self._write(to_add, to_remove)
+        self.maybe_compact(scene)
+        return added, removed
+
+    def _write(self, added, removed):
+        """Appends the entries of one change to the journal, in a single write."""
+        if self.file is None:
+            return
+        lines = ["-" + record[1] + "\n" for record in reversed(removed)]
+        for kind, label, a, b, color in added:
+            lines.append("+{:06x} {}\n".format(color, scene_io.format_record(kind, label, a, b)))
+        self.file.write("".join(lines))
+        self.file.flush()
+        self.entries += len(lines)
+
+    def compact(self, scene):
+        """
+        Writes the scene to a new snapshot and starts a new, empty journal on top of it, then deletes the old files.
+        The new snapshot only becomes the latest once completely written, so a crash at any point leaves a consistent session.
+        """
+        generation = self.generation + 1
+        snapshot = self._path(SNAPSHOT_NAME, generation)
+        scene_io.save_binary(scene, snapshot + ".tmp")
+        with open(snapshot + ".tmp", "rb+") as file:
+            os.fsync(file.fileno())
+        os.replace(snapshot + ".tmp", snapshot)
+
+        self.close()
+        old_snapshot, old_journal = self._path(SNAPSHOT_NAME, self.generation), self._path(JOURNAL_NAME, self.generation)
+        self.generation = generation
+        self.file = open(self._path(JOURNAL_NAME, generation), "w", encoding="utf-8")
+        self.entries = 0
+        for path in (old_snapshot, old_journal):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def maybe_compact(self, scene):
+        """Compacts the journal if it has at least compact_every entries, and tells whether it did."""
+        if self.file is not None and self.entries >= self.compact_every:
+            self.compact(scene)
+            return True
+        return False
@@ -0,0 +1,214 @@
+import random
+import time
+from array import array
+from scene import POINT
+from utils import color_to_int, palette_color
+
+# Simulated time, in seconds, advanced by one step of the simulation (the timestep is fixed, whatever the frame rate)
+TIMESTEP = 0.01
+
+# Linear drag applied to the velocities, so that a constant acceleration leads to a terminal velocity of acceleration / DRAG
+DRAG = 0.5
+
+# Interval, in milliseconds, between two ticks of the race loop (about one frame at 60 FPS, as in cartesian_plan)
+FRAME_MS = 16
+
+# Maximum number of simulation steps run by one tick; beyond it the race falls behind real time instead of freezing the UI
+MAX_STEPS_PER_TICK = 20
+
+# Maximum number of consecutive frames that may be skipped to keep up with the simulation, so the canvas still updates
+MAX_SKIPPED_FRAMES = 10
+
+# Length of the velocity arrows, in seconds of travel at the current velocity
+VELOCITY_SCALE = 0.5
+
+# Radius, in pixels, of the racers on the canvas
+RACER_RADIUS = 3
+
+
+class Race:
+    """
+    Tk-free simulation of racers, each a point with a velocity and an acceleration.
+    The state of all the racers is stored in columns, and every step updates each column in a single pass,
+    so the simulation can be run headless much faster than real time.
+    """
+
+    def __init__(self):
+        self.labels = []
+        self.xs = array("d")
+        self.ys = array("d")
+        self.vxs = array("d")
+        self.vys = array("d")
+        self.axs = array("d")
+        self.ays = array("d")
+        self.colors = array("L")
+        # Simulated time, in seconds, and number of steps run so far
+        self.time = 0.0
+        self.steps = 0
+
+    def __len__(self):
+        return len(self.labels)
+
+    def add(self, label, x, y, vx=0.0, vy=0.0, ax=0.0, ay=0.0, color=None):
+        """Adds a racer at (x, y) with the velocity (vx, vy) and the acceleration (ax, ay)."""
+        self.labels.append(label)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.vxs.append(vx)
+        self.vys.append(vy)
+        self.axs.append(ax)
+        self.ays.append(ay)
+        self.colors.append(color_to_int(color) if color else palette_color(label))
+
+    @classmethod
+    def from_scene(cls, scene):
+        """
+        Creates a race with a racer for every point of the scene, in insertion order.
+        The first vector starting at a point gives the velocity of its racer and the second one its acceleration;
+        a point without such vectors starts at rest.
+        """
+        race = cls()
+        for label in scene:
+            if scene.kind(label) != POINT:
+                continue
+            x, y = scene.coords(label)
+            components = []
+            for vector in scene.dependents(label):
+                start_label, _ = scene.points_of(vector)
+                if start_label == label:
+                    (start_x, start_y), (end_x, end_y) = scene.coords(vector)
+                    components += [end_x - start_x, end_y - start_y]
+            components = (components + [0.0] * 4)[:4]
+            race.add(label, x, y, *components, color=scene.color(label))
+        return race
+
+    @classmethod
+    def random(cls, count, seed=None, span=10.0):
+        """Creates a race with count racers at random positions, velocities and accelerations within [-span, span]."""
+        rng = random.Random(seed)
+        race = cls()
+        for i in range(count):
+            race.add(f"R{i}", *(rng.uniform(-span, span) for _ in range(6)), color="#%06x" % rng.randrange(1 << 24))
+        return race
+
+    def step(self, dt=TIMESTEP, drag=DRAG):
+        """
+        Advances every racer by dt seconds (semi-implicit Euler): the velocities are updated from the accelerations
+        and the drag first, then the positions from the new velocities.
+        """
+        self.vxs = array("d", [vx + (ax - drag * vx) * dt for vx, ax in zip(self.vxs, self.axs)])
+        self.vys = array("d", [vy + (ay - drag * vy) * dt for vy, ay in zip(self.vys, self.ays)])
+        self.xs = array("d", [x + vx * dt for x, vx in zip(self.xs, self.vxs)])
+        self.ys = array("d", [y + vy * dt for y, vy in zip(self.ys, self.vys)])
+        self.time += dt
+        self.steps += 1
+
+    def run(self, steps, dt=TIMESTEP, drag=DRAG):
+        """Runs a number of steps without any display and returns the simulated time."""
+        for _ in range(steps):
+            self.step(dt, drag)
+        return self.time
+
+    def bounds(self):
+        """Returns the (x_min, y_min, x_max, y_max) rectangle containing every racer, or None if there are none."""
+        if not self.labels:
+            return None
+        return min(self.xs), min(self.ys), max(self.xs), max(self.ys)
+
+
+class RaceLoop:
+    """
+    Runs a race in real time on a CartesianPlan with a fixed timestep, driven by after().
+    Each tick runs as many simulation steps as the elapsed time requires, then renders the racers by only moving
+    their canvas items (coords), which are created once when the loop starts.
+    When a tick has no time left for rendering, the frame is dropped rather than the simulation steps.
+    """
+
+    def __init__(self, canvas, race, timestep=TIMESTEP):
+        self.canvas = canvas
+        self.race = race
+        self.timestep = timestep
+        # Canvas ids (racer, velocity arrow) of every racer, in the order of the race
+        self.ids = []
+        self._job = None
+        self._last_time = None
+        # Simulated time not yet stepped, in seconds
+        self._accumulator = 0.0
+        # Duration, in seconds, of the last render, used to tell whether the next one fits in the frame
+        self._render_time = 0.0
+        self._skipped = 0
+        # Counters of the rendered and dropped frames, and of the steps dropped because the race fell behind
+        self.frames = 0
+        self.dropped_frames = 0
+        self.dropped_steps = 0
+
+    @property
+    def running(self):
+        """Tells whether the loop is running."""
+        return self._job is not None
+
+    def start(self):
+        """Creates the canvas items of the racers and starts the loop."""
+        if self.running:
+            return
+        canvas = self.canvas
+        for color in self.race.colors:
+            color = "#%06x" % color
+            arrow = canvas.create_line(0, 0, 0, 0, arrow="last", fill=color, tags="race")
+            racer = canvas.create_oval(0, 0, 0, 0, fill=color, outline=color, tags="race")
+            self.ids.append((racer, arrow))
+        self.render()
+        self._last_time = time.perf_counter()
+        self._job = canvas.after(FRAME_MS, self.tick)
+
+    def stop(self):
+        """Stops the loop and deletes the canvas items of the racers."""
+        if self._job is not None:
+            self.canvas.after_cancel(self._job)
+            self._job = None
+        self.canvas.delete("race")
+        self.ids = []
+
+    def tick(self):
+        """Runs the simulation steps due since the last tick, then renders the racers if the frame budget allows it."""
+        now = time.perf_counter()
+        self._accumulator += now - self._last_time
+        self._last_time = now
+
+        steps = 0
+        while self._accumulator >= self.timestep and steps < MAX_STEPS_PER_TICK:
+            self.race.step(self.timestep)
+            self._accumulator -= self.timestep
+            steps += 1
+        if self._accumulator >= self.timestep:
+            # Too far behind to catch up: let the race run slower than real time instead of piling up steps
+            self.dropped_steps += int(self._accumulator / self.timestep)
+            self._accumulator %= self.timestep
+
+        elapsed = time.perf_counter() - now
+        if elapsed + self._render_time <= FRAME_MS / 1000 or self._skipped >= MAX_SKIPPED_FRAMES:
+            start = time.perf_counter()
+            self.render()
+            self._render_time = time.perf_counter() - start
+            self._skipped = 0
+        else:
+            self.dropped_frames += 1
+            self._skipped += 1
+        self._job = self.canvas.after(FRAME_MS, self.tick)
+
+    def render(self):
+        """Moves the canvas items of every racer to its current position and velocity."""
+        canvas = self.canvas
+        race = self.race
+        viewport = canvas.viewport
+        origin_x, origin_y = viewport.to_pixel(0, 0)
+        scale_x, scale_y = viewport.scale_x, viewport.scale_y
+        arrow_x, arrow_y = scale_x * VELOCITY_SCALE, scale_y * VELOCITY_SCALE
+        coords = canvas.coords
+        r = RACER_RADIUS
+        for (racer, arrow), x, y, vx, vy in zip(self.ids, race.xs, race.ys, race.vxs, race.vys):
+            x_pixel = origin_x + x * scale_x
+            y_pixel = origin_y - y * scale_y
+            coords(racer, x_pixel - r, y_pixel - r, x_pixel + r, y_pixel + r)
+            coords(arrow, x_pixel, y_pixel, x_pixel + vx * arrow_x, y_pixel - vy * arrow_y)
+        self.frames += 1
@@ -0,0 +1,128 @@
+import math
+from scene import POINT, VECTOR, REMOVED
+
+# Side, in pixels, of the density cells points are aggregated into
+CELL_SIZE = 2
+
+# Maximum number of pixels plotted for vectors in one frame; beyond it, vectors are sampled more sparsely
+LINE_PIXEL_BUDGET = 120000
+
+BACKGROUND = (255, 255, 255)
+
+
+def rasterize(scene, viewport, slots=None, margin=0, cell_size=CELL_SIZE, line_budget=LINE_PIXEL_BUDGET,
+              background=BACKGROUND):
+    """
+    Renders the points and vectors of the scene into a binary PPM image of the viewport grown by margin pixels on each
+    side (its top left corner goes at (-margin, -margin) on the canvas), without Tk.
+    Only the items in the given slots are rendered, typically the ones the spatial index finds in view, or every item
+    if None; removed slots are skipped.
+    Points are aggregated into cells of cell_size pixels, darkened by how many points fall in each cell.
+    Vectors are plotted without arrows or labels, sampled so that at most line_budget pixels are plotted in total,
+    which keeps the cost of a frame bounded regardless of the length of the vectors.
+    """
+    width, height = max(1, int(viewport.width)) + 2 * margin, max(1, int(viewport.height)) + 2 * margin
+    pixels = bytearray(bytes(background) * (width * height))
+    row_size = width * 3
+
+    origin_x, origin_y = viewport.to_pixel(0, 0)
+    origin_x += margin
+    origin_y += margin
+    scale_x, scale_y = viewport.scale_x, viewport.scale_y
+    kinds, xs, ys, starts, ends, colors = scene.kinds, scene.xs, scene.ys, scene.starts, scene.ends, scene.colors
+    # In insertion order, so that overlapping items are drawn in the same order from one frame to the next
+    slots = range(len(kinds)) if slots is None else sorted(slots)
+
+    # Clip every vector to the image, and sum their lengths in pixels to know how sparsely they must be sampled; points
+    # are aggregated into density cells at the same time, keeping the color of the last point of each cell
+    segments = []
+    total_length = 0.0
+    cells = {}
+    columns = (width + cell_size - 1) // cell_size
+    for slot in slots:
+        kind = kinds[slot]
+        if kind == POINT:
+            x_pixel = origin_x + xs[slot] * scale_x
+            y_pixel = origin_y - ys[slot] * scale_y
+            if 0 <= x_pixel < width and 0 <= y_pixel < height:
+                cell = int(y_pixel) // cell_size * columns + int(x_pixel) // cell_size
+                entry = cells.get(cell)
+                if entry is None:
+                    cells[cell] = [1, colors[slot]]
+                else:
+                    entry[0] += 1
+                    entry[1] = colors[slot]
+            continue
+        if kind == REMOVED:
+            continue
+        if kind == VECTOR:
+            x0, y0 = origin_x, origin_y
+            x1, y1 = origin_x + xs[slot] * scale_x, origin_y - ys[slot] * scale_y
+        else:
+            start, end = starts[slot], ends[slot]
+            x0, y0 = origin_x + xs[start] * scale_x, origin_y - ys[start] * scale_y
+            x1, y1 = origin_x + xs[end] * scale_x, origin_y - ys[end] * scale_y
+        if 0 <= x0 < width and 0 <= x1 < width and 0 <= y0 < height and 0 <= y1 < height:
+            clipped = (x0, y0, x1, y1)
+        else:
+            clipped = clip_segment(x0, y0, x1, y1, 0, 0, width - 1, height - 1)
+        if clipped is not None:
+            # Number of pixels the line covers
+            length = max(abs(clipped[2] - clipped[0]), abs(clipped[3] - clipped[1]))
+            segments.append((clipped, length, colors[slot]))
+            total_length += length
+
+    stride = max(1.0, total_length / line_budget) if line_budget else 1.0
+    for (x0, y0, x1, y1), length, color in segments:
+        rgb = bytes(((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF))
+        # A vector shorter than the stride is a single sample, its start
+        samples = int(length / stride)
+        if samples:
+            dx = (x1 - x0) / samples
+            dy = (y1 - y0) / samples
+            for i in range(samples + 1):
+                offset = int(y0 + i * dy) * row_size + int(x0 + i * dx) * 3
+                pixels[offset:offset + 3] = rgb
+        else:
+            offset = int(y0) * row_size + int(x0) * 3
+            pixels[offset:offset + 3] = rgb
+
+    # Most cells share a few counts and colors, so their runs of pixels are only built once
+    runs = {}
+    for cell, (count, color) in cells.items():
+        run = runs.get((count, color))
+        if run is None:
+            # Crowded cells are darkened logarithmically, so dense regions stand out
+            shade = 1 / (1 + math.log2(count))
+            rgb = bytes((int(((color >> 16) & 0xFF) * shade), int(((color >> 8) & 0xFF) * shade),
+                         int((color & 0xFF) * shade)))
+            run = runs[(count, color)] = rgb * cell_size
+        left = cell % columns * cell_size
+        top = cell // columns * cell_size
+        span = min(cell_size, width - left) * 3
+        for y in range(top, min(top + cell_size, height)):
+            offset = y * row_size + left * 3
+            pixels[offset:offset + span] = run[:span]
+
+    return b"P6\n%d %d\n255\n" % (width, height) + bytes(pixels)
+
+
+def clip_segment(x0, y0, x1, y1, x_min, y_min, x_max, y_max):
+    """Clips a segment to a rectangle (Liang-Barsky) and returns it, or None if it lies outside."""
+    t0, t1 = 0.0, 1.0
+    dx, dy = x1 - x0, y1 - y0
+    for p, q in ((-dx, x0 - x_min), (dx, x_max - x0), (-dy, y0 - y_min), (dy, y_max - y0)):
+        if p == 0:
+            if q < 0:
+                return None
+        else:
+            t = q / p
+            if p < 0:
+                if t > t1:
+                    return None
+                t0 = max(t0, t)
+            else:
+                if t < t0:
+                    return None
+                t1 = min(t1, t)
+    return x0 + t0 * dx, y0 + t0 * dy, x0 + t1 * dx, y0 + t1 * dy
@@ -0,0 +1,281 @@
+import sys
+from array import array
+from utils import color_to_int, int_to_color, palette_color
+
+# Kinds of items stored in the scene
+POINT = 0
+VECTOR = 1  # Vector from the origin (0,0) to (x, y)
+POINT_VECTOR = 2  # Vector between two existing points
+REMOVED = -1  # Slot of an item that was removed from the scene
+
+# The columns are compacted once removed slots make up more than this fraction of them, and there are at least
+# COMPACT_MIN_REMOVED of them
+COMPACT_FRACTION = 0.5
+COMPACT_MIN_REMOVED = 1024
+
+
+class Scene:
+    """
+    Tk-free model of everything drawn on the Cartesian plane.
+    Items are stored in contiguous columns (one entry per slot) instead of one dict per item:
+        - kinds: POINT, VECTOR or POINT_VECTOR (REMOVED for deleted slots)
+        - xs, ys: coordinates of a point, or the tip of a vector from the origin
+        - starts, ends: slots of the points used by a vector between points (-1 otherwise)
+        - colors: colors packed as 0xRRGGBB integers
+        - changed: revision of the scene at which the slot was last added or moved
+    Labels are mapped to their slot through a single dictionary, and slots keep the insertion order.
+    Removed slots are dropped by compacting the columns once they make up most of them, which renumbers the slots.
+    """
+
+    def __init__(self):
+        self.kinds = array("b")
+        self.xs = array("d")
+        self.ys = array("d")
+        self.starts = array("l")
+        self.ends = array("l")
+        self.colors = array("L")
+        self.changed = array("L")
+        self.labels = []
+        # Number of slots marked REMOVED
+        self.removed = 0
+
+        # Incremented on every change of the scene, so derived results can tell whether they are stale
+        self.revision = 0
+        # Incremented whenever the slots are renumbered, so indexes keyed by slot can tell they must be rebuilt
+        self.compactions = 0
+
+        # Label -> slot, only for the items still in the scene
+        self.index = {}
+        # Point label -> labels of the vectors that start or end at it (a dict is used as an ordered set)
+        self.incident = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, label):
+        return label in self.index
+
+    def __iter__(self):
+        """Iterates over the labels of the items in insertion order."""
+        kinds = self.kinds
+        for slot, label in enumerate(self.labels):
+            if kinds[slot] != REMOVED:
+                yield label
+
+    def _append(self, label, kind, x, y, start, end, color):
+        """Appends a new slot to every column and returns it."""
+        if label in self.index:
+            raise ValueError(f"Label {label} already exists.")
+
+        # Labels are interned, so that every structure keyed by a label (index, incident, graphics, the spatial index
+        # and the item list) shares a single string per item, whichever text it was parsed from
+        label = sys.intern(label)
+        slot = len(self.labels)
+        self.kinds.append(kind)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.colors.append(color_to_int(color) if color else palette_color(label))
+        self.revision += 1
+        self.changed.append(self.revision)
+        self.labels.append(label)
+        self.index[label] = slot
+        return slot
+
+    def add_point(self, label, x, y, color=None):
+        """Adds a point at the given coordinates and returns its slot."""
+        return self._append(label, POINT, x, y, -1, -1, color)
+
+    def add_vector(self, label, x, y, color=None):
+        """Adds a vector from the origin (0,0) to (x, y) and returns its slot."""
+        return self._append(label, VECTOR, x, y, -1, -1, color)
+
+    def add_vector_between(self, label, start_label, end_label, color=None):
+        """Adds a vector from the point start_label to the point end_label and returns its slot."""
+        start = self.index.get(start_label)
+        end = self.index.get(end_label)
+        if start is None or end is None or self.kinds[start] != POINT or self.kinds[end] != POINT:
+            raise ValueError(f"Points {start_label} and/or {end_label} do not exist.")
+        slot = self._append(label, POINT_VECTOR, 0.0, 0.0, start, end, color)
+
+        # Keep the adjacency index up to date, so cascades only touch the vectors of a point (keyed by the interned labels)
+        labels = self.labels
+        self.incident.setdefault(labels[start], {})[labels[slot]] = None
+        self.incident.setdefault(labels[end], {})[labels[slot]] = None
+        return slot
+
+    def move(self, label, x, y):
+        """
+        Moves a point, or the tip of a vector from the origin, to (x, y) and returns the labels of the items whose
+        geometry changed: the item itself, then the vectors of a point. Vectors between points follow their points.
+        """
+        slot = self.index[label]
+        if self.kinds[slot] == POINT_VECTOR:
+            raise ValueError(f"Vector {label} follows its points and cannot be moved.")
+        self.xs[slot] = x
+        self.ys[slot] = y
+        self.revision += 1
+        self.changed[slot] = self.revision
+        if self.kinds[slot] == POINT:
+            return [label] + self.dependents(label)
+        return [label]
+
+    def dependents(self, label):
+        """Returns the labels of the vectors that start or end at the given point."""
+        return list(self.incident.get(label, ()))
+
+    def remove(self, label):
+        """
+        Removes an item from the scene and returns the labels of all removed items.
+        If the item is a point, every vector between points that involves it is removed first.
+        """
+        return self.remove_many([label])
+
+    def remove_many(self, labels):
+        """
+        Removes several items at once and returns the labels of all removed items, cascades included, without duplicates.
+        Only the removed items and the vectors incident to removed points are touched.
+        """
+        removed = {}
+        for label in labels:
+            if label not in self.index:
+                continue
+            if self.kinds[self.index[label]] == POINT:
+                for vec_label in self.dependents(label):
+                    self._remove_slot(vec_label)
+                    removed[vec_label] = None
+            self._remove_slot(label)
+            removed[label] = None
+        if self.removed >= COMPACT_MIN_REMOVED and self.removed > COMPACT_FRACTION * len(self.kinds):
+            self.compact()
+        return list(removed)
+
+    def _remove_slot(self, label):
+        """Marks the slot of an item as removed and drops it from the indexes."""
+        slot = self.index.pop(label)
+        if self.kinds[slot] == POINT_VECTOR:
+            for point_label in (self.labels[self.starts[slot]], self.labels[self.ends[slot]]):
+                vectors = self.incident.get(point_label)
+                if vectors is not None:
+                    vectors.pop(label, None)
+                    if not vectors:
+                        del self.incident[point_label]
+        elif self.kinds[slot] == POINT:
+            self.incident.pop(label, None)
+        self.kinds[slot] = REMOVED
+        self.removed += 1
+        self.revision += 1
+
+    def compact(self):
+        """
+        Drops the slots of the removed items, keeping the insertion order, and renumbers the points of the vectors
+        between points. Every slot is marked as changed, so tokens returned by version before compacting are stale.
+        """
+        kinds, starts, ends = self.kinds, self.starts, self.ends
+        kept = [slot for slot, kind in enumerate(kinds) if kind != REMOVED]
+        # Old slot -> new slot, for the slots that are kept
+        renumbered = array("l", [-1]) * len(kinds)
+        for new_slot, slot in enumerate(kept):
+            renumbered[slot] = new_slot
+
+        self.kinds = array("b", [kinds[slot] for slot in kept])
+        self.xs = array("d", [self.xs[slot] for slot in kept])
+        self.ys = array("d", [self.ys[slot] for slot in kept])
+        self.starts = array("l", [renumbered[starts[slot]] if starts[slot] >= 0 else -1 for slot in kept])
+        self.ends = array("l", [renumbered[ends[slot]] if ends[slot] >= 0 else -1 for slot in kept])
+        self.colors = array("L", [self.colors[slot] for slot in kept])
+        self.labels = [self.labels[slot] for slot in kept]
+        self.index = {label: slot for slot, label in enumerate(self.labels)}
+        self.removed = 0
+        self.revision += 1
+        self.compactions += 1
+        self.changed = array("L", [self.revision]) * len(kept)
+
+    def clear(self):
+        """Removes every item from the scene."""
+        revision, compactions = self.revision, self.compactions
+        self.__init__()
+        # The revision keeps growing, so results derived before clearing are never mistaken for current ones, and
+        # the slots are numbered anew
+        self.revision = revision + 1
+        self.compactions = compactions + 1
+
+    def version(self, label):
+        """
+        Returns a token that changes whenever the geometry of an item changes, or the label is reused by another item.
+        A vector between points also changes when one of its points does.
+        """
+        slot = self.index[label]
+        if self.kinds[slot] == POINT_VECTOR:
+            changed = self.changed
+            return slot, max(changed[slot], changed[self.starts[slot]], changed[self.ends[slot]])
+        return slot, self.changed[slot]
+
+    def kind(self, label):
+        """Returns the kind (POINT, VECTOR or POINT_VECTOR) of an item."""
+        return self.kinds[self.index[label]]
+
+    def coords(self, label):
+        """
+        Returns the logical coordinates of an item:
+            - Point or vector from the origin: (x, y)
+            - Vector between points: ((start_x, start_y), (end_x, end_y))
+        """
+        slot = self.index[label]
+        if self.kinds[slot] == POINT_VECTOR:
+            start, end = self.starts[slot], self.ends[slot]
+            return (self.xs[start], self.ys[start]), (self.xs[end], self.ys[end])
+        return self.xs[slot], self.ys[slot]
+
+    def points_of(self, label):
+        """Returns the (start_label, end_label) of a vector between points, or None for other items."""
+        slot = self.index[label]
+        if self.kinds[slot] != POINT_VECTOR:
+            return None
+        return self.labels[self.starts[slot]], self.labels[self.ends[slot]]
+
+    def records(self, labels):
+        """
+        Returns the given items as records (kind, label, a, b, color), as read and written by scene_io, where (a, b) are
+        the coordinates of a point or a vector from the origin, or the labels of the points of a vector between points,
+        and color is packed as an integer.
+        """
+        records = []
+        index, kinds, labels_of = self.index, self.kinds, self.labels
+        for label in labels:
+            slot = index[label]
+            kind = kinds[slot]
+            if kind == POINT_VECTOR:
+                records.append((kind, label, labels_of[self.starts[slot]], labels_of[self.ends[slot]], self.colors[slot]))
+            else:
+                records.append((kind, label, self.xs[slot], self.ys[slot], self.colors[slot]))
+        return records
+
+    def color(self, label):
+        """Returns the color of an item as a hexadecimal string."""
+        return int_to_color(self.colors[self.index[label]])
+
+    def segments(self):
+        """
+        Returns the world coordinates of every vector as (labels, x0, y0, x1, y1), in insertion order.
+        Vectors from the origin start at (0,0).
+        """
+        labels = []
+        x0, y0, x1, y1 = array("d"), array("d"), array("d"), array("d")
+        kinds, xs, ys, starts, ends = self.kinds, self.xs, self.ys, self.starts, self.ends
+        for slot, kind in enumerate(kinds):
+            if kind == VECTOR:
+                labels.append(self.labels[slot])
+                x0.append(0.0)
+                y0.append(0.0)
+                x1.append(xs[slot])
+                y1.append(ys[slot])
+            elif kind == POINT_VECTOR:
+                start, end = starts[slot], ends[slot]
+                labels.append(self.labels[slot])
+                x0.append(xs[start])
+                y0.append(ys[start])
+                x1.append(xs[end])
+                y1.append(ys[end])
+        return labels, x0, y0, x1, y1
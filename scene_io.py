@@ -0,0 +1,245 @@
+import math
+import mmap
+import struct
+import sys
+from array import array
+import grammar
+from scene import POINT, VECTOR, POINT_VECTOR
+
+# Number of records handed over at once by the streaming loaders
+CHUNK_SIZE = 2000
+
+# File suffix of the binary columnar format; any other file is read and written as text
+BINARY_SUFFIX = ".vrsb"
+
+# Text format, one statement per line, using the same grammar as the input box (see grammar):
+#   - Point: A(0,1)
+#   - Vector from origin: u(1,3)
+#   - Vector between two points: AB, or label(START,END) for labels longer than one letter
+# Vector algebra commands are not allowed in files. Blank lines and lines starting with '#' are ignored.
+
+# Binary format: a header followed by one column per field, all little-endian:
+#   magic, version, number of items, number of bytes of the labels
+#   xs (f64), ys (f64), colors (u32), starts (i32), ends (i32), label offsets (u32, one more than the items), kinds (i8), labels (utf-8)
+# starts and ends are indices of the points within the file (-1 for items that are not vectors between points).
+# Colors are packed as 0xRRGGBB
+MAX_COLOR = 0xFFFFFF
+MAGIC = b"VRSB"
+VERSION = 1
+HEADER = struct.Struct("<4sIII")
+
+
+def parse_line(line):
+    """
+    Parses one statement of the text format and returns it as a record (kind, label, a, b), where (a, b) are:
+        - The coordinates (x, y) for a point or a vector from the origin
+        - The labels (start_label, end_label) of the points of a vector between points
+    Returns None for blank lines and comments, and raises ValueError for invalid statements.
+    """
+    line = line.strip()
+    if line.startswith("#"):
+        return None
+
+    record = grammar.parse_statement(line)
+    if record is not None and record[0] == grammar.ALGEBRA:
+        raise ValueError(f"Vector algebra is not allowed in scene files: {line}")
+    return record
+
+
+def format_record(kind, label, a, b):
+    """Formats a record as one statement of the text format."""
+    if kind == POINT_VECTOR:
+        if label == a + b and len(label) == 2:
+            return label
+        return f"{label}({a},{b})"
+    return f"{label}({format_number(a)},{format_number(b)})"
+
+
+def format_number(value):
+    """Formats a coordinate without losing precision, and without a trailing '.0' for whole numbers."""
+    text = repr(float(value))
+    return text[:-2] if text.endswith(".0") else text
+
+
+def iter_text_records(path, chunk_size=CHUNK_SIZE):
+    """Streams the records of a text scene file in lists of at most chunk_size records."""
+    chunk = []
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, 1):
+            try:
+                record = parse_line(line)
+            except ValueError as error:
+                raise ValueError(f"Line {line_number}: {error}") from None
+            if record is not None:
+                chunk.append(record + (None,))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_binary_records(path, chunk_size=CHUNK_SIZE):
+    """
+    Streams the records of a binary scene file in lists of at most chunk_size records.
+    The file is memory-mapped and its columns are read in place, so only the current chunk is materialized.
+    Records of the binary format carry a fifth field with their packed color.
+    Raises ValueError if the file is truncated or malformed.
+    """
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if len(mapped) < HEADER.size:
+            raise ValueError(f"{path} is not a scene file of version {VERSION}.")
+        magic, version, count, labels_size = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a scene file of version {VERSION}.")
+        layout = (("d", count), ("d", count), ("I", count), ("i", count), ("i", count), ("I", count + 1), ("b", count))
+        size = HEADER.size + sum(length * array(typecode).itemsize for typecode, length in layout) + labels_size
+        if len(mapped) != size:
+            raise ValueError(f"{path} is truncated or damaged: {len(mapped)} bytes instead of {size}.")
+
+        # Every view on the mapping (slices and the columns cast from them) must be released before it can be closed
+        view = memoryview(mapped)
+        views = []
+        try:
+            columns = []
+            offset = HEADER.size
+            for typecode, length in layout:
+                size = length * array(typecode).itemsize
+                views.append(view[offset:offset + size])
+                columns.append(_column(views[-1], typecode))
+                if isinstance(columns[-1], memoryview):
+                    views.append(columns[-1])
+                offset += size
+            xs, ys, colors, starts, ends, label_offsets, kinds = columns
+            views.append(view[offset:offset + labels_size])
+            labels = views[-1]
+
+            # Labels of the points already read, used to resolve the indices of vectors between points
+            point_labels = {}
+            for first in range(0, count, chunk_size):
+                chunk = []
+                for i in range(first, min(first + chunk_size, count)):
+                    if not label_offsets[i] <= label_offsets[i + 1] <= labels_size:
+                        raise ValueError(f"{path} is damaged: invalid label of item {i}.")
+                    label = str(labels[label_offsets[i]:label_offsets[i + 1]], "utf-8")
+                    kind = kinds[i]
+                    # Labels are written back in the text grammar by save_text and the journal, so they must follow it
+                    if not grammar.LABEL_RE.fullmatch(label) or (kind in (POINT, VECTOR)
+                                                                 and label[0].isupper() != (kind == POINT)):
+                        raise ValueError(f"{path} is damaged: invalid label {label!r} of item {i}.")
+                    if colors[i] > MAX_COLOR:
+                        raise ValueError(f"{path} is damaged: invalid color of item {label}.")
+                    if kind == POINT_VECTOR:
+                        start_label, end_label = point_labels.get(starts[i]), point_labels.get(ends[i])
+                        if start_label is None or end_label is None:
+                            raise ValueError(f"{path} is damaged: invalid points of vector {label}.")
+                        chunk.append((kind, label, start_label, end_label, colors[i]))
+                    elif kind in (POINT, VECTOR):
+                        if not (math.isfinite(xs[i]) and math.isfinite(ys[i])):
+                            raise ValueError(f"{path} is damaged: invalid coordinates of item {label}.")
+                        if kind == POINT:
+                            point_labels[i] = label
+                        chunk.append((kind, label, xs[i], ys[i], colors[i]))
+                    else:
+                        raise ValueError(f"{path} is damaged: invalid kind of item {label}.")
+                yield chunk
+        finally:
+            for part in reversed(views):
+                part.release()
+            view.release()
+
+
+def _column(buffer, typecode):
+    """Returns a column of the binary format: a view in place on little-endian machines, a byte-swapped copy otherwise."""
+    if sys.byteorder == "little":
+        return buffer.cast(typecode)
+    column = array(typecode, buffer.tobytes())
+    column.byteswap()
+    return column
+
+
+def iter_records(path, chunk_size=CHUNK_SIZE):
+    """Streams the records of a scene file, picking the format by its suffix."""
+    if str(path).endswith(BINARY_SUFFIX):
+        return iter_binary_records(path, chunk_size)
+    return iter_text_records(path, chunk_size)
+
+
+def add_records(scene, records):
+    """
+    Adds a chunk of records to the scene and returns the labels added, in order.
+    The chunk is added as a whole or not at all: if a record is invalid (e.g. its label is already in use), the records
+    of the chunk added before it are removed again before the ValueError is raised.
+    """
+    labels = []
+    try:
+        for kind, label, a, b, color in records:
+            color = None if color is None else "#{:06x}".format(color)
+            if kind == POINT:
+                scene.add_point(label, a, b, color)
+            elif kind == VECTOR:
+                scene.add_vector(label, a, b, color)
+            else:
+                scene.add_vector_between(label, a, b, color)
+            labels.append(label)
+    except ValueError:
+        scene.remove_many(labels)
+        raise
+    return labels
+
+
+def load(scene, path, chunk_size=CHUNK_SIZE):
+    """Loads a whole scene file into the scene, without any display, and returns the number of items added."""
+    added = 0
+    for records in iter_records(path, chunk_size):
+        added += len(add_records(scene, records))
+    return added
+
+
+def save_text(scene, path):
+    """Saves the scene as a text file, one statement per item in insertion order."""
+    with open(path, "w", encoding="utf-8") as file:
+        for label in scene:
+            points = scene.points_of(label)
+            if points is not None:
+                file.write(format_record(POINT_VECTOR, label, *points) + "\n")
+            else:
+                file.write(format_record(scene.kind(label), label, *scene.coords(label)) + "\n")
+
+
+def save_binary(scene, path):
+    """Saves the scene in the binary columnar format, with the items in insertion order."""
+    xs, ys, colors, starts, ends = array("d"), array("d"), array("I"), array("i"), array("i")
+    label_offsets, kinds, labels = array("I", [0]), array("b"), bytearray()
+
+    # Position of each point within the file, so vectors between points can refer to it
+    positions = {}
+    for position, label in enumerate(scene):
+        slot = scene.index[label]
+        kind = scene.kinds[slot]
+        if kind == POINT:
+            positions[slot] = position
+        kinds.append(kind)
+        xs.append(scene.xs[slot])
+        ys.append(scene.ys[slot])
+        colors.append(scene.colors[slot])
+        starts.append(positions[scene.starts[slot]] if kind == POINT_VECTOR else -1)
+        ends.append(positions[scene.ends[slot]] if kind == POINT_VECTOR else -1)
+        labels += label.encode("utf-8")
+        label_offsets.append(len(labels))
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(kinds), len(labels)))
+        for column in (xs, ys, colors, starts, ends, label_offsets, kinds):
+            if sys.byteorder != "little":
+                column.byteswap()
+            column.tofile(file)
+        file.write(labels)
+
+
+def save(scene, path):
+    """Saves the scene, picking the format by the suffix of the path."""
+    if str(path).endswith(BINARY_SUFFIX):
+        save_binary(scene, path)
+    else:
+        save_text(scene, path)
@@ -0,0 +1,303 @@
+import argparse
+import random
+import socket
+import sys
+import time
+import tracemalloc
+import ingest
+import race
+from intersections import IntersectionIndex
+import scene_io
+from scene import Scene, POINT, VECTOR, POINT_VECTOR
+from spatial_index import GridIndex, OriginIndex
+
+
+def info(args):
+    """Loads a scene file without any display and prints how many items of each kind it has."""
+    scene = Scene()
+    start = time.perf_counter()
+    scene_io.load(scene, args.path)
+    elapsed = time.perf_counter() - start
+
+    counts = {POINT: 0, VECTOR: 0, POINT_VECTOR: 0}
+    for label in scene:
+        counts[scene.kind(label)] += 1
+    print(f"{args.path}: {len(scene)} items loaded in {elapsed:.3f}s")
+    print(f"  points: {counts[POINT]}")
+    print(f"  vectors from the origin: {counts[VECTOR]}")
+    print(f"  vectors between points: {counts[POINT_VECTOR]}")
+
+
+def convert(args):
+    """Converts a scene file between the text and the binary formats (picked by the suffix of each path)."""
+    scene = Scene()
+    scene_io.load(scene, args.source)
+    scene_io.save(scene, args.destination)
+    print(f"{len(scene)} items written to {args.destination}")
+
+
+def generate(args):
+    """Generates a random scene with the given number of points and vectors and saves it."""
+    rng = random.Random(args.seed)
+    scene = Scene()
+    for i in range(args.points):
+        scene.add_point(f"P{i}", round(rng.uniform(-10, 10), 3), round(rng.uniform(-10, 10), 3))
+    for i in range(args.vectors):
+        if args.points >= 2 and rng.random() < 0.5:
+            scene.add_vector_between(f"e{i}", f"P{rng.randrange(args.points)}", f"P{rng.randrange(args.points)}")
+        else:
+            scene.add_vector(f"v{i}", round(rng.uniform(-10, 10), 3), round(rng.uniform(-10, 10), 3))
+    scene_io.save(scene, args.destination)
+    print(f"{len(scene)} items written to {args.destination}")
+
+
+def run_race(args):
+    """Runs a race without any display, from the points of a scene file or random racers, and prints how fast it ran."""
+    if args.path:
+        scene = Scene()
+        scene_io.load(scene, args.path)
+        racers = race.Race.from_scene(scene)
+    else:
+        racers = race.Race.random(args.racers, args.seed)
+
+    start = time.perf_counter()
+    simulated = racers.run(args.steps, args.dt)
+    elapsed = time.perf_counter() - start
+    print(f"{len(racers)} racers, {args.steps} steps ({simulated:.2f}s simulated) in {elapsed:.3f}s "
+          f"({simulated / elapsed if elapsed else float('inf'):.1f}x real time)")
+    bounds = racers.bounds()
+    if bounds is not None:
+        print("  bounds: ({:.3f}, {:.3f}) to ({:.3f}, {:.3f})".format(*bounds))
+
+
+def crossings(args):
+    """Loads a scene file without any display and prints the points where its vectors cross each other."""
+    scene = Scene()
+    scene_io.load(scene, args.path)
+    index = IntersectionIndex(scene)
+    start = time.perf_counter()
+    index.rebuild()
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.path}: {len(index)} crossings between {len(index.segments)} vectors found in {elapsed:.3f}s")
+    for count, (label, other, x, y) in enumerate(index.pairs()):
+        if args.limit is not None and count >= args.limit:
+            break
+        print(f"  {label} x {other} at ({x:g}, {y:g})")
+
+
+def stream(args):
+    """
+    Streams random walks of points to an ingestion server (see ingest), like a telemetry process would: every point
+    is sent once, then moved args.steps times, with a vector between each point and the next one if args.vectors.
+    """
+    transport, location = ingest.parse_address(args.address)
+    if transport == "stdin":
+        connection = None
+        send = sys.stdout.buffer.write
+    else:
+        connection = socket.socket(socket.AF_UNIX if transport == "unix" else socket.AF_INET, socket.SOCK_STREAM)
+        connection.connect(location)
+        send = connection.sendall
+
+    rng = random.Random(args.seed)
+    labels = [f"P{i}" for i in range(args.points)]
+    xs = [rng.uniform(-10, 10) for _ in labels]
+    ys = [rng.uniform(-10, 10) for _ in labels]
+    if args.binary:
+        send(ingest.FRAME_MAGIC)
+
+    def encode(records):
+        if args.binary:
+            return b"".join(ingest.encode_frame(*record) for record in records)
+        return "".join(scene_io.format_record(*record) + "\n" for record in records).encode("utf-8")
+
+    sent = 0
+    start = time.perf_counter()
+    try:
+        for step in range(args.steps + 1):
+            if step:
+                for i in range(len(labels)):
+                    xs[i] = min(10.0, max(-10.0, xs[i] + rng.gauss(0, args.jitter)))
+                    ys[i] = min(10.0, max(-10.0, ys[i] + rng.gauss(0, args.jitter)))
+            records = [(POINT, label, xs[i], ys[i]) for i, label in enumerate(labels)]
+            if step == 0 and args.vectors:
+                records += [(POINT_VECTOR, f"{labels[i]}_{labels[i + 1]}", labels[i], labels[i + 1])
+                            for i in range(len(labels) - 1)]
+            send(encode(records))
+            sent += len(records)
+            if args.rate:
+                # Keep to the requested number of updates per second
+                delay = sent / args.rate - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+    finally:
+        if connection is not None:
+            connection.close()
+    elapsed = time.perf_counter() - start
+    print(f"{sent} updates sent in {elapsed:.3f}s ({sent / elapsed if elapsed else float('inf'):.0f}/s)", file=sys.stderr)
+
+
+def _legacy_items(records):
+    """
+    Builds the per-item layout the canvas used before the scene model: one dict per item, with a hexadecimal color
+    string and the canvas ids of its graphics, keyed by a label string of its own.
+    """
+    items = {}
+    coords = {}
+    for i, (kind, label, a, b, color) in enumerate(records):
+        label = label.encode("utf-8").decode("utf-8")
+        graphic = (2 * i + 1, 2 * i + 2)
+        if kind == POINT_VECTOR:
+            items[label] = {"type": "vector", "coords": (coords[a], coords[b]), "points": (a, b), "graphic": graphic,
+                            "color": "#{:06x}".format(color)}
+        else:
+            coords[label] = (a, b)
+            items[label] = {"type": "point" if kind == POINT else "vector", "coords": (a, b), "graphic": graphic,
+                            "color": "#{:06x}".format(color)}
+    return items
+
+
+def _compact_items(records):
+    """
+    Builds the current layout: the columns of a scene, with palette colors. The canvas only keeps the graphics of the
+    items in view, at most RASTER_THRESHOLD of them, so they do not grow with the scene and are left out.
+    """
+    scene = Scene()
+    for kind, label, a, b, color in records:
+        label = label.encode("utf-8").decode("utf-8")
+        if kind == POINT:
+            scene.add_point(label, a, b)
+        elif kind == VECTOR:
+            scene.add_vector(label, a, b)
+        else:
+            scene.add_vector_between(label, a, b)
+    return scene
+
+
+def _spatial_index(scene):
+    """
+    Builds the spatial indexes the canvas keeps over every item of a scene (see CartesianPlan._index_item): the grid, and
+    the vectors from the origin by angle.
+    """
+    spatial, origin_vectors = GridIndex(), OriginIndex()
+    xs, ys, starts, ends = scene.xs, scene.ys, scene.starts, scene.ends
+    for slot, kind in enumerate(scene.kinds):
+        if kind == POINT:
+            spatial.insert_point(slot, xs[slot], ys[slot])
+        elif kind == VECTOR:
+            origin_vectors.insert(slot, xs[slot], ys[slot])
+        elif kind == POINT_VECTOR:
+            start, end = starts[slot], ends[slot]
+            spatial.insert_segment(slot, xs[start], ys[start], xs[end], ys[end])
+    return spatial, origin_vectors
+
+
+def _measure(build, argument):
+    """Returns the number of bytes still allocated by build(argument) once it returns, and what it returned."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        built = build(argument)
+        return tracemalloc.get_traced_memory()[0] - before, built
+    finally:
+        tracemalloc.stop()
+
+
+def memory(args):
+    """
+    Prints the memory used per item by a scene file (or a random scene) in the per-item dict layout the canvas used
+    to keep, and in the current layout: the columns of the scene, plus the spatial index the canvas keeps over them.
+    """
+    if args.path:
+        scene = Scene()
+        scene_io.load(scene, args.path)
+    else:
+        rng = random.Random(args.seed)
+        scene = Scene()
+        for i in range(args.items // 2):
+            scene.add_point(f"P{i}", rng.uniform(-10, 10), rng.uniform(-10, 10))
+        for i in range(args.items - len(scene)):
+            scene.add_vector_between(f"e{i}", f"P{rng.randrange(args.items // 2)}", f"P{rng.randrange(args.items // 2)}")
+    records = scene.records(list(scene))
+    del scene
+    if not records:
+        print("The scene is empty.")
+        return
+
+    count = len(records)
+    legacy, built = _measure(_legacy_items, records)
+    del built
+    columns, scene = _measure(_compact_items, records)
+    spatial, built = _measure(_spatial_index, scene)
+    compact = columns + spatial
+    print(f"{count} items")
+    print(f"  dict per item:  {legacy / count:8.1f} bytes per item ({legacy / 2 ** 20:.1f} MiB)")
+    print(f"  scene columns:  {columns / count:8.1f} bytes per item ({columns / 2 ** 20:.1f} MiB)")
+    print(f"  spatial index:  {spatial / count:8.1f} bytes per item ({spatial / 2 ** 20:.1f} MiB)")
+    print(f"  current total:  {compact / count:8.1f} bytes per item ({compact / 2 ** 20:.1f} MiB)")
+    print(f"  change: {compact / legacy - 1:+.0%}")
+
+
+def main(argv=None):
+    """Command-line entry point to inspect, convert and generate scene files without a display."""
+    parser = argparse.ArgumentParser(description="Headless tools for Vectors Race scene files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    info_parser = commands.add_parser("info", help="load a scene file and print a summary")
+    info_parser.add_argument("path")
+    info_parser.set_defaults(handler=info)
+
+    convert_parser = commands.add_parser("convert", help="convert a scene file between the text and binary formats")
+    convert_parser.add_argument("source")
+    convert_parser.add_argument("destination")
+    convert_parser.set_defaults(handler=convert)
+
+    generate_parser = commands.add_parser("generate", help="generate a random scene file")
+    generate_parser.add_argument("destination")
+    generate_parser.add_argument("--points", type=int, default=1000)
+    generate_parser.add_argument("--vectors", type=int, default=1000)
+    generate_parser.add_argument("--seed", type=int, default=None)
+    generate_parser.set_defaults(handler=generate)
+
+    race_parser = commands.add_parser("race", help="run a race without any display")
+    race_parser.add_argument("path", nargs="?", help="scene file whose points race (random racers if omitted)")
+    race_parser.add_argument("--racers", type=int, default=1000)
+    race_parser.add_argument("--steps", type=int, default=1000)
+    race_parser.add_argument("--dt", type=float, default=race.TIMESTEP)
+    race_parser.add_argument("--seed", type=int, default=None)
+    race_parser.set_defaults(handler=run_race)
+
+    crossings_parser = commands.add_parser("crossings", help="print the crossings between the vectors of a scene file")
+    crossings_parser.add_argument("path")
+    crossings_parser.add_argument("--limit", type=int, default=None, help="maximum number of crossings printed")
+    crossings_parser.set_defaults(handler=crossings)
+
+    stream_parser = commands.add_parser("stream", help="stream random walks of points to an app listening for updates")
+    stream_parser.add_argument("address", help="tcp:HOST:PORT (or just PORT), unix:PATH, or - for stdout")
+    stream_parser.add_argument("--points", type=int, default=100)
+    stream_parser.add_argument("--steps", type=int, default=1000, help="number of moves of every point")
+    stream_parser.add_argument("--jitter", type=float, default=0.05, help="standard deviation of a move")
+    stream_parser.add_argument("--rate", type=float, default=0, help="updates per second (0 for as fast as possible)")
+    stream_parser.add_argument("--vectors", action="store_true", help="also send a vector between consecutive points")
+    stream_parser.add_argument("--binary", action="store_true", help="send binary frames instead of text statements")
+    stream_parser.add_argument("--seed", type=int, default=None)
+    stream_parser.set_defaults(handler=stream)
+
+    memory_parser = commands.add_parser("memory", help="print the memory used per item, before and after the scene model")
+    memory_parser.add_argument("path", nargs="?", help="scene file to measure (a random scene if omitted)")
+    memory_parser.add_argument("--items", type=int, default=100000, help="number of items of the random scene")
+    memory_parser.add_argument("--seed", type=int, default=None)
+    memory_parser.set_defaults(handler=memory)
+
+    args = parser.parse_args(argv)
+    try:
+        args.handler(args)
+    except (OSError, ValueError) as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
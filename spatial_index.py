@@ -0,0 +1,455 @@
+import math
+from array import array
+
+# Items whose bounding box covers more cells than this are kept in a separate list instead of every cell
+MAX_CELLS_PER_ITEM = 64
+
+# Same limit for segments, on the number of cells they pass through
+MAX_CELLS_PER_SEGMENT = 256
+
+# How a key is registered (see GridIndex.shapes): not at all, or by its bounding box; segments are registered by the
+# corner of their bounding box they start from, from 0 to 3
+ABSENT = -2
+BOX = -1
+_ABSENT = array("b", [ABSENT])
+_NAN = array("d", [math.nan])
+
+# Number of angular sectors the segments from the origin are bucketed into (see OriginIndex), and how much the angles
+# a rectangle spans are widened, so that a segment through one of its corners is not lost to rounding
+ANGLE_SECTORS = 1024
+ANGLE_TOLERANCE = 1e-9
+_NO_SECTOR = array("h", [-1])
+
+# Positions along a segment (from 0 to 1) of a vertical and a horizontal cell border closer than this are taken as
+# the same corner of the grid
+CORNER_TOLERANCE = 1e-9
+
+
+class GridIndex:
+    """
+    Uniform grid over the world used to find the items intersecting a rectangle.
+    Items are keyed by small non-negative integers, such as the slots of a scene, so that their bounding boxes are kept
+    in columns indexed by key and each cell holds a compact array of the keys registered in it.
+    Each item is registered in every cell covered by its bounding box (a point covers a single cell), or, for segments,
+    in the cells the segment passes through, so that long diagonal vectors do not fill their whole box.
+    Items spanning many cells, such as very long vectors, are kept aside and checked against their bounding box.
+    Removed keys are left in the cells until they make up most of them, and are only left out of the results until then.
+    """
+
+    def __init__(self, cell_size=1.0):
+        self.cell_size = cell_size
+        # (column, row) -> keys of the items registered in the cell
+        self.cells = {}
+        # Bounding box of every item (x_min, y_min, x_max, y_max), indexed by key
+        self.x_mins = array("d")
+        self.y_mins = array("d")
+        self.x_maxs = array("d")
+        self.y_maxs = array("d")
+        # How every key is registered, indexed by key: ABSENT, BOX, or the corner of its bounding box a segment starts
+        # from (see _segment), so the coordinates of the segment are not stored twice
+        self.shapes = array("b")
+        # Keys of the items covering more than MAX_CELLS_PER_ITEM cells
+        self.large = set()
+        # Keys removed from the index but still in the cells
+        self.stale = set()
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return self._registered(key)
+
+    def _registered(self, key):
+        """Tells whether an integer key is in the index."""
+        return 0 <= key < len(self.shapes) and self.shapes[key] != ABSENT and key not in self.stale
+
+    def _cell_range(self, x_min, y_min, x_max, y_max):
+        """Returns the (first column, first row, last column, last row) of the cells covered by a rectangle."""
+        size = self.cell_size
+        return (math.floor(x_min / size), math.floor(y_min / size),
+                math.floor(x_max / size), math.floor(y_max / size))
+
+    def _store(self, key, x_min, y_min, x_max, y_max, shape):
+        """Stores the bounding box of an item, after unregistering any previous entry of the same key."""
+        if key < len(self.shapes):
+            if self.shapes[key] != ABSENT:
+                self._unregister(key)
+        else:
+            missing = key + 1 - len(self.shapes)
+            for column in (self.x_mins, self.y_mins, self.x_maxs, self.y_maxs):
+                column.extend(_NAN * missing)
+            self.shapes.extend(_ABSENT * missing)
+        self.x_mins[key], self.y_mins[key], self.x_maxs[key], self.y_maxs[key] = x_min, y_min, x_max, y_max
+        self.shapes[key] = shape
+        self.count += 1
+
+    def insert(self, key, x_min, y_min, x_max, y_max):
+        """Registers an item with its bounding box, replacing any previous box of the same key."""
+        x_min, x_max = min(x_min, x_max), max(x_min, x_max)
+        y_min, y_max = min(y_min, y_max), max(y_min, y_max)
+        self._store(key, x_min, y_min, x_max, y_max, BOX)
+        first_column, first_row, last_column, last_row = self._cell_range(x_min, y_min, x_max, y_max)
+        if (last_column - first_column + 1) * (last_row - first_row + 1) > MAX_CELLS_PER_ITEM:
+            self.large.add(key)
+            return
+
+        cells = self.cells
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                cell = cells.get((column, row))
+                if cell is None:
+                    cells[(column, row)] = array("l", (key,))
+                else:
+                    cell.append(key)
+
+    def insert_segment(self, key, x0, y0, x1, y1):
+        """Registers a segment in the cells it passes through, replacing any previous entry of the same key."""
+        x_min, y_min, x_max, y_max = min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+        first_column, first_row, last_column, last_row = self._cell_range(x_min, y_min, x_max, y_max)
+        if last_column - first_column + last_row - first_row + 1 > MAX_CELLS_PER_SEGMENT:
+            self._store(key, x_min, y_min, x_max, y_max, BOX)
+            self.large.add(key)
+            return
+
+        self._store(key, x_min, y_min, x_max, y_max, (x0 > x1) | (y0 > y1) << 1)
+        cells = self.cells
+        for column_row in self._segment_cells(x0, y0, x1, y1):
+            cell = cells.get(column_row)
+            if cell is None:
+                cells[column_row] = array("l", (key,))
+            else:
+                cell.append(key)
+
+    def _segment_cells(self, x0, y0, x1, y1):
+        """Returns the (column, row) of the cells a segment passes through, walking the grid from one end to the other."""
+        size = self.cell_size
+        column, row = math.floor(x0 / size), math.floor(y0 / size)
+        last_column, last_row = math.floor(x1 / size), math.floor(y1 / size)
+        dx, dy = x1 - x0, y1 - y0
+        step_column = 1 if dx > 0 else -1
+        step_row = 1 if dy > 0 else -1
+        # Position along the segment (0 to 1) of the next vertical and horizontal cell borders, and the distance between them
+        if dx:
+            next_x = ((column + (step_column > 0)) * size - x0) / dx
+            delta_x = size / abs(dx)
+        else:
+            next_x = delta_x = math.inf
+        if dy:
+            next_y = ((row + (step_row > 0)) * size - y0) / dy
+            delta_y = size / abs(dy)
+        else:
+            next_y = delta_y = math.inf
+
+        # Walk until the cell of the end of the segment, never past its column or row, so rounding cannot make it drift
+        cells = [(column, row)]
+        while column != last_column or row != last_row:
+            if column != last_column and (row == last_row or next_x < next_y - CORNER_TOLERANCE):
+                column += step_column
+                next_x += delta_x
+            elif row != last_row and (column == last_column or next_y < next_x - CORNER_TOLERANCE):
+                row += step_row
+                next_y += delta_y
+            else:
+                # The segment passes through the corner of the cell: step both ways, and keep the cells beside the
+                # corner too, since the segment touches them there
+                cells.append((column + step_column, row))
+                cells.append((column, row + step_row))
+                column += step_column
+                row += step_row
+                next_x += delta_x
+                next_y += delta_y
+            cells.append((column, row))
+        return cells
+
+    def insert_point(self, key, x, y):
+        """Registers a point."""
+        self.insert(key, x, y, x, y)
+
+    def box(self, key):
+        """Returns the bounding box (x_min, y_min, x_max, y_max) of an item."""
+        return self.x_mins[key], self.y_mins[key], self.x_maxs[key], self.y_maxs[key]
+
+    def intersects(self, key, x_min, y_min, x_max, y_max):
+        """Tells whether the bounding box of an item intersects a rectangle."""
+        return (self.x_mins[key] <= x_max and self.x_maxs[key] >= x_min
+                and self.y_mins[key] <= y_max and self.y_maxs[key] >= y_min)
+
+    def _covered(self, key):
+        """Returns the (column, row) of the cells an item is registered in."""
+        shape = self.shapes[key]
+        box = self.x_mins[key], self.y_mins[key], self.x_maxs[key], self.y_maxs[key]
+        if shape == BOX:
+            first_column, first_row, last_column, last_row = self._cell_range(*box)
+            return [(column, row) for column in range(first_column, last_column + 1)
+                    for row in range(first_row, last_row + 1)]
+        return self._segment_cells(*_segment(box, shape))
+
+    def _unregister(self, key):
+        """Takes an item, removed or not, out of the cells right away, which walks the keys of each of its cells."""
+        if key in self.stale:
+            self.stale.discard(key)
+        else:
+            self.count -= 1
+        if key in self.large:
+            self.large.discard(key)
+        else:
+            cells = self.cells
+            for column_row in self._covered(key):
+                cell = cells.get(column_row)
+                if cell is not None:
+                    cell.remove(key)
+                    if not cell:
+                        del cells[column_row]
+        self.shapes[key] = ABSENT
+
+    def remove(self, key):
+        """Unregisters an item, if it is in the index."""
+        if not self._registered(key):
+            return
+        if key in self.large:
+            self.large.discard(key)
+            self.shapes[key] = ABSENT
+            self.count -= 1
+            return
+
+        # Walking the cells of the item to remove it costs as much as every key of those cells, so it is only
+        # forgotten, and the cells are purged at once when most of their keys are stale
+        self.stale.add(key)
+        self.count -= 1
+        if len(self.stale) > self.count:
+            self._purge()
+
+    def _purge(self):
+        """Drops the removed keys from the cells."""
+        stale, cells = self.stale, self.cells
+        for column_row, cell in list(cells.items()):
+            kept = array("l", [key for key in cell if key not in stale])
+            if kept:
+                cells[column_row] = kept
+            else:
+                del cells[column_row]
+        for key in stale:
+            self.shapes[key] = ABSENT
+        stale.clear()
+
+    def clear(self):
+        """Unregisters every item."""
+        self.__init__(self.cell_size)
+
+    def query(self, x_min, y_min, x_max, y_max):
+        """Returns the set of keys whose bounding box intersects the given rectangle."""
+        first_column, first_row, last_column, last_row = self._cell_range(x_min, y_min, x_max, y_max)
+        # Items of the cells strictly inside the rectangle intersect it (a segment passes through each of its cells, and
+        # a box covers each of its cells), so only the items of the cells on its border are tested against their box
+        found, border = set(), set()
+        cells = self.cells
+
+        # Visit whichever is smaller: the cells covered by the rectangle, or the occupied cells
+        if (last_column - first_column + 1) * (last_row - first_row + 1) <= len(cells):
+            covered = ((column, row) for column in range(first_column, last_column + 1)
+                       for row in range(first_row, last_row + 1) if (column, row) in cells)
+        else:
+            covered = (column_row for column_row in cells
+                       if first_column <= column_row[0] <= last_column and first_row <= column_row[1] <= last_row)
+        for column, row in covered:
+            if first_column < column < last_column and first_row < row < last_row:
+                found.update(cells[(column, row)])
+            else:
+                border.update(cells[(column, row)])
+
+        border -= found
+        border.update(self.large)
+        x_mins, y_mins, x_maxs, y_maxs = self.x_mins, self.y_mins, self.x_maxs, self.y_maxs
+        found.update(key for key in border
+                     if x_mins[key] <= x_max and x_maxs[key] >= x_min and y_mins[key] <= y_max and y_maxs[key] >= y_min)
+        if self.stale:
+            found -= self.stale
+        return found
+
+    def query_segment(self, x0, y0, x1, y1):
+        """Returns the set of keys registered in the cells a segment passes through, or whose box intersects its box."""
+        found = set()
+        cells = self.cells
+        for column_row in self._segment_cells(x0, y0, x1, y1):
+            cell = cells.get(column_row)
+            if cell is not None:
+                found.update(cell)
+        found.update(self.large)
+        if self.stale:
+            found -= self.stale
+        x_min, y_min, x_max, y_max = min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+        x_mins, y_mins, x_maxs, y_maxs = self.x_mins, self.y_mins, self.x_maxs, self.y_maxs
+        return {key for key in found
+                if x_mins[key] <= x_max and x_maxs[key] >= x_min and y_mins[key] <= y_max and y_maxs[key] >= y_min}
+
+
+class KeyedGridIndex(GridIndex):
+    """
+    GridIndex over items keyed by any hashable value, such as labels or pairs of labels, which are mapped to integers.
+    The integers of removed keys are reused once the cells no longer hold them.
+    """
+
+    def __init__(self, cell_size=1.0):
+        super().__init__(cell_size)
+        # Key -> integer it is registered under, and integer -> key (None if unused)
+        self.ids = {}
+        self.keys = []
+        # Integers that can be given to new keys
+        self.free = []
+
+    def __contains__(self, key):
+        return key in self.ids
+
+    def _id(self, key):
+        """Returns the integer a key is registered under, giving it one if it has none."""
+        key_id = self.ids.get(key)
+        if key_id is None:
+            if self.free:
+                key_id = self.free.pop()
+                self.keys[key_id] = key
+            else:
+                key_id = len(self.keys)
+                self.keys.append(key)
+            self.ids[key] = key_id
+        return key_id
+
+    def insert(self, key, x_min, y_min, x_max, y_max):
+        super().insert(self._id(key), x_min, y_min, x_max, y_max)
+
+    def insert_segment(self, key, x0, y0, x1, y1):
+        super().insert_segment(self._id(key), x0, y0, x1, y1)
+
+    def box(self, key):
+        return super().box(self.ids[key])
+
+    def intersects(self, key, x_min, y_min, x_max, y_max):
+        return super().intersects(self.ids[key], x_min, y_min, x_max, y_max)
+
+    def remove(self, key):
+        key_id = self.ids.pop(key, None)
+        if key_id is None:
+            return
+        self.keys[key_id] = None
+        large = key_id in self.large
+        super().remove(key_id)
+        # No cell holds a large item, the others are only freed once purged
+        if large:
+            self.free.append(key_id)
+
+    def _purge(self):
+        self.free += self.stale
+        super()._purge()
+
+    def query(self, x_min, y_min, x_max, y_max):
+        keys = self.keys
+        return {keys[key_id] for key_id in super().query(x_min, y_min, x_max, y_max)}
+
+    def query_segment(self, x0, y0, x1, y1):
+        keys = self.keys
+        return {keys[key_id] for key_id in super().query_segment(x0, y0, x1, y1)}
+
+
+class OriginIndex:
+    """
+    Index of the segments starting at the origin, such as vectors, keyed like GridIndex.
+    Every such segment passes through the cells around the origin, so a GridIndex would find all of them in any
+    rectangle near it; they are bucketed by angle instead, and only the buckets within the angles a rectangle spans
+    from the origin are tested against it.
+    """
+
+    def __init__(self, sectors=ANGLE_SECTORS):
+        self.sector_angle = 2 * math.pi / sectors
+        self.sector_count = sectors
+        # Sector -> [keys, x of their tips, y of their tips]
+        self.buckets = {}
+        # Sector of every key, indexed by key (-1 for the keys not in the index)
+        self.sectors = array("h")
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return 0 <= key < len(self.sectors) and self.sectors[key] >= 0
+
+    def _sector(self, angle):
+        """Returns the sector of an angle from -pi to pi (both ends fall in the same sector)."""
+        return int((angle + math.pi) / self.sector_angle) % self.sector_count
+
+    def insert(self, key, x, y):
+        """Registers the segment from the origin to (x, y), replacing any previous entry of the same key."""
+        if key in self:
+            self.remove(key)
+        elif key >= len(self.sectors):
+            self.sectors.extend(_NO_SECTOR * (key + 1 - len(self.sectors)))
+        sector = self._sector(math.atan2(y, x))
+        bucket = self.buckets.get(sector)
+        if bucket is None:
+            self.buckets[sector] = bucket = [array("l"), array("d"), array("d")]
+        bucket[0].append(key)
+        bucket[1].append(x)
+        bucket[2].append(y)
+        self.sectors[key] = sector
+        self.count += 1
+
+    def remove(self, key):
+        """Unregisters a segment, if it is in the index."""
+        if key not in self:
+            return
+        sector = self.sectors[key]
+        bucket = self.buckets[sector]
+        position = bucket[0].index(key)
+        for column in bucket:
+            del column[position]
+        if not bucket[0]:
+            del self.buckets[sector]
+        self.sectors[key] = -1
+        self.count -= 1
+
+    def clear(self):
+        """Unregisters every segment."""
+        self.__init__(self.sector_count)
+
+    def query(self, x_min, y_min, x_max, y_max):
+        """Returns the set of keys whose bounding box intersects the given rectangle, among the segments crossing its angles."""
+        if x_min <= 0 <= x_max and y_min <= 0 <= y_max:
+            # Every segment starts inside the rectangle
+            found = set()
+            for keys, _, _ in self.buckets.values():
+                found.update(keys)
+            return found
+
+        angles = [math.atan2(y, x) for x in (x_min, x_max) for y in (y_min, y_max)]
+        # A rectangle on the negative x axis spans the angles on both sides of -pi, which are taken from pi onwards
+        if x_max < 0 and y_min <= 0 <= y_max:
+            angles = [angle + 2 * math.pi if angle < 0 else angle for angle in angles]
+        first = int((min(angles) - ANGLE_TOLERANCE + math.pi) / self.sector_angle)
+        last = int((max(angles) + ANGLE_TOLERANCE + math.pi) / self.sector_angle)
+
+        found = set()
+        buckets = self.buckets
+        for sector in range(first, min(last, first + self.sector_count - 1) + 1):
+            bucket = buckets.get(sector % self.sector_count)
+            if bucket is None:
+                continue
+            for key, x, y in zip(*bucket):
+                if min(0, x) <= x_max and max(0, x) >= x_min and min(0, y) <= y_max and max(0, y) >= y_min:
+                    found.add(key)
+        return found
+
+
+def _segment(box, corner):
+    """Returns the (x0, y0, x1, y1) of the diagonal of a bounding box starting from the given corner (see insert_segment)."""
+    x_min, y_min, x_max, y_max = box
+    x0, x1 = (x_max, x_min) if corner & 1 else (x_min, x_max)
+    y0, y1 = (y_max, y_min) if corner & 2 else (y_min, y_max)
+    return x0, y0, x1, y1
+
+
+def segment_distance(x, y, x0, y0, x1, y1):
+    """Returns the distance from the point (x, y) to the segment (x0,y0)-(x1,y1)."""
+    dx, dy = x1 - x0, y1 - y0
+    length = dx * dx + dy * dy
+    t = max(0.0, min(1.0, ((x - x0) * dx + (y - y0) * dy) / length)) if length else 0.0
+    return math.hypot(x - x0 - t * dx, y - y0 - t * dy)
@@ -0,0 +1,152 @@
+import math
+import random
+import unittest
+from intersections import IntersectionIndex, segment_intersection
+from raster import clip_segment
+from scene import Scene
+from spatial_index import GridIndex, KeyedGridIndex, OriginIndex
+
+
+def brute_force_crossings(scene):
+    """
+    Returns every crossing of the vectors of a scene as {frozenset((label, other)): (x, y)}, testing every pair, and the
+    set of the pairs that overlap on the same line.
+    """
+    labels, x0, y0, x1, y1 = scene.segments()
+    crossings = {}
+    overlapping = set()
+    for i in range(len(labels)):
+        for j in range(i + 1, len(labels)):
+            point = segment_intersection(x0[i], y0[i], x1[i], y1[i], x0[j], y0[j], x1[j], y1[j])
+            if point is not None:
+                pair = frozenset((labels[i], labels[j]))
+                crossings[pair] = point
+                if (x1[i] - x0[i]) * (y1[j] - y0[j]) == (y1[i] - y0[i]) * (x1[j] - x0[j]):
+                    overlapping.add(pair)
+    return crossings, overlapping
+
+
+def random_integer_scene(rng, points=30, vectors=30, span=15):
+    """Returns a scene with integer coordinates, as typed by users, and vectors from the origin and between points."""
+    scene = Scene()
+    for i in range(points):
+        scene.add_point(f"P{i}", rng.randint(-span, span), rng.randint(-span, span))
+    for i in range(vectors):
+        if rng.random() < 0.5:
+            scene.add_vector(f"v{i}", rng.randint(-span, span), rng.randint(-span, span))
+        else:
+            scene.add_vector_between(f"e{i}", f"P{rng.randrange(points)}", f"P{rng.randrange(points)}")
+    return scene
+
+
+class SegmentCellsTest(unittest.TestCase):
+    def test_walk_ends_in_the_cell_of_the_end(self):
+        index = GridIndex()
+        self.assertEqual(index._segment_cells(14, -5, -10, 13)[-1], (-10, 13))
+
+    def test_walk_covers_every_cell_the_segment_passes_through(self):
+        rng = random.Random(1)
+        for cell_size in (1.0, 2.0, 0.7):
+            index = GridIndex(cell_size)
+            for _ in range(500):
+                x0, y0, x1, y1 = (rng.randint(-15, 15) for _ in range(4))
+                cells = set(index._segment_cells(x0, y0, x1, y1))
+                # Sample the segment densely, away from the borders where a point belongs to several cells
+                for step in range(1, 1000):
+                    t = step / 1000
+                    x, y = x0 + t * (x1 - x0), y0 + t * (y1 - y0)
+                    column, row = x / cell_size, y / cell_size
+                    if abs(column - round(column)) > 1e-6 and abs(row - round(row)) > 1e-6:
+                        self.assertIn((math.floor(column), math.floor(row)), cells)
+
+
+class GridIndexTest(unittest.TestCase):
+    def test_queries_follow_insertions_and_removals(self):
+        rng = random.Random(4)
+        for index, keys in ((GridIndex(), range(50)), (KeyedGridIndex(), [f"v{i}" for i in range(50)])):
+            boxes = {}
+            for _ in range(2000):
+                key = rng.choice(keys)
+                if rng.random() < 0.4:
+                    index.remove(key)
+                    boxes.pop(key, None)
+                    continue
+                x0, y0 = rng.uniform(-20, 20), rng.uniform(-20, 20)
+                x1, y1 = x0 + rng.uniform(-8, 8), y0 + rng.uniform(-8, 8)
+                index.insert_segment(key, x0, y0, x1, y1)
+                boxes[key] = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+                self.assertEqual(len(index), len(boxes))
+                # The segments found are among the boxes intersecting the rectangle, and include every box inside it
+                x_min, y_min = rng.uniform(-25, 15), rng.uniform(-25, 15)
+                x_max, y_max = x_min + rng.uniform(0, 10), y_min + rng.uniform(0, 10)
+                found = index.query(x_min, y_min, x_max, y_max)
+                self.assertLessEqual(found, {key for key, box in boxes.items()
+                                             if box[0] <= x_max and box[2] >= x_min and box[1] <= y_max and box[3] >= y_min})
+                self.assertLessEqual({key for key, box in boxes.items()
+                                      if box[0] >= x_min and box[2] <= x_max and box[1] >= y_min and box[3] <= y_max}, found)
+
+
+class OriginIndexTest(unittest.TestCase):
+    def test_queries_find_every_segment_crossing_the_rectangle(self):
+        rng = random.Random(5)
+        index = OriginIndex()
+        tips = {}
+        for _ in range(2000):
+            key = rng.randrange(80)
+            if rng.random() < 0.3:
+                index.remove(key)
+                tips.pop(key, None)
+                continue
+            # Tips on the axes too, and rectangles touching them, where the angles wrap around
+            x, y = rng.choice((rng.uniform(-20, 20), 0.0, -5.0)), rng.choice((rng.uniform(-20, 20), 0.0, -0.0))
+            index.insert(key, x, y)
+            tips[key] = (x, y)
+            x_min, x_max = sorted(rng.choice((rng.uniform(-25, 25), 0.0)) for _ in range(2))
+            y_min, y_max = sorted(rng.choice((rng.uniform(-25, 25), 0.0)) for _ in range(2))
+            found = index.query(x_min, y_min, x_max, y_max)
+            self.assertEqual(len(index), len(tips))
+            self.assertLessEqual({key for key, (x, y) in tips.items()
+                                  if clip_segment(0, 0, x, y, x_min, y_min, x_max, y_max) is not None}, found)
+            self.assertLessEqual(found, {key for key, (x, y) in tips.items() if min(0, x) <= x_max and max(0, x) >= x_min
+                                         and min(0, y) <= y_max and max(0, y) >= y_min})
+
+
+class IntersectionIndexTest(unittest.TestCase):
+    def test_crossings_match_brute_force_on_integer_scenes(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            scene = random_integer_scene(rng)
+            index = IntersectionIndex(scene)
+            index.rebuild()
+            found = {frozenset((label, other)): (x, y) for label, other, x, y in index.pairs()}
+            expected, overlapping = brute_force_crossings(scene)
+            self.assertEqual(set(found), set(expected))
+            # Overlapping collinear vectors meet at the first point of the overlap along whichever was tested first
+            for pair, (x, y) in expected.items():
+                if pair in overlapping:
+                    continue
+                self.assertAlmostEqual(found[pair][0], x)
+                self.assertAlmostEqual(found[pair][1], y)
+
+    def test_incremental_updates_match_brute_force(self):
+        rng = random.Random(2)
+        scene = random_integer_scene(rng, points=40, vectors=60)
+        index = IntersectionIndex(scene)
+        index.rebuild()
+        removed = scene.remove_many([f"P{i}" for i in range(10)] + [f"v{i}" for i in range(0, 60, 3)])
+        index.remove_many(removed)
+        self.assertEqual({frozenset(pair[:2]) for pair in index.pairs()}, set(brute_force_crossings(scene)[0]))
+
+    def test_crossings_in_a_rectangle_match_every_crossing_filtered(self):
+        rng = random.Random(3)
+        scene = random_integer_scene(rng, points=40, vectors=60)
+        index = IntersectionIndex(scene)
+        index.rebuild()
+        index.remove_many(scene.remove_many([f"P{i}" for i in range(5)]))
+        for x_min, y_min, x_max, y_max in ((-5, -5, 5, 5), (0, -15, 15, 0), (-2.5, 1.5, 7.5, 3.5)):
+            inside = {frozenset(pair[:2]) for pair in index.pairs() if x_min <= pair[2] <= x_max and y_min <= pair[3] <= y_max}
+            self.assertEqual({frozenset(pair[:2]) for pair in index.pairs_in(x_min, y_min, x_max, y_max)}, inside)
+
+
+if __name__ == "__main__":
+    unittest.main()
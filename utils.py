@@ -1,11 +1,41 @@
-import random
+import colorsys
+import zlib
 
+# Number of colors of the palette items are colored from by default
+PALETTE_SIZE = 64
 
-def generate_random_color():
-    """Generates a random color, excluding black and white."""
-    while True:
-        # Generate a random hexadecimal color
-        color = "#{:02x}{:02x}{:02x}".format(random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
-        # Exclude black (#000000) and white (#FFFFFF)
-        if color.lower() not in ['#000000', '#ffffff']:
-            return color
+
+def color_to_int(color):
+    """Packs a hexadecimal color such as '#1a2b3c' into a 0xRRGGBB integer."""
+    return int(color.lstrip("#"), 16)
+
+
+def int_to_color(value):
+    """Unpacks a 0xRRGGBB integer into a hexadecimal color such as '#1a2b3c'."""
+    return "#{:06x}".format(value)
+
+
+def _make_palette(size):
+    """
+    Returns size distinct colors, packed as 0xRRGGBB integers, spread around the hue circle by the golden angle
+    so that neighbouring entries contrast, with alternating saturation and brightness, and none close to white.
+    """
+    palette = []
+    for i in range(size):
+        hue = (i * 0.618033988749895) % 1.0
+        saturation = (0.95, 0.75, 0.6)[i % 3]
+        value = (0.85, 0.65)[i // 3 % 2]
+        red, green, blue = colorsys.hsv_to_rgb(hue, saturation, value)
+        palette.append(int(red * 255) << 16 | int(green * 255) << 8 | int(blue * 255))
+    return tuple(palette)
+
+
+PALETTE = _make_palette(PALETTE_SIZE)
+
+
+def palette_color(label):
+    """
+    Returns the default color of an item, as a 0xRRGGBB integer, picked from the palette by a stable hash of its label:
+    the same label always gets the same color, from one run to the next.
+    """
+    return PALETTE[zlib.crc32(label.encode("utf-8")) % PALETTE_SIZE]
@@ -0,0 +1,160 @@
+import math
+from array import array
+from scene import VECTOR, POINT_VECTOR
+
+# Operations on vectors, with the number of vectors they take, usable from the input grammar (see grammar)
+VECTOR_FUNCTIONS = {"proj": 2, "sum": 0}
+SCALAR_FUNCTIONS = {"dot": 2, "cross": 2, "norm": 1}
+
+
+def add(ax, ay, bx, by):
+    """Adds two columns of vectors, element by element."""
+    return array("d", map(float.__add__, ax, bx)), array("d", map(float.__add__, ay, by))
+
+
+def subtract(ax, ay, bx, by):
+    """Subtracts two columns of vectors, element by element."""
+    return array("d", map(float.__sub__, ax, bx)), array("d", map(float.__sub__, ay, by))
+
+
+def scale(ax, ay, factor):
+    """Multiplies a column of vectors by a scalar."""
+    return array("d", [x * factor for x in ax]), array("d", [y * factor for y in ay])
+
+
+def dot(ax, ay, bx, by):
+    """Returns the dot products of two columns of vectors."""
+    return array("d", [x0 * x1 + y0 * y1 for x0, y0, x1, y1 in zip(ax, ay, bx, by)])
+
+
+def cross(ax, ay, bx, by):
+    """Returns the z components of the cross products of two columns of vectors."""
+    return array("d", [x0 * y1 - y0 * x1 for x0, y0, x1, y1 in zip(ax, ay, bx, by)])
+
+
+def norm(ax, ay):
+    """Returns the lengths of a column of vectors."""
+    return array("d", map(math.hypot, ax, ay))
+
+
+def project(ax, ay, bx, by):
+    """Returns the projections of the vectors a onto the vectors b (zero where b is the zero vector)."""
+    xs, ys = array("d"), array("d")
+    for x0, y0, x1, y1 in zip(ax, ay, bx, by):
+        length = x1 * x1 + y1 * y1
+        factor = (x0 * x1 + y0 * y1) / length if length else 0.0
+        xs.append(x1 * factor)
+        ys.append(y1 * factor)
+    return xs, ys
+
+
+def resultant(ax, ay):
+    """Returns the sum of a column of vectors."""
+    return math.fsum(ax), math.fsum(ay)
+
+
+def components(scene):
+    """Returns the (labels, dxs, dys) of every vector of the scene in one pass, where (dx, dy) is end minus start."""
+    labels = []
+    dxs, dys = array("d"), array("d")
+    kinds, xs, ys, starts, ends = scene.kinds, scene.xs, scene.ys, scene.starts, scene.ends
+    for slot, kind in enumerate(kinds):
+        if kind == VECTOR:
+            labels.append(scene.labels[slot])
+            dxs.append(xs[slot])
+            dys.append(ys[slot])
+        elif kind == POINT_VECTOR:
+            start, end = starts[slot], ends[slot]
+            labels.append(scene.labels[slot])
+            dxs.append(xs[end] - xs[start])
+            dys.append(ys[end] - ys[start])
+    return labels, dxs, dys
+
+
+class VectorAlgebra:
+    """
+    Vector algebra over the vectors stored in a scene.
+    The components of all vectors are computed in one batched pass and reused until the scene changes, and the result
+    of each operation is memoized until one of its operands changes (see Scene.version).
+    """
+
+    def __init__(self, scene):
+        self.scene = scene
+        self._components = None
+        # (operation, operands, factor) -> (versions of the operands, result)
+        self._results = {}
+
+    def components(self):
+        """Returns the (labels, dxs, dys, rows) of every vector, recomputed only when the scene changed."""
+        if self._components is None or self._components[0] != self.scene.revision:
+            labels, dxs, dys = components(self.scene)
+            rows = {label: row for row, label in enumerate(labels)}
+            self._components = (self.scene.revision, labels, dxs, dys, rows)
+        return self._components[1:]
+
+    def vector(self, label):
+        """Returns the (dx, dy) components of a single vector, straight from the scene."""
+        scene = self.scene
+        if label not in scene or scene.kind(label) not in (VECTOR, POINT_VECTOR):
+            raise ValueError(f"Vector {label} does not exist.")
+        if scene.kind(label) == POINT_VECTOR:
+            (start_x, start_y), (end_x, end_y) = scene.coords(label)
+            return end_x - start_x, end_y - start_y
+        return scene.coords(label)
+
+    def norms(self):
+        """Returns the labels and lengths of every vector."""
+        labels, dxs, dys, _ = self.components()
+        return labels, norm(dxs, dys)
+
+    def resultant(self):
+        """Returns the sum of every vector of the scene."""
+        _, dxs, dys, _ = self.components()
+        return resultant(dxs, dys)
+
+    def evaluate(self, operation, operands, factor=None):
+        """
+        Evaluates an operation (as parsed by grammar) and returns a vector (dx, dy) or a scalar.
+        The result is memoized, and only recomputed when one of the operands changed.
+        Raises ValueError if an operand does not exist, or if the result is too large to be represented.
+        """
+        key = (operation, operands, factor)
+        if operation == "sum":
+            # The resultant depends on every vector
+            versions = self.scene.revision
+        else:
+            for label in operands:
+                if label not in self.scene or self.scene.kind(label) not in (VECTOR, POINT_VECTOR):
+                    raise ValueError(f"Vector {label} does not exist.")
+            versions = tuple(self.scene.version(label) for label in operands)
+
+        cached = self._results.get(key)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+
+        try:
+            result = self._compute(operation, operands, factor)
+        except OverflowError:
+            result = math.inf
+        # Infinities and NaN cannot be drawn, journaled nor indexed
+        if not all(map(math.isfinite, result if isinstance(result, tuple) else (result,))):
+            raise ValueError(f"The result of {operation} is too large.")
+        self._results[key] = (versions, result)
+        return result
+
+    def _compute(self, operation, operands, factor):
+        """Computes an operation on one-element columns with the batched functions."""
+        if operation == "sum":
+            return self.resultant()
+
+        columns = []
+        for label in operands:
+            x, y = self.vector(label)
+            columns += [array("d", [x]), array("d", [y])]
+        if operation == "scale":
+            xs, ys = scale(*columns, factor)
+        elif operation in ("add", "subtract", "proj"):
+            xs, ys = {"add": add, "subtract": subtract, "proj": project}[operation](*columns)
+        else:
+            return {"dot": dot, "cross": cross, "norm": norm}[operation](*columns)[0]
+        return xs[0], ys[0]
@@ -0,0 +1,81 @@
+import math
+
+# Range of world coordinates visible on each axis when the zoom is 1 (from -10 to 10)
+DEFAULT_SPAN = 20
+
+# Limits of the zoom level, to keep the world-to-pixel transform well conditioned
+MIN_ZOOM = 1e-4
+MAX_ZOOM = 1e6
+
+
+class Viewport:
+    """
+    Tk-free mapping between world coordinates and canvas pixels.
+    The viewport shows DEFAULT_SPAN / zoom world units across each axis of the canvas, centered on (center_x, center_y).
+    """
+
+    def __init__(self, width=1, height=1):
+        self.width = width
+        self.height = height
+        self.center_x = 0.0
+        self.center_y = 0.0
+        self.zoom = 1.0
+
+    @property
+    def scale_x(self):
+        """Number of pixels taken by one world unit on the x-axis."""
+        return self.width * self.zoom / DEFAULT_SPAN
+
+    @property
+    def scale_y(self):
+        """Number of pixels taken by one world unit on the y-axis."""
+        return self.height * self.zoom / DEFAULT_SPAN
+
+    def resize(self, width, height):
+        """Changes the size of the canvas, keeping the same world center and zoom."""
+        self.width = width
+        self.height = height
+
+    def to_pixel(self, x, y):
+        """Converts world coordinates into pixel coordinates (the y-axis is inverted on the canvas)."""
+        return (self.width / 2 + (x - self.center_x) * self.scale_x,
+                self.height / 2 - (y - self.center_y) * self.scale_y)
+
+    def to_world(self, x_pixel, y_pixel):
+        """Converts pixel coordinates into world coordinates."""
+        return (self.center_x + (x_pixel - self.width / 2) / self.scale_x,
+                self.center_y - (y_pixel - self.height / 2) / self.scale_y)
+
+    def world_bounds(self, margin=0):
+        """Returns the (x_min, y_min, x_max, y_max) world rectangle visible on the canvas, grown by a margin in pixels."""
+        x_min, y_max = self.to_world(-margin, -margin)
+        x_max, y_min = self.to_world(self.width + margin, self.height + margin)
+        return x_min, y_min, x_max, y_max
+
+    def pan(self, dx_pixels, dy_pixels):
+        """Moves the view so that the world follows a drag of the given number of pixels."""
+        self.center_x -= dx_pixels / self.scale_x
+        self.center_y += dy_pixels / self.scale_y
+
+    def zoom_at(self, factor, x_pixel, y_pixel):
+        """Multiplies the zoom by a factor while keeping the world point under the given pixel in place."""
+        world_x, world_y = self.to_world(x_pixel, y_pixel)
+        self.zoom = min(MAX_ZOOM, max(MIN_ZOOM, self.zoom * factor))
+        new_x, new_y = self.to_world(x_pixel, y_pixel)
+        self.center_x += world_x - new_x
+        self.center_y += world_y - new_y
+
+    def reset(self):
+        """Goes back to the default view, from -10 to 10 on both axes."""
+        self.center_x = 0.0
+        self.center_y = 0.0
+        self.zoom = 1.0
+
+
+def nice_step(raw_step):
+    """Rounds a grid step up to 1, 2 or 5 times a power of ten."""
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    for multiple in (1, 2, 5, 10):
+        if multiple * magnitude >= raw_step:
+            return multiple * magnitude
+    return 10 * magnitude